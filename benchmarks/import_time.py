@@ -0,0 +1,78 @@
+"""Orçamento de tempo de importação do pacote doe_pff.
+
+Cada medição roda num interpretador novo (como um worker recém-criado) e compara o tempo de
+`import doe_pff` com o de `import numpy`, que é a única dependência obrigatória do pacote.
+Falha (código de saída 1) se o custo extra passar do orçamento ou se algum módulo de interface
+for carregado.
+
+Uso:
+    python benchmarks/import_time.py [--budget-ms 50] [--repeat 7]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BUDGET_MS = 50.0
+DEFAULT_REPEAT = 7
+HEADLESS_MODULES = ("doe_pff", "doe_pff.batch", "doe_pff.optimize", "doe_pff.montecarlo", "doe_pff.surface",
+                    "doe_pff.fitting", "doe_pff.sensitivity", "doe_pff.design",
+                    "doe_pff.effects", "doe_pff.lookup", "doe_pff.instrumentation",
+                    "doe_pff.scenarios", "doe_pff.server")
+FORBIDDEN_MODULES = ("streamlit", "pandas", "plotly", "scipy", "pyarrow", "statsmodels")
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import numpy
+numpy_done = time.perf_counter()
+for name in {modules!r}:
+    __import__(name)
+end = time.perf_counter()
+print(json.dumps({{
+    "numpy_ms": (numpy_done - start) * 1000,
+    "package_ms": (end - numpy_done) * 1000,
+    "forbidden": [name for name in {forbidden!r} if name in sys.modules],
+}}))
+"""
+
+
+# Melhor de `repeat` medições (o mínimo descarta o ruído de cache de disco e de agendamento)
+def measure_import_time(modules=HEADLESS_MODULES, repeat=DEFAULT_REPEAT):
+    probe = _PROBE.format(modules=tuple(modules), forbidden=FORBIDDEN_MODULES)
+    samples = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, "-c", probe], cwd=REPO_ROOT, check=True,
+                                capture_output=True, text=True).stdout
+        samples.append(json.loads(output))
+    return {
+        "numpy_ms": min(sample["numpy_ms"] for sample in samples),
+        "package_ms": min(sample["package_ms"] for sample in samples),
+        "forbidden": sorted({name for sample in samples for name in sample["forbidden"]}),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Verifica o orçamento de importação do pacote doe_pff.")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS,
+                        help=f"Custo máximo além do NumPy, em ms (padrão: {DEFAULT_BUDGET_MS})")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT,
+                        help=f"Número de interpretadores novos medidos (padrão: {DEFAULT_REPEAT})")
+    args = parser.parse_args(argv)
+
+    result = measure_import_time(repeat=args.repeat)
+    print(f"numpy: {result['numpy_ms']:.1f} ms | doe_pff (além do numpy): {result['package_ms']:.1f} ms "
+          f"| orçamento: {args.budget_ms:.1f} ms")
+    if result["forbidden"]:
+        print(f"FALHA: módulos de interface importados: {', '.join(result['forbidden'])}")
+        return 1
+    if result["package_ms"] > args.budget_ms:
+        print("FALHA: importação acima do orçamento")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,223 @@
+"""Teste de carga do servidor de pontuação (doe_pff.server) em localhost.
+
+Abre `--connections` conexões keep-alive e envia requisições ao /score com lotes de `--batch-size`
+formulações sorteadas (valores reais, em colunas JSON; com --binary, a matriz codificada em
+float64), até completar `--requests` requisições. Com `--distinct`, os corpos são sorteados de um
+conjunto de N lotes diferentes, o que exercita o cache LRU do servidor; sem ele, todo lote é novo.
+
+Relata a vazão vista pelo cliente (requisições/s, formulações/ms, latências p50/p90/p99) e a do
+servidor (formulações por ms de tempo de servidor, lida de /stats antes e depois). Com --spawn, sobe
+um servidor numa porta livre só para o teste (e o encerra ao sair, mesmo se o teste for
+interrompido). Falha (código de saída 1) se houver respostas com erro ou, com --min-rows-per-ms, se
+a vazão do servidor ficar abaixo do alvo.
+
+Uso:
+    python benchmarks/load_test.py --spawn [--requests 500] [--batch-size 5000] [--connections 8]
+    python benchmarks/load_test.py --port 8765 --distinct 16
+"""
+import argparse
+import asyncio
+import atexit
+import json
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PR_SET_PDEATHSIG = 1  # prctl(2), Linux
+SERVER_STOP_TIMEOUT = 5.0  # segundos entre SIGTERM e SIGKILL ao encerrar o servidor
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from doe_pff.coding import FACTORS, code_factor_columns  # noqa: E402
+
+
+# Corpo de um lote de formulações sorteadas (níveis categóricos e valores contínuos na faixa):
+# colunas JSON com os valores reais ou, com binary=True, a matriz codificada em float64
+def random_batch_body(n_rows, rng, binary=False):
+    columns = {}
+    for letter, _, factor_type, levels in FACTORS:
+        if factor_type == "categorical":
+            columns[letter] = rng.choice(levels, size=n_rows).tolist()
+        else:
+            columns[letter] = np.round(rng.uniform(levels[0], levels[-1], size=n_rows), 4).tolist()
+    if binary:
+        return code_factor_columns(list(columns.values())).astype("<f8").tobytes()
+    return json.dumps(columns, ensure_ascii=False).encode()
+
+
+async def _request(reader, writer, host, method, path, body=b"", content_type="application/json"):
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: {content_type}\r\n"
+                 f"Content-Length: {len(body)}\r\n\r\n".encode("latin-1") + body)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    content_length = 0
+    while (line := await reader.readline()) not in (b"\r\n", b""):
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.strip().lower() == "content-length":
+            content_length = int(value)
+    return status, await reader.readexactly(content_length)
+
+
+async def fetch_stats(host, port):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        status, content = await _request(reader, writer, host, "GET", "/stats")
+    finally:
+        writer.close()
+    if status != 200:
+        raise RuntimeError(f"/stats respondeu {status}")
+    return json.loads(content)
+
+
+# Cada conexão envia requisições em sequência até esgotar a fila compartilhada de corpos
+async def _connection_worker(host, port, queue, latencies, errors, content_type):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while not queue.empty():
+            body = queue.get_nowait()
+            start = time.perf_counter()
+            status, content = await _request(reader, writer, host, "POST", "/score", body, content_type)
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                errors.append(f"{status}: {content[:200].decode(errors='replace')}")
+    finally:
+        writer.close()
+
+
+async def run_load(host, port, n_requests, batch_size, connections, distinct, seed, binary=False):
+    rng = np.random.default_rng(seed)
+    pool_size = distinct or n_requests
+    bodies = [random_batch_body(batch_size, rng, binary) for _ in range(pool_size)]
+    content_type = "application/octet-stream" if binary else "application/json"
+    queue = asyncio.Queue()
+    for i in range(n_requests):
+        queue.put_nowait(bodies[rng.integers(pool_size)] if distinct else bodies[i])
+
+    before = await fetch_stats(host, port)
+    latencies, errors = [], []
+    start = time.perf_counter()
+    await asyncio.gather(*(_connection_worker(host, port, queue, latencies, errors, content_type)
+                           for _ in range(connections)))
+    elapsed = time.perf_counter() - start
+    after = await fetch_stats(host, port)
+
+    server_ms = (after["server_seconds"] - before["server_seconds"]) * 1000
+    formulations = after["formulations"] - before["formulations"]
+    quantiles = np.percentile(latencies, (50, 90, 99)) * 1000 if latencies else (np.nan,) * 3
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "batch_size": batch_size,
+        "connections": connections,
+        "request_bytes": statistics.mean(len(body) for body in bodies),
+        "elapsed_s": elapsed,
+        "requests_per_s": len(latencies) / elapsed,
+        "client_rows_per_ms": len(latencies) * batch_size / (elapsed * 1000),
+        "latency_ms": dict(zip(("p50", "p90", "p99"), map(float, quantiles))),
+        "server_rows_per_ms": formulations / server_ms if server_ms > 0 else float("inf"),
+        "cache_hits": after["cache"]["hits"] - before["cache"]["hits"],
+    }
+
+
+# No processo filho, antes do exec: no Linux, o servidor recebe SIGTERM se o teste morrer sem
+# conseguir encerrá-lo (ex.: SIGKILL)
+def _terminate_with_parent():
+    import ctypes
+
+    ctypes.CDLL(None, use_errno=True).prctl(PR_SET_PDEATHSIG, signal.SIGTERM)
+
+
+# SIGTERM/SIGHUP (ex.: `timeout`) viram SystemExit, para que o finally e o atexit encerrem o servidor
+def _exit_on_signal(signum, frame):
+    sys.exit(128 + signum)
+
+
+# Encerra o grupo de processos do servidor (com os processos do pool); pode ser chamado mais de uma vez
+def stop_server(process):
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+    except ProcessLookupError:
+        return
+    try:
+        process.wait(SERVER_STOP_TIMEOUT)
+    except subprocess.TimeoutExpired:
+        os.killpg(process.pid, signal.SIGKILL)
+        process.wait()
+
+
+# Sobe o servidor numa porta livre e espera a linha com o endereço. O servidor fica num grupo de
+# processos próprio, encerrado ao sair, mesmo por sinal: um servidor órfão continuaria com o stderr
+# herdado aberto e travaria quem lê a saída do teste por um pipe.
+def spawn_server(workers):
+    process = subprocess.Popen([sys.executable, "-m", "doe_pff.server", "--port", "0", "--workers", str(workers)],
+                               cwd=REPO_ROOT, stdout=subprocess.PIPE, text=True, start_new_session=True,
+                               preexec_fn=_terminate_with_parent if sys.platform.startswith("linux") else None)
+    atexit.register(stop_server, process)
+    for signum in (signal.SIGTERM, signal.SIGHUP):
+        signal.signal(signum, _exit_on_signal)
+    line = process.stdout.readline()
+    if not line:
+        stop_server(process)
+        raise RuntimeError("O servidor não iniciou")
+    return process, int(line.rsplit(":", 1)[1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Teste de carga do servidor de pontuação em localhost.")
+    parser.add_argument("--host", default="127.0.0.1", help="Endereço do servidor (padrão: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8765, help="Porta do servidor (padrão: 8765)")
+    parser.add_argument("--spawn", action="store_true", help="Sobe um servidor numa porta livre para o teste")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Processos do servidor criado com --spawn (padrão: número de CPUs)")
+    parser.add_argument("--requests", type=int, default=200, help="Número de requisições (padrão: 200)")
+    parser.add_argument("--batch-size", type=int, default=5000, help="Formulações por requisição (padrão: 5000)")
+    parser.add_argument("--connections", type=int, default=8, help="Conexões simultâneas (padrão: 8)")
+    parser.add_argument("--distinct", type=int, default=0,
+                        help="Sorteia os corpos entre N lotes diferentes (exercita o cache; padrão: todos novos)")
+    parser.add_argument("--binary", action="store_true",
+                        help="Envia a matriz codificada em float64 (application/octet-stream) em vez de JSON")
+    parser.add_argument("--seed", type=int, default=0, help="Semente dos lotes sorteados (padrão: 0)")
+    parser.add_argument("--min-rows-per-ms", type=float,
+                        help="Falha se o servidor pontuar menos formulações por ms de tempo de servidor")
+    parser.add_argument("--json", action="store_true", help="Imprime o resultado em JSON")
+    args = parser.parse_args(argv)
+
+    process = None
+    host, port = args.host, args.port
+    if args.spawn:
+        process, port = spawn_server(args.workers)
+    try:
+        result = asyncio.run(run_load(host, port, args.requests, args.batch_size, args.connections,
+                                      args.distinct, args.seed, args.binary))
+    finally:
+        if process is not None:
+            stop_server(process)
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        latency = result["latency_ms"]
+        print(f"{result['requests']} requisições de {result['batch_size']} formulações "
+              f"({result['request_bytes'] / 1024:.0f} KiB) em {result['elapsed_s']:.2f} s, "
+              f"{result['connections']} conexões")
+        print(f"cliente:  {result['requests_per_s']:.1f} req/s | {result['client_rows_per_ms']:.0f} formulações/ms | "
+              f"latência p50 {latency['p50']:.1f} ms, p90 {latency['p90']:.1f} ms, p99 {latency['p99']:.1f} ms")
+        print(f"servidor: {result['server_rows_per_ms']:.0f} formulações por ms de tempo de servidor | "
+              f"acertos do cache: {result['cache_hits']}")
+    if result["errors"]:
+        print(f"FALHA: {len(result['errors'])} resposta(s) com erro, ex.: {result['errors'][0]}")
+        return 1
+    if args.min_rows_per_ms is not None and result["server_rows_per_ms"] < args.min_rows_per_ms:
+        print(f"FALHA: abaixo de {args.min_rows_per_ms:g} formulações/ms")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
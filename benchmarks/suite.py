@@ -0,0 +1,302 @@
+"""Suíte de benchmarks dos modelos, dos gráficos e da reexecução completa da página.
+
+Cenários (todos rodam sem rede):
+  - calculate_iat por chamada e calculate_iat_batch em lote;
+  - séries do gráfico de perturbação: laço escalar por fator e leitura da tabela pré-calculada;
+  - cesta de cenários: reavaliação incremental após editar uma linha;
+  - construção (DataFrame + figura Plotly) dos três gráficos da página e do relatório HTML em lote;
+  - execução de est.py pelo AppTest do Streamlit: nova sessão e reexecução após mover um controle.
+
+Os tempos (mediana, mínimo e máximo por chamada, em ms) são gravados em JSON e comparados com uma
+linha de base guardada no repositório; o script falha (código de saída 1) se a mediana de algum
+cenário passar da linha de base por mais que a tolerância. A linha de base só vale para a máquina
+em que foi gerada: regenere-a com --update-baseline ao trocar de máquina.
+
+Uso:
+    python benchmarks/suite.py [--only iat_batch_1e5 ...] [--output resultados.json]
+                               [--baseline benchmarks/baseline.json] [--tolerance 0.3] [--update-baseline]
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from collections import namedtuple
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE = os.path.join(REPO_ROOT, "benchmarks", "baseline.json")
+DEFAULT_TOLERANCE = 0.3
+
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+# setup() prepara os dados fora da medição e devolve a função medida; `number` chamadas por amostra
+Scenario = namedtuple("Scenario", "name description setup number repeat")
+
+
+def _iat_scalar():
+    from doe_pff.models import calculate_iat
+
+    return lambda: calculate_iat(-1, 0.0, 1, 0.0, -1, 0.0)
+
+
+def _iat_batch(n_rows):
+    def setup():
+        import numpy as np
+
+        from doe_pff.models import calculate_iat_batch
+
+        coded = np.random.default_rng(0).uniform(-1, 1, size=(n_rows, 6))
+        return lambda: calculate_iat_batch(coded)
+
+    return setup
+
+
+# Séries de perturbação de uma combinação como eram calculadas a cada execução: 12 chamadas escalares
+def _perturbation_scalar_loop():
+    from doe_pff.lookup import DiscreteLookupTable
+    from doe_pff.models import calculate_iat
+
+    coded = DiscreteLookupTable().coded[100]
+
+    def perturbation_series():
+        series = []
+        for j in range(len(coded)):
+            for extreme in (-1.0, 1.0):
+                moved = coded.copy()
+                moved[j] = extreme
+                series.append(calculate_iat(*moved)[0])
+        return series
+
+    return perturbation_series
+
+
+# Tabela das 216 combinações (respostas, perturbação e interação), como na primeira execução da página
+def _lookup_table_build():
+    from doe_pff.lookup import DiscreteLookupTable
+
+    return DiscreteLookupTable
+
+
+def _perturbation_lookup():
+    from doe_pff.lookup import DiscreteLookupTable, state_index
+
+    table = DiscreteLookupTable()
+    return lambda: table.perturbation[state_index((0, 1, 1, 2, 0, 1))]
+
+
+# Cesta de cenários com 500 formulações: reavaliação após editar uma linha (as demais são reaproveitadas)
+def _scenario_basket_edit():
+    import numpy as np
+
+    from doe_pff.scenarios import ScenarioBasket
+
+    rng = np.random.default_rng(0)
+    row_ids = np.arange(500)
+    coded = rng.uniform(-1, 1, size=(500, 6))
+    basket = ScenarioBasket()
+    basket.update(row_ids, coded)
+    edits = iter(zip(rng.integers(500, size=100_000).tolist(), rng.uniform(-1, 1, size=100_000).tolist()))
+
+    def edit_one_row():
+        row, value = next(edits)
+        coded[row, 1] = value
+        basket.update(row_ids, coded)
+
+    return edit_one_row
+
+
+def _figure(name):
+    def setup():
+        from doe_pff import figures
+        from doe_pff.lookup import DiscreteLookupTable, replicate_lookup
+
+        table = DiscreteLookupTable()
+        state = 100
+        if name == "perturbation":
+            return lambda: figures.perturbation_figure(table, state)
+        if name == "interaction":
+            return lambda: figures.interaction_figure(table, state)
+        if name == "interaction_replicates":
+            replicates = replicate_lookup(10_000, seed=42)
+            return lambda: figures.interaction_figure(table, state, replicates)
+        return lambda: figures.desgaste_figure("Com Zinco", 1.75, table.desgaste[state])
+
+    return setup
+
+
+# Relatório HTML de 500 formulações sorteadas entre as 216 combinações, montado em um só processo
+def _report_500():
+    import numpy as np
+
+    from doe_pff.coding import decode_factor_columns
+    from doe_pff.optimize import discrete_level_grid
+    from doe_pff.report import build_report
+
+    states = np.random.default_rng(0).integers(216, size=500)
+    columns = decode_factor_columns(discrete_level_grid()[states])
+    names = [f"Formulação {i + 1}" for i in range(len(states))]
+    return lambda: build_report(names, columns)
+
+
+def _app_test():
+    import logging
+
+    from streamlit.testing.v1 import AppTest
+
+    # Os avisos de depreciação do Streamlit poluiriam a saída da suíte
+    logging.disable(logging.WARNING)
+    return AppTest.from_file(os.path.join(REPO_ROOT, "est.py"), default_timeout=120)
+
+
+# Nova sessão: execução completa do script com os caches do processo já preenchidos
+def _apptest_new_session():
+    _app_test().run()
+    return lambda: _app_test().run()
+
+
+# Reexecução após mover um controle da sidebar, alternando entre os níveis de B
+def _apptest_rerun():
+    app = _app_test()
+    app.run()
+    levels = iter([0.2, 0.5, 0.8] * 1000)
+
+    def rerun():
+        app.select_slider(key="sel_B").set_value(next(levels))
+        app.run()
+        if app.exception:
+            raise RuntimeError(app.exception)
+
+    rerun()
+    return rerun
+
+
+SCENARIOS = (
+    Scenario("iat_scalar", "calculate_iat, uma formulação por chamada", _iat_scalar, 2000, 7),
+    Scenario("iat_batch_1e5", "calculate_iat_batch, 100 mil formulações", _iat_batch(100_000), 5, 7),
+    Scenario("iat_batch_1e6", "calculate_iat_batch, 1 milhão de formulações", _iat_batch(1_000_000), 1, 5),
+    Scenario("perturbation_scalar_loop", "séries de perturbação por 12 chamadas escalares",
+             _perturbation_scalar_loop, 200, 7),
+    Scenario("lookup_table_build", "tabela das 216 combinações (respostas, perturbação, interação)",
+             _lookup_table_build, 10, 7),
+    Scenario("perturbation_lookup", "séries de perturbação lidas da tabela", _perturbation_lookup, 2000, 7),
+    Scenario("scenario_basket_edit", "cesta de 500 cenários, reavaliação após editar uma linha",
+             _scenario_basket_edit, 200, 7),
+    Scenario("figure_perturbation", "gráfico de perturbação do IAT", _figure("perturbation"), 10, 7),
+    Scenario("figure_interaction", "DataFrame + gráfico de interação A x D", _figure("interaction"), 10, 7),
+    Scenario("figure_interaction_replicates", "gráfico de interação A x D com barras de réplicas",
+             _figure("interaction_replicates"), 10, 7),
+    Scenario("figure_desgaste", "DataFrame + gráfico comparativo de desgaste", _figure("desgaste"), 10, 7),
+    Scenario("report_500", "relatório HTML de 500 formulações (figuras distintas, 1 processo)", _report_500, 1, 3),
+    Scenario("apptest_new_session", "est.py completo pelo AppTest, nova sessão", _apptest_new_session, 1, 5),
+    Scenario("apptest_rerun", "est.py pelo AppTest, reexecução após mover B", _apptest_rerun, 1, 9),
+)
+
+
+# Mede `repeat` amostras de `number` chamadas (após uma chamada de aquecimento) e resume em ms por chamada
+def run_scenario(scenario, repeat=None):
+    function = scenario.setup()
+    function()
+    samples = []
+    for _ in range(repeat or scenario.repeat):
+        start = time.perf_counter()
+        for _ in range(scenario.number):
+            function()
+        samples.append((time.perf_counter() - start) / scenario.number * 1000)
+    return {
+        "description": scenario.description,
+        "median_ms": statistics.median(samples),
+        "min_ms": min(samples),
+        "max_ms": max(samples),
+        "number": scenario.number,
+        "repeat": len(samples),
+    }
+
+
+def environment():
+    import numpy
+
+    versions = {"python": platform.python_version(), "numpy": numpy.__version__}
+    for name in ("pandas", "plotly", "streamlit"):
+        try:
+            versions[name] = __import__(name).__version__
+        except ImportError:
+            versions[name] = None
+    return {"platform": platform.platform(), "processor": platform.processor(), "cpu_count": os.cpu_count(),
+            "versions": versions}
+
+
+# Compara as medianas com a linha de base: {cenário: (razão atual/base ou None se novo, regressão?)}
+def compare(results, baseline, tolerance):
+    comparison = {}
+    for name, result in results.items():
+        reference = baseline.get(name)
+        if reference is None:
+            comparison[name] = (None, False)
+            continue
+        ratio = result["median_ms"] / reference["median_ms"]
+        comparison[name] = (ratio, ratio > 1 + tolerance)
+    return comparison
+
+
+def main(argv=None):
+    names = [scenario.name for scenario in SCENARIOS]
+    parser = argparse.ArgumentParser(description="Benchmarks dos modelos, gráficos e reexecução da página.")
+    parser.add_argument("--only", nargs="+", choices=names, metavar="CENÁRIO",
+                        help=f"Roda apenas os cenários indicados ({', '.join(names)})")
+    parser.add_argument("--repeat", type=int, help="Número de amostras por cenário (padrão: o de cada cenário)")
+    parser.add_argument("--output", help="Arquivo JSON com os resultados desta execução")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE,
+                        help="Linha de base para comparação (padrão: benchmarks/baseline.json)")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help=f"Aumento relativo da mediana tolerado (padrão: {DEFAULT_TOLERANCE})")
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="Grava os resultados como nova linha de base (mantém os cenários não rodados)")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for scenario in SCENARIOS:
+        if args.only and scenario.name not in args.only:
+            continue
+        results[scenario.name] = run_scenario(scenario, args.repeat)
+        print(f"{scenario.name:<32} {results[scenario.name]['median_ms']:>12.4f} ms", flush=True)
+    report = {"environment": environment(), "results": results}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            json.dump(report, output, indent=2, ensure_ascii=False)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as baseline_file:
+            baseline = json.load(baseline_file)["results"]
+
+    if args.update_baseline:
+        report["results"] = {**baseline, **results}
+        with open(args.baseline, "w", encoding="utf-8") as baseline_file:
+            json.dump(report, baseline_file, indent=2, ensure_ascii=False)
+            baseline_file.write("\n")
+        print(f"Linha de base atualizada: {args.baseline}")
+        return 0
+    if not baseline:
+        print("Sem linha de base para comparar (use --update-baseline para criá-la).")
+        return 0
+
+    print(f"\n{'cenário':<32} {'base (ms)':>12} {'atual (ms)':>12} {'razão':>8}")
+    regressions = []
+    for name, (ratio, regressed) in compare(results, baseline, args.tolerance).items():
+        reference = baseline[name]["median_ms"] if ratio is not None else float("nan")
+        ratio_text = "novo" if ratio is None else f"{ratio:.2f}"
+        print(f"{name:<32} {reference:>12.4f} {results[name]['median_ms']:>12.4f} {ratio_text:>8}"
+              + ("  REGRESSÃO" if regressed else ""))
+        if regressed:
+            regressions.append(name)
+    if regressions:
+        print(f"FALHA: {len(regressions)} cenário(s) acima da linha de base + {args.tolerance:.0%}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
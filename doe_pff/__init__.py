@@ -0,0 +1,33 @@
+"""Modelos do experimento de PFF de lubrificantes, sem dependência da interface.
+
+Os módulos de codificação, modelos, otimização, réplicas, superfícies, ajuste, sensibilidade,
+planejamentos, efeitos, cenários e instrumentação dependem apenas do NumPy; scipy, pandas e pyarrow são
+importados sob demanda pelas funções que precisam deles. Assim, processos de lote e workers podem
+reutilizar os modelos sem carregar Streamlit, pandas ou Plotly; o servidor de pontuação
+(doe_pff.server) também só usa a biblioteca padrão e o NumPy. Os gráficos ficam em
+doe_pff.figures (pandas e Plotly, sem Streamlit) e as tabelas da página em doe_pff.tables (pandas),
+que não são importados aqui, assim como o relatório HTML em lote (doe_pff.report); a interface
+(est.py) só liga os controles a essas funções.
+"""
+from doe_pff.coding import (
+    FACTORS,
+    FACTOR_LEVELS,
+    FACTOR_LETTERS,
+    code_factor_columns,
+    decode_factor_columns,
+    get_coded_value_categorical,
+    get_coded_value_numerical,
+)
+from doe_pff.models import (
+    IAT_ERROR_RANGE,
+    IAT_TERMS,
+    MODEL_RESPONSES,
+    calculate_desgaste_qualitative,
+    calculate_desgaste_qualitative_batch,
+    calculate_iat,
+    calculate_iat_batch,
+    calculate_viscosity_qualitative,
+    calculate_viscosity_qualitative_batch,
+    model_response_batch,
+    model_responses_batch,
+)
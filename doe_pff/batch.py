@@ -0,0 +1,175 @@
+"""Pontuação em lote de formulações a partir de arquivos CSV/Parquet.
+
+Lê o arquivo de entrada em blocos (memória limitada), converte os valores reais
+dos fatores A–F com as regras de get_coded_value_*, calcula o IAT vetorizado e
+grava as linhas pontuadas no arquivo de saída. Níveis categóricos desconhecidos e
+valores ausentes, não numéricos ou não finitos interrompem o lote com um erro, em
+vez de serem pontuados; nesse caso o arquivo de saída não é criado (nem fica pela
+metade). Os blocos podem ser distribuídos entre processos.
+
+Uso:
+    python -m doe_pff.batch entrada.csv saida.parquet --chunksize 1000000 --workers 4
+"""
+import os
+import sys
+from collections import deque
+
+import numpy as np
+
+from doe_pff.coding import FACTOR_LETTERS, code_factor_columns_checked
+from doe_pff.models import calculate_iat_batch
+
+DEFAULT_CHUNKSIZE = 500_000
+PARQUET_EXTENSIONS = (".parquet", ".pq")
+
+
+# pandas, pyarrow, concurrent.futures e argparse são importados só quando usados, para que os processos
+# que apenas pontuam blocos (score_frame) carreguem o mínimo possível.
+
+# Pontua um bloco (DataFrame) com as colunas A–F, devolvendo-o com IAT e a faixa ± erro
+def score_frame(df, coded=False):
+    missing = [letter for letter in FACTOR_LETTERS if letter not in df.columns]
+    if missing:
+        raise ValueError(f"Colunas de fatores ausentes no arquivo: {', '.join(missing)}")
+
+    if coded:
+        try:
+            coded_factors = df[list(FACTOR_LETTERS)].to_numpy(dtype=float)
+        except (ValueError, TypeError):
+            raise ValueError("As colunas A–F codificadas devem ser numéricas") from None
+        if not np.isfinite(coded_factors).all():
+            raise ValueError("As colunas A–F codificadas têm valores ausentes ou não finitos")
+    else:
+        coded_factors = code_factor_columns_checked([df[letter].to_numpy() for letter in FACTOR_LETTERS])
+
+    iat, error_range = calculate_iat_batch(coded_factors)
+    df = df.copy()
+    df["IAT"] = iat
+    df["IAT_min"] = iat - error_range
+    df["IAT_max"] = iat + error_range
+    return df
+
+
+def _is_parquet(path):
+    return os.path.splitext(path)[1].lower() in PARQUET_EXTENSIONS
+
+
+# Gera os blocos do arquivo de entrada sem carregá-lo inteiro na memória
+def _read_chunks(path, chunksize):
+    if _is_parquet(path):
+        import pyarrow.parquet as pq
+
+        for record_batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize):
+            yield record_batch.to_pandas()
+    else:
+        import pandas as pd
+
+        yield from pd.read_csv(path, chunksize=chunksize)
+
+
+class _ChunkWriter:
+    # Grava os blocos pontuados em sequência, em Parquet ou CSV
+    def __init__(self, path, parquet):
+        self.path = path
+        self.parquet = parquet
+        self._parquet_writer = None
+        self._wrote_header = False
+
+    def write(self, df):
+        if self.parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._parquet_writer is None:
+                self._parquet_writer = pq.ParquetWriter(self.path, table.schema)
+            else:
+                # Blocos de CSV podem inferir tipos diferentes (ex.: int vs float); alinhar ao primeiro
+                table = table.cast(self._parquet_writer.schema)
+            self._parquet_writer.write_table(table)
+        else:
+            df.to_csv(self.path, mode="a" if self._wrote_header else "w",
+                      header=not self._wrote_header, index=False)
+            self._wrote_header = True
+
+    def close(self):
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+# Pontua os blocos da entrada e os grava com `writer`; devolve o número de linhas gravadas.
+# Com workers > 1, no máximo 2 * workers blocos ficam em memória ao mesmo tempo e a ordem é preservada.
+def _score_chunks(input_path, writer, chunksize, workers, coded):
+    n_rows = 0
+    if workers <= 1:
+        for chunk in _read_chunks(input_path, chunksize):
+            scored = score_frame(chunk, coded=coded)
+            writer.write(scored)
+            n_rows += len(scored)
+        return n_rows
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for chunk in _read_chunks(input_path, chunksize):
+            pending.append(pool.submit(score_frame, chunk, coded))
+            if len(pending) >= 2 * workers:
+                scored = pending.popleft().result()
+                writer.write(scored)
+                n_rows += len(scored)
+        while pending:
+            scored = pending.popleft().result()
+            writer.write(scored)
+            n_rows += len(scored)
+    return n_rows
+
+
+# Pontua o arquivo inteiro, bloco a bloco; devolve o número de linhas gravadas. Os blocos vão para
+# um arquivo temporário ao lado da saída, que só substitui `output_path` (os.replace) se todos forem
+# pontuados: um erro num bloco não deixa uma saída pela metade.
+def score_file(input_path, output_path, chunksize=DEFAULT_CHUNKSIZE, workers=1, coded=False):
+    temporary_path = f"{output_path}.{os.getpid()}.tmp"
+    try:
+        with _ChunkWriter(temporary_path, parquet=_is_parquet(output_path)) as writer:
+            n_rows = _score_chunks(input_path, writer, chunksize, workers, coded)
+        if os.path.exists(temporary_path):  # entrada sem blocos: nada foi gravado
+            os.replace(temporary_path, output_path)
+    except BaseException:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+        raise
+    return n_rows
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Pontua formulações (colunas A–F) com o modelo de IAT, em blocos.")
+    parser.add_argument("input", help="Arquivo de entrada (.csv ou .parquet)")
+    parser.add_argument("output", help="Arquivo de saída (.csv ou .parquet)")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE,
+                        help=f"Linhas por bloco (padrão: {DEFAULT_CHUNKSIZE})")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Número de processos para pontuar os blocos (padrão: 1)")
+    parser.add_argument("--coded", action="store_true",
+                        help="As colunas A–F já estão codificadas (-1 a +1)")
+    args = parser.parse_args(argv)
+
+    try:
+        n_rows = score_file(args.input, args.output, chunksize=args.chunksize,
+                            workers=args.workers, coded=args.coded)
+    except ValueError as error:
+        sys.exit(f"Erro: {error}")
+    print(f"{n_rows} formulações pontuadas em {args.output}")
+
+
+if __name__ == "__main__":
+    main()
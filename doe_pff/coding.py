@@ -0,0 +1,132 @@
+import numpy as np
+
+# --- Definição dos Fatores do Experimento ---
+# Letra do fator, nome usado nas funções de codificação, tipo e níveis reais (do mínimo ao máximo)
+FACTORS = (
+    ("A", "Tipo de Antioxidante", "categorical", ("Amínico", "Fenólico")),
+    ("B", "Quantidade de Antioxidante", "numerical", (0.2, 0.5, 0.8)),
+    ("C", "Tipo de Antidesgaste", "categorical", ("Com Zinco", "Sem Zinco")),
+    ("D", "Quantidade de Antidesgaste", "numerical", (0.5, 1.75, 3.0)),
+    ("E", "Tipo de Óleo Base", "categorical", ("Leve/Médio", "Pesado/Médio")),
+    ("F", "Razão de Óleo Base", "numerical", (20, 50, 80)),
+)
+FACTOR_LETTERS = tuple(letter for letter, _, _, _ in FACTORS)
+FACTOR_LEVELS = {letter: levels for letter, _, _, levels in FACTORS}
+
+# Nível categórico codificado como -1 (qualquer outro valor vira +1)
+CATEGORICAL_LOW_LEVELS = {
+    "Tipo de Antioxidante": "Amínico",
+    "Tipo de Antidesgaste": "Com Zinco",
+    "Tipo de Óleo Base": "Leve/Médio",
+}
+
+# Centro e semi-amplitude dos fatores numéricos: codificado = (real - centro) / semi-amplitude
+NUMERICAL_SCALES = {
+    "Quantidade de Antioxidante": (0.5, 0.3),  # Min=0.2, Centro=0.5, Max=0.8
+    "Quantidade de Antidesgaste": (1.75, 1.25),  # Min=0.5, Centro=1.75, Max=3.0
+    "Razão de Óleo Base": (50, 30),  # Min=20, Centro=50, Max=80
+}
+
+
+# --- Funções Auxiliares para Codificação de Fatores ---
+# Converte valores categóricos selecionados para seus códigos -1 ou +1
+def get_coded_value_categorical(factor_name, selected_value):
+    if factor_name in CATEGORICAL_LOW_LEVELS:
+        return -1 if selected_value == CATEGORICAL_LOW_LEVELS[factor_name] else 1
+    return 0
+
+
+# Converte valores numéricos selecionados para seus códigos -1 (min), 0 (centro), +1 (max)
+def get_coded_value_numerical(factor_name, selected_value):
+    if factor_name in NUMERICAL_SCALES:
+        center, half_range = NUMERICAL_SCALES[factor_name]
+        # Ensure selected_value is treated as float for calculation
+        return (float(selected_value) - center) / half_range
+    return 0
+
+
+# --- Versões Vetorizadas (NumPy) ---
+# Mesmas regras das funções acima, aplicadas a um array inteiro de uma só vez
+def get_coded_values_categorical(factor_name, selected_values):
+    selected_values = np.asarray(selected_values)
+    if factor_name not in CATEGORICAL_LOW_LEVELS:
+        return np.zeros(selected_values.shape)
+    return np.where(selected_values == CATEGORICAL_LOW_LEVELS[factor_name], -1.0, 1.0)
+
+
+def get_coded_values_numerical(factor_name, selected_values):
+    selected_values = np.asarray(selected_values, dtype=float)
+    if factor_name not in NUMERICAL_SCALES:
+        return np.zeros(selected_values.shape)
+    center, half_range = NUMERICAL_SCALES[factor_name]
+    return (selected_values - center) / half_range
+
+
+# Converte as colunas reais A–F (na ordem de FACTORS) para uma matriz codificada (N, 6)
+def code_factor_columns(columns):
+    coded = np.empty((len(columns[0]), len(FACTORS)))
+    for j, ((_, factor_name, factor_type, _), values) in enumerate(zip(FACTORS, columns)):
+        if factor_type == "categorical":
+            coded[:, j] = get_coded_values_categorical(factor_name, values)
+        else:
+            coded[:, j] = get_coded_values_numerical(factor_name, values)
+    return coded
+
+
+# Código de cada nível categórico válido, por letra: {letra: {nível: -1.0 ou +1.0}}
+CATEGORICAL_CODES = {
+    letter: {level: -1.0 if level == CATEGORICAL_LOW_LEVELS[factor_name] else 1.0 for level in levels}
+    for letter, factor_name, factor_type, levels in FACTORS if factor_type == "categorical"
+}
+
+
+# Como code_factor_columns, mas para dados externos (arquivos, requisições): níveis categóricos
+# desconhecidos e valores numéricos inválidos ou não finitos geram ValueError, em vez de virarem +1
+# ou NaN. Listas (ex.: JSON) são traduzidas por dicionário, sem montar arrays de strings; arrays
+# (colunas do pandas) são comparados com cada nível.
+def code_factor_columns_checked(columns):
+    n_rows = len(columns[0])
+    if any(len(values) != n_rows for values in columns):
+        raise ValueError("As colunas A–F devem ter o mesmo número de valores")
+    coded = np.empty((n_rows, len(FACTORS)))
+    for j, ((letter, factor_name, factor_type, levels), values) in enumerate(zip(FACTORS, columns)):
+        if factor_type == "categorical":
+            if isinstance(values, np.ndarray):
+                # Colunas do pandas (arrays de objetos): uma comparação vetorizada por nível
+                is_low = values == CATEGORICAL_LOW_LEVELS[factor_name]
+                known = is_low.copy()
+                for level in levels:
+                    if level != CATEGORICAL_LOW_LEVELS[factor_name]:
+                        known |= values == level
+                if not known.all():
+                    raise ValueError(f"Nível desconhecido para {letter}: {values[~known].tolist()[0]!r} "
+                                     f"(níveis: {', '.join(levels)})")
+                coded[:, j] = np.where(is_low, -1.0, 1.0)
+                continue
+            try:
+                coded[:, j] = np.fromiter(map(CATEGORICAL_CODES[letter].__getitem__, values), float, count=n_rows)
+            except (KeyError, TypeError) as error:
+                raise ValueError(f"Nível desconhecido para {letter}: {error.args[0]!r} "
+                                 f"(níveis: {', '.join(levels)})") from None
+            continue
+        try:
+            numbers = np.asarray(values, dtype=float)
+        except (ValueError, TypeError):
+            raise ValueError(f"O fator {letter} deve ser numérico") from None
+        if not np.isfinite(numbers).all():
+            raise ValueError(f"O fator {letter} tem valores ausentes ou não finitos")
+        coded[:, j] = get_coded_values_numerical(factor_name, numbers)
+    return coded
+
+
+# Operação inversa de code_factor_columns: matriz codificada (N, 6) -> colunas com os valores reais A–F
+def decode_factor_columns(coded_factors):
+    coded_factors = np.asarray(coded_factors, dtype=float)
+    columns = []
+    for j, (_, factor_name, factor_type, levels) in enumerate(FACTORS):
+        if factor_type == "categorical":
+            columns.append(np.where(coded_factors[:, j] < 0, levels[0], levels[-1]))
+        else:
+            center, half_range = NUMERICAL_SCALES[factor_name]
+            columns.append(center + half_range * coded_factors[:, j])
+    return columns
@@ -0,0 +1,315 @@
+"""Planejamentos fatoriais fracionados 2^(k-p) a partir de geradores.
+
+Cada efeito é representado por uma máscara de bits (bit j = fator j): o produto de dois efeitos
+é o XOR das máscaras e a ordem do efeito é a contagem de bits. A relação de definição é o espaço
+gerado (por XOR) pelas palavras dos p geradores; dela saem as cadeias de confundimento, a
+resolução e o padrão de comprimento de palavras (WLP). A busca de aberração mínima compara os
+WLP de todos os conjuntos de geradores quando o espaço é pequeno e usa busca em feixe, coluna a
+coluna, nos demais casos (até ~15 fatores com resposta interativa).
+
+A matriz do planejamento usa a mesma convenção de get_coded_value_categorical e
+get_coded_value_numerical: -1 no nível baixo e +1 no alto. Com 6 fatores, as colunas são os
+fatores A–F de FACTORS e podem ir direto para decode_factor_columns ou calculate_iat_batch.
+"""
+import itertools
+import math
+import re
+
+import numpy as np
+
+# Letras dos fatores do planejamento, sem o I (reservado para a identidade); as 6 primeiras são A–F
+DESIGN_LETTERS = "ABCDEFGHJKLMNOPQRSTUVWXYZ"
+DEFAULT_BEAM_WIDTH = 64
+EXHAUSTIVE_SEARCH_LIMIT = 200_000  # conjuntos de geradores avaliados um a um antes de passar à busca em feixe
+_BATCH_WORDS = 2 ** 22  # palavras por lote na busca exaustiva, para limitar a memória
+_SIGNATURE_BLOCK = 256  # expansões por bloco de assinaturas na busca em feixe
+
+_GENERATOR_PATTERN = re.compile(r"^\s*([A-Z])\s*=\s*([+-]?)\s*([A-Z]+)\s*$")
+
+
+# "ABC" -> 0b111; "I" ou "" -> 0
+def word_mask(name):
+    if name in ("", "I"):
+        return 0
+    mask = 0
+    for letter in name.upper():
+        if letter not in DESIGN_LETTERS:
+            raise ValueError(f"Fator inválido: {letter!r} (use as letras {DESIGN_LETTERS})")
+        mask ^= 1 << DESIGN_LETTERS.index(letter)
+    return mask
+
+
+# 0b111 -> "ABC"; 0 -> "I"
+def word_name(mask, sign=1):
+    letters = ""
+    while mask:
+        lowest = mask & -mask
+        letters += DESIGN_LETTERS[lowest.bit_length() - 1]
+        mask ^= lowest
+    letters = letters or "I"
+    return letters if sign > 0 else "-" + letters
+
+
+# Contagem de bits de um array de máscaras (até 32 fatores), sem laço em Python
+def _popcount(masks):
+    masks = np.asarray(masks, dtype=np.int64)
+    masks = masks - ((masks >> 1) & 0x55555555)
+    masks = (masks & 0x33333333) + ((masks >> 2) & 0x33333333)
+    masks = (masks + (masks >> 4)) & 0x0F0F0F0F
+    return (masks * 0x01010101 & 0xFFFFFFFF) >> 24
+
+
+# Espaço gerado pelas palavras (último eixo): produtos de todos os subconjuntos, identidade primeiro.
+# Para `words` (..., p) devolve (..., 2^p), dobrando o conjunto a cada gerador.
+def _span(words):
+    words = np.asarray(words, dtype=np.int64)
+    spanned = np.zeros(words.shape[:-1] + (1,), dtype=np.int64)
+    for g in range(words.shape[-1]):
+        spanned = np.concatenate([spanned, spanned ^ words[..., g:g + 1]], axis=-1)
+    return spanned
+
+
+# Contagem de palavras por comprimento (0..n_factors) em cada linha de `words` (N, W)
+def _word_length_counts(words, n_factors):
+    lengths = _popcount(words)
+    rows = np.arange(lengths.shape[0])[:, None] * (n_factors + 1)
+    counts = np.bincount((rows + lengths).ravel(), minlength=lengths.shape[0] * (n_factors + 1))
+    return counts.reshape(lengths.shape[0], n_factors + 1)
+
+
+# Índice da linha com o menor WLP em ordem lexicográfica (menor A_1, depois A_2, ...)
+def _lexicographic_argmin(counts):
+    return np.lexsort(counts[:, ::-1].T)[0]
+
+
+class FractionalFactorialDesign:
+    # Planejamento 2^(k-p): os k - p primeiros fatores formam o fatorial completo (fatores base) e
+    # cada gerador define um fator adicional como produto de fatores base, com sinal opcional
+    # ("F=ABCDE", "F=-ABCDE"). Geradores também podem ser dados como máscaras da palavra completa.
+    def __init__(self, n_factors, generators=()):
+        if not 1 <= n_factors <= len(DESIGN_LETTERS):
+            raise ValueError(f"Número de fatores deve estar entre 1 e {len(DESIGN_LETTERS)}")
+        self.n_factors = n_factors
+        self.n_base_factors = n_factors - len(generators)
+        base_mask = (1 << self.n_base_factors) - 1
+
+        parsed = {}
+        for generator in generators:
+            word, sign = self._parse_generator(generator)
+            added_mask = word & ~base_mask
+            if added_mask == 0 or added_mask & (added_mask - 1) or added_mask >> n_factors:
+                raise ValueError(f"O gerador {self._describe(generator)} deve definir exatamente um fator adicional "
+                                 f"({word_name(1 << self.n_base_factors)} a {DESIGN_LETTERS[n_factors - 1]})")
+            if _popcount(word & base_mask) < 1:
+                raise ValueError(f"O gerador {self._describe(generator)} não usa nenhum fator base")
+            if added_mask in parsed:
+                raise ValueError(f"O fator {word_name(added_mask)} aparece em mais de um gerador")
+            parsed[added_mask] = (word, sign)
+        # Geradores na ordem dos fatores adicionais
+        self.generators = tuple(parsed[mask] for mask in sorted(parsed))
+
+        words = np.array([word for word, _ in self.generators], dtype=np.int64)
+        signs = np.array([sign for _, sign in self.generators], dtype=np.int64)
+        self._words = _span(words)
+        # O sinal de um produto de geradores é o produto dos sinais: soma dos bits de sinal negativo mod 2
+        self._signs = 1 - 2 * (_span((signs < 0).astype(np.int64)) & 1)
+
+    @staticmethod
+    def _parse_generator(generator):
+        if isinstance(generator, (int, np.integer)):
+            return int(generator), 1
+        match = _GENERATOR_PATTERN.match(generator.upper())
+        if match is None:
+            raise ValueError(f"Gerador inválido: {generator!r} (use o formato 'F=ABCDE')")
+        added, sign, product = match.groups()
+        return word_mask(product) ^ word_mask(added), -1 if sign == "-" else 1
+
+    @staticmethod
+    def _describe(generator):
+        return word_name(generator) if isinstance(generator, (int, np.integer)) else repr(generator)
+
+    @property
+    def n_generators(self):
+        return len(self.generators)
+
+    @property
+    def n_runs(self):
+        return 2 ** self.n_base_factors
+
+    # Palavras da relação de definição (sem a identidade), por comprimento e depois por letra
+    @property
+    def defining_relation(self):
+        words, signs = self._words[1:], self._signs[1:]
+        order = np.lexsort((words, _popcount(words)))
+        return tuple((int(word), int(sign)) for word, sign in zip(words[order], signs[order]))
+
+    # Número de palavras de cada comprimento 1..k na relação de definição
+    def _length_counts(self):
+        return _word_length_counts(self._words[None, 1:], self.n_factors)[0]
+
+    # Menor comprimento de palavra da relação de definição; None para o fatorial completo
+    @property
+    def resolution(self):
+        if self.n_generators == 0:
+            return None
+        return int(_popcount(self._words[1:]).min())
+
+    # Padrão de comprimento de palavras (A_3, A_4, ..., A_k)
+    @property
+    def word_length_pattern(self):
+        return tuple(int(count) for count in self._length_counts()[3:])
+
+    # Cadeias de confundimento dos efeitos até a ordem `max_order` (None: todos os efeitos de cada cadeia).
+    # Cada cadeia é uma tupla de (máscara, sinal), começando pelo efeito de menor ordem.
+    def alias_chains(self, max_order=2):
+        if max_order is None:
+            # Cada cadeia completa contém exatamente um efeito formado só por fatores base
+            chains = [leader ^ self._words for leader in range(1, self.n_runs)]
+        else:
+            effects = np.arange(1, 2 ** self.n_factors, dtype=np.int64)
+            effects = effects[_popcount(effects) <= max_order]
+            # Representante da cadeia: a menor máscara entre os efeitos confundidos
+            representatives = (effects[:, None] ^ self._words[None, :]).min(axis=1)
+            grouped = {}
+            for effect, representative in zip(effects, representatives):
+                grouped.setdefault(int(representative), []).append(effect)
+            chains = list(grouped.values())
+
+        # Sinal de cada membro relativo ao primeiro da cadeia: sinal da palavra primeiro ^ membro
+        word_signs = {int(word): int(sign) for word, sign in zip(self._words, self._signs)}
+        result = []
+        for members in chains:
+            members = sorted((int(mask) for mask in members), key=lambda mask: (int(_popcount(mask)), mask))
+            result.append(tuple((mask, word_signs[members[0] ^ mask]) for mask in members))
+        return sorted(result, key=lambda chain: (int(_popcount(chain[0][0])), chain[0][0]))
+
+    # "I = ABCE = BCDF = ADEF"
+    def defining_relation_name(self):
+        return " = ".join(["I"] + [word_name(word, sign) for word, sign in self.defining_relation])
+
+    def alias_chain_names(self, max_order=2):
+        return [" = ".join(word_name(mask, sign) for mask, sign in chain) for chain in self.alias_chains(max_order)]
+
+    def generator_names(self):
+        base_mask = (1 << self.n_base_factors) - 1
+        return tuple(f"{word_name(word & ~base_mask)}={word_name(word & base_mask, sign)}"
+                     for word, sign in self.generators)
+
+    # Matriz codificada (2^(k-p), k) em ordem padrão (o primeiro fator alterna a cada corrida)
+    def design_matrix(self):
+        runs = np.arange(self.n_runs)[:, None]
+        matrix = np.empty((self.n_runs, self.n_factors))
+        matrix[:, :self.n_base_factors] = np.where(runs >> np.arange(self.n_base_factors) & 1, 1.0, -1.0)
+        for word, sign in self.generators:
+            added = (word & ~((1 << self.n_base_factors) - 1)).bit_length() - 1
+            base_columns = [j for j in range(self.n_base_factors) if word >> j & 1]
+            matrix[:, added] = sign * matrix[:, base_columns].prod(axis=1)
+        return matrix
+
+
+# Colunas candidatas a gerador: interações (ordem >= 2) dos fatores base, por ordem e depois por máscara
+def _candidate_columns(n_base_factors):
+    columns = np.arange(1, 2 ** n_base_factors, dtype=np.int64)
+    columns = columns[_popcount(columns) >= 2]
+    return columns[np.lexsort((columns, _popcount(columns)))]
+
+
+# Todos os conjuntos de p colunas, em lotes; devolve as colunas do melhor conjunto
+def _exhaustive_search(candidates, n_generators, n_base_factors, n_factors):
+    added_bits = np.int64(1) << np.arange(n_base_factors, n_factors, dtype=np.int64)
+    batch_size = max(1, _BATCH_WORDS // 2 ** n_generators)
+    combinations = itertools.combinations(range(len(candidates)), n_generators)
+    best_counts, best_columns = None, None
+    while True:
+        batch = np.array(list(itertools.islice(combinations, batch_size)), dtype=np.int64)
+        if len(batch) == 0:
+            return best_columns
+        words = candidates[batch] | added_bits
+        counts = _word_length_counts(_span(words)[:, 1:], n_factors)
+        best = _lexicographic_argmin(counts)
+        if best_counts is None or _lexicographic_argmin(np.vstack([best_counts, counts[best]])) == 1:
+            best_counts, best_columns = counts[best], candidates[batch[best]]
+
+
+# Invariante a permutações dos fatores, para um bloco de planejamentos `words` (B, W): por fator,
+# quantas palavras de cada comprimento o contêm, com as linhas dos fatores em ordem lexicográfica
+# (a soma das linhas dá o WLP). Evita que o feixe se encha de cópias isomorfas do mesmo planejamento.
+def _isomorphism_signatures(words, n_factors):
+    lengths = _popcount(words)
+    membership = (words[:, None, :] >> np.arange(n_factors)[None, :, None]) & 1
+    one_hot = lengths[:, :, None] == np.arange(n_factors + 1)
+    # (B, k, W) @ (B, W, k + 1): contagens exatas em float64, pela multiplicação de matrizes em lote
+    per_factor = np.matmul(membership.astype(float), one_hot.astype(float)).astype(np.int64)
+    # Posto lexicográfico de cada linha no bloco (linhas iguais podem ficar em qualquer ordem entre si,
+    # pois são idênticas), depois as linhas de cada planejamento nessa ordem
+    rows = per_factor.reshape(-1, n_factors + 1)
+    ranks = np.empty(len(rows), dtype=np.int64)
+    ranks[np.lexsort(rows[:, ::-1].T)] = np.arange(len(rows))
+    order = np.argsort(ranks.reshape(len(words), n_factors), axis=1)
+    return [signature.tobytes() for signature in np.take_along_axis(per_factor, order[:, :, None], axis=1)]
+
+
+# Busca em feixe: acrescenta um gerador por vez, mantendo os `beam_width` planejamentos parciais
+# não isomorfos de menor WLP. O feixe fica em arrays (colunas escolhidas, relação de definição e
+# contagens por comprimento), e as assinaturas são calculadas em blocos de expansões, na ordem do WLP,
+# até completar o feixe.
+def _beam_search(candidates, n_generators, n_base_factors, n_factors, beam_width):
+    beam_columns = np.zeros((1, 0), dtype=np.int64)
+    beam_words = np.zeros((1, 1), dtype=np.int64)
+    beam_counts = np.zeros((1, n_factors + 1), dtype=np.int64)
+    for step in range(n_generators):
+        added_bit = np.int64(1) << (n_base_factors + step)
+        parents, columns, new_words, new_counts = [], [], [], []
+        for parent, (used, words, counts) in enumerate(zip(beam_columns, beam_words, beam_counts)):
+            unused = candidates[~np.isin(candidates, used)]
+            expanded_words = words[None, :] ^ (unused | added_bit)[:, None]
+            parents.append(np.full(len(unused), parent))
+            columns.append(unused)
+            new_words.append(expanded_words)
+            new_counts.append(counts + _word_length_counts(expanded_words, n_factors))
+        parents, columns = np.concatenate(parents), np.concatenate(columns)
+        new_words, new_counts = np.vstack(new_words), np.vstack(new_counts)
+
+        order = np.lexsort(new_counts[:, ::-1].T)
+        kept, seen = [], set()
+        for start in range(0, len(order), _SIGNATURE_BLOCK):
+            block = order[start:start + _SIGNATURE_BLOCK]
+            words = np.concatenate([beam_words[parents[block]], new_words[block]], axis=1)
+            for index, signature in zip(block, _isomorphism_signatures(words[:, 1:], n_factors)):
+                if signature not in seen:
+                    seen.add(signature)
+                    kept.append(index)
+                    if len(kept) == beam_width:
+                        break
+            if len(kept) == beam_width:
+                break
+
+        kept = np.array(kept)
+        beam_columns = np.column_stack([beam_columns[parents[kept]], columns[kept]])
+        beam_words = np.concatenate([beam_words[parents[kept]], new_words[kept]], axis=1)
+        beam_counts = new_counts[kept]
+    return beam_columns[0]
+
+
+# Planejamento de aberração mínima com `n_factors` fatores em `n_runs` corridas (potência de 2).
+# Exato quando há até `exhaustive_limit` conjuntos de geradores; caso contrário, busca em feixe.
+def minimum_aberration_design(n_factors, n_runs, beam_width=DEFAULT_BEAM_WIDTH,
+                              exhaustive_limit=EXHAUSTIVE_SEARCH_LIMIT):
+    n_base_factors = int(n_runs).bit_length() - 1
+    if n_runs < 2 or 2 ** n_base_factors != n_runs:
+        raise ValueError("O número de corridas deve ser uma potência de 2")
+    if n_base_factors > n_factors:
+        raise ValueError(f"{n_runs} corridas excedem o fatorial completo de {n_factors} fatores")
+    n_generators = n_factors - n_base_factors
+    if n_factors > n_runs - 1:
+        raise ValueError(f"{n_runs} corridas comportam no máximo {n_runs - 1} fatores")
+    if n_generators == 0:
+        return FractionalFactorialDesign(n_factors)
+
+    candidates = _candidate_columns(n_base_factors)
+    if math.comb(len(candidates), n_generators) <= exhaustive_limit:
+        columns = _exhaustive_search(candidates, n_generators, n_base_factors, n_factors)
+    else:
+        columns = _beam_search(candidates, n_generators, n_base_factors, n_factors, beam_width)
+    added_bits = 1 << np.arange(n_base_factors, n_factors)
+    return FractionalFactorialDesign(n_factors, [int(column | bit) for column, bit in zip(columns, added_bits)])
@@ -0,0 +1,166 @@
+"""Estimação de efeitos de planejamentos 2^(k-p) pelo algoritmo de Yates (Walsh–Hadamard rápida).
+
+As corridas são reordenadas para a ordem padrão dos fatores base (k - p colunas que formam um
+fatorial completo, detectadas automaticamente) e a transformada de Walsh–Hadamard é aplicada no
+próprio array, em O(N log N), a todas as respostas de uma vez. Cada contraste estima uma cadeia de
+confundimento; o efeito é rotulado pelo membro de menor ordem da cadeia, com o sinal corrigido
+pela relação de definição.
+
+A significância segue o método de Lenth (1989): pseudo erro padrão (PSE) a partir da mediana dos
+efeitos, margem de erro (ME) e margem simultânea (SME) pela distribuição t com m/3 graus de
+liberdade. Os quantis vêm de scipy.stats, importado sob demanda.
+"""
+import numpy as np
+
+from doe_pff.design import _popcount, _span, word_name
+
+LENTH_CONFIDENCE = 0.95
+
+
+# Transformada de Walsh–Hadamard no próprio array, ao longo do eixo 0 (tamanho 2^q, C-contíguo).
+# Com as corridas em ordem padrão (bit j da corrida = nível alto do fator base j), a posição b do
+# resultado é o contraste Σ y · Π x_j dos fatores base presentes na máscara b; a posição 0 é a soma.
+def fwht(values):
+    n_rows = values.shape[0]
+    if n_rows & (n_rows - 1) or not values.flags.c_contiguous:
+        raise ValueError("A transformada exige um array C-contíguo com 2^q linhas")
+    half = 1
+    while half < n_rows:
+        blocks = values.reshape(n_rows // (2 * half), 2, half, *values.shape[1:])
+        low, high = blocks[:, 0], blocks[:, 1]
+        high -= low  # contraste: nível alto - nível baixo
+        low *= 2
+        low += high  # soma: 2 * baixo + (alto - baixo)
+        half *= 2
+    return values
+
+
+# Detecta os fatores base e a ordem padrão das corridas de uma matriz codificada (N, k) em -1/+1.
+# Devolve (colunas base, posição de cada corrida na ordem padrão, palavras e sinais da relação de
+# definição com os bits nas posições originais das colunas).
+def _regular_structure(design_matrix):
+    n_runs, n_factors = design_matrix.shape
+    n_base_factors = n_runs.bit_length() - 1
+    if n_runs < 2 or 2 ** n_base_factors != n_runs:
+        raise ValueError("O número de corridas deve ser uma potência de 2")
+    if not np.isin(design_matrix, (-1.0, 1.0)).all():
+        raise ValueError("A matriz do planejamento deve estar codificada em -1/+1")
+
+    high = design_matrix > 0
+    base_columns, positions = [], np.zeros(n_runs, dtype=np.int64)
+    # Uma coluna é base se dobrar o número de combinações distintas das colunas já escolhidas
+    for j in range(n_factors):
+        candidate = positions | high[:, j].astype(np.int64) << len(base_columns)
+        if len(np.unique(candidate)) == 2 ** (len(base_columns) + 1):
+            base_columns.append(j)
+            positions = candidate
+            if len(base_columns) == n_base_factors:
+                break
+    if len(base_columns) < n_base_factors:
+        raise ValueError("As corridas não formam um planejamento 2^(k-p) regular (há corridas repetidas?)")
+
+    # Cada coluna adicional deve ser ± o produto de fatores base: sua transformada tem um único termo
+    generator_words, generator_signs = [], []
+    for j in sorted(set(range(n_factors)) - set(base_columns)):
+        column = np.empty(n_runs)
+        column[positions] = design_matrix[:, j]
+        contrast = fwht(column) / n_runs
+        base_mask = int(np.argmax(np.abs(contrast)))
+        if not np.isclose(abs(contrast[base_mask]), 1.0):
+            raise ValueError(f"A coluna {word_name(1 << j)} não é um produto dos fatores base: planejamento não regular")
+        generator_words.append(_expand_mask(base_mask, base_columns) | 1 << j)
+        generator_signs.append(int(np.sign(contrast[base_mask])))
+
+    words = _span(np.array(generator_words, dtype=np.int64))
+    signs = 1 - 2 * (_span((np.array(generator_signs, dtype=np.int64) < 0).astype(np.int64)) & 1)
+    return base_columns, positions, words, signs
+
+
+# Máscara sobre os fatores base (bit i = i-ésimo fator base) -> máscara nas posições originais
+def _expand_mask(masks, base_columns):
+    masks = np.asarray(masks, dtype=np.int64)
+    expanded = np.zeros_like(masks)
+    for i, column in enumerate(base_columns):
+        expanded |= ((masks >> i) & 1) << column
+    return expanded
+
+
+# Estima todos os efeitos de uma tabela de corridas 2^(k-p).
+#   design_matrix: (N, k) em -1/+1, corridas em qualquer ordem
+#   responses: (N,) ou (N, r) — todas as respostas são transformadas juntas
+# Devolve um dicionário com os 2^(k-p) - 1 contrastes ordenados por ordem do efeito e letra:
+#   effect (máscara do efeito de menor ordem da cadeia), name, alias_chain, order,
+#   estimate (m,) ou (m, r) = média no nível alto - média no nível baixo, e mean (média geral)
+def estimate_effects(design_matrix, responses):
+    design_matrix = np.asarray(design_matrix, dtype=float)
+    responses = np.asarray(responses, dtype=float)
+    if responses.shape[0] != design_matrix.shape[0]:
+        raise ValueError("A matriz do planejamento e as respostas devem ter o mesmo número de corridas")
+    n_runs = design_matrix.shape[0]
+    base_columns, positions, words, signs = _regular_structure(design_matrix)
+
+    # Reordena para a ordem padrão num array novo e contíguo, que a transformada sobrescreve
+    contrasts = np.empty(responses.shape)
+    contrasts[positions] = responses
+    fwht(contrasts)
+
+    # Cadeias ordenadas por ordem do efeito e máscara (chave ordem * 2^k + máscara): o primeiro
+    # membro de cada cadeia é o efeito que dá nome ao contraste
+    n_factors = design_matrix.shape[1]
+    chains = _expand_mask(np.arange(1, n_runs), base_columns)[:, None] ^ words[None, :]
+    chain_order = np.argsort(_popcount(chains) << n_factors | chains, axis=1)
+    chains = np.take_along_axis(chains, chain_order, axis=1)
+    # Com I = s·W, a coluna do efeito (contraste ^ W) é s vezes a coluna do contraste; os sinais da
+    # cadeia ficam relativos ao seu primeiro membro
+    chain_signs = signs[chain_order]
+    chain_signs *= chain_signs[:, :1]
+    leaders = chains[:, 0]
+
+    estimates = contrasts[1:] * 2 / n_runs
+    estimates *= signs[chain_order[:, 0]].reshape(-1, *([1] * (estimates.ndim - 1)))
+    orders = _popcount(leaders)
+    order = np.argsort(orders << n_factors | leaders)
+    return {
+        "effect": leaders[order],
+        "name": [word_name(int(mask)) for mask in leaders[order]],
+        "alias_chain": [" = ".join(word_name(int(mask), int(sign)) for mask, sign in zip(chains[i], chain_signs[i]))
+                        for i in order],
+        "order": orders[order],
+        "estimate": estimates[order],
+        "mean": contrasts[0] / n_runs,
+    }
+
+
+# Método de Lenth para efeitos (m,) ou (m, r): PSE, margem de erro (ME), margem simultânea (SME)
+# e máscara de efeitos significativos (|efeito| > ME), por resposta
+def lenth_significance(estimates, confidence=LENTH_CONFIDENCE):
+    from scipy.stats import t
+
+    estimates = np.asarray(estimates, dtype=float)
+    magnitudes = np.abs(estimates)
+    n_effects = magnitudes.shape[0]
+    s0 = 1.5 * np.median(magnitudes, axis=0)
+    # Efeitos muito grandes (provavelmente ativos) saem da mediana do PSE: como são os maiores, a
+    # mediana aparada é a dos n_kept primeiros valores ordenados (PSE = 0 se nenhum sobra)
+    ordered = np.sort(magnitudes.reshape(n_effects, -1), axis=0)
+    n_kept = (magnitudes < 2.5 * s0).sum(axis=0).reshape(-1)
+    columns = np.arange(ordered.shape[1])
+    trimmed_median = (ordered[np.maximum(n_kept - 1, 0) // 2, columns] + ordered[n_kept // 2, columns]) / 2
+    pse = np.where(n_kept > 0, 1.5 * trimmed_median, 0.0).reshape(s0.shape)
+    degrees_of_freedom = n_effects / 3
+    gamma = (1 + confidence ** (1 / n_effects)) / 2
+    margin_of_error = t.ppf((1 + confidence) / 2, degrees_of_freedom) * pse
+    simultaneous_margin = t.ppf(gamma, degrees_of_freedom) * pse
+    return {
+        "pse": pse,
+        "me": margin_of_error,
+        "sme": simultaneous_margin,
+        "significant": magnitudes > margin_of_error,
+    }
+
+
+# Quantis da meia-normal para o gráfico de efeitos ordenados por |efeito| (m pontos)
+def half_normal_quantiles(n_effects):
+    from scipy.stats import norm
+
+    return norm.ppf(0.5 + 0.5 * (np.arange(1, n_effects + 1) - 0.5) / n_effects)
@@ -0,0 +1,251 @@
+"""Gráficos Plotly da página, sem dependência do Streamlit.
+
+Montam as figuras de perturbação do IAT, da interação A x D na viscosidade e do comparativo de
+desgaste a partir da tabela pré-calculada (doe_pff.lookup), e as da otimização, das superfícies de
+resposta, da sensibilidade, dos efeitos e da cesta de cenários a partir das tabelas de
+doe_pff.tables. A interface (est.py) guarda as figuras em cache; relatórios e benchmarks podem
+chamá-las diretamente. Diferente dos módulos de modelos do pacote, este importa pandas e Plotly, e
+por isso não é carregado por `import doe_pff`.
+"""
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+from doe_pff.coding import FACTOR_LEVELS, FACTORS, NUMERICAL_SCALES
+from doe_pff.effects import half_normal_quantiles
+from doe_pff.lookup import level_indices
+from doe_pff.tables import RESPONSE_LABELS, RESPONSE_NAMES, SCENARIO_RESPONSE_COLUMNS
+
+
+# Perturbação do IAT a partir das séries: `perturbation` (6, 2) com o IAT de cada fator no nível mais
+# baixo e no mais alto, `iat_current` o IAT da seleção e `current_labels` os níveis selecionados (texto).
+# Os traços são criados de uma vez (go.Figure(data=...)), o que evita a revalidação da figura a
+# cada add_trace.
+def perturbation_series_figure(perturbation, iat_current, current_labels):
+    # Cada fator variado do nível mais baixo ao mais alto (ou entre categorias), com os demais fixos
+    traces = [go.Scatter(x=[str(levels[0]), str(levels[-1])], y=predicted, mode='lines+markers',
+                         name=f"{factor_name} ({letter})", marker=dict(size=8))
+              for (letter, factor_name, _, levels), predicted in zip(FACTORS, np.asarray(perturbation))]
+
+    # Adicionar o ponto da seleção atual para cada linha, no nível selecionado de cada fator
+    for (letter, _, _, _), label in zip(FACTORS, current_labels):
+        traces.append(go.Scatter(
+            x=[label],
+            y=[iat_current],
+            mode='markers',
+            marker=dict(color='black', size=10, symbol='x'),
+            name=f"Seleção Atual ({letter})",
+            showlegend=False  # Não mostrar na legenda principal para evitar repetição
+        ))
+
+    fig_perturbation = go.Figure(data=traces)
+    fig_perturbation.update_layout(
+        xaxis_title="Nível do Fator (Mínimo/Máximo ou Categoria)",
+        yaxis_title="Acidez Predita (mg KOH/g)",
+        title="Gráfico de Perturbação para Índice de Acidez (IAT)",
+        legend_title="Fator",
+        hovermode="x unified"
+    )
+    return fig_perturbation
+
+
+# Perturbação do IAT na combinação `state` de uma DiscreteLookupTable: as séries vêm prontas da tabela
+def perturbation_figure(lookup, state):
+    current_labels = [str(levels[level]) for (_, _, _, levels), level in zip(FACTORS, level_indices(state))]
+    return perturbation_series_figure(lookup.perturbation[state], lookup.iat[state], current_labels)
+
+
+# Interação A x D a partir dos pontos: `viscosity_points` (2, 2) com a viscosidade para A em
+# [baixo, alto] x D em [mínimo, máximo]. viscosity_interval = (inferior, superior), cada um (2, 2),
+# adiciona as barras de erro do intervalo de 95%.
+def interaction_points_figure(viscosity_points, viscosity_interval=None):
+    levels_a, levels_d = FACTOR_LEVELS["A"], FACTOR_LEVELS["D"]
+    viscosity_points = np.ravel(viscosity_points)
+    df_interaction = pd.DataFrame({
+        "Tipo de Antioxidante": np.repeat([levels_a[0], levels_a[-1]], 2),
+        "Quantidade de Antidesgaste": np.tile([levels_d[0], levels_d[-1]], 2),
+        "Viscosidade Predita": viscosity_points,
+    })
+
+    error_columns = {}
+    if viscosity_interval is not None:
+        viscosity_lower, viscosity_upper = (np.ravel(bound) for bound in viscosity_interval)
+        df_interaction["IC 95% (superior)"] = viscosity_upper - viscosity_points
+        df_interaction["IC 95% (inferior)"] = viscosity_points - viscosity_lower
+        error_columns = {"error_y": "IC 95% (superior)", "error_y_minus": "IC 95% (inferior)"}
+
+    fig_interaction = px.line(df_interaction, x="Quantidade de Antidesgaste", y="Viscosidade Predita",
+                              color="Tipo de Antioxidante", markers=True,
+                              title="Interação A x D para Viscosidade (Qualitativo)",
+                              hover_data={"Quantidade de Antidesgaste": True, "Viscosidade Predita": ':.2f',
+                                          "Tipo de Antioxidante": True},
+                              **error_columns)
+    fig_interaction.update_layout(
+        xaxis_title="Quantidade de Antidesgaste (% peso)",
+        yaxis_title="Viscosidade Predita (cSt)",
+        legend_title="Tipo de Antioxidante",
+        hovermode="x unified"
+    )
+    return fig_interaction
+
+
+# Pontos da interação A x D (A e D nos extremos, demais fatores na combinação `state`) lidos da tabela.
+# Com `replicates` (saída de replicate_lookup), cada ponto é a média das réplicas, com barras de erro
+# do intervalo de 95%.
+def interaction_figure(lookup, state, replicates=None):
+    if replicates is None:
+        return interaction_points_figure(lookup.interaction[state])
+    points = lookup.interaction_states[state]
+    viscosity_mean, viscosity_lower, viscosity_upper = (values[points] for values in replicates["viscosity"])
+    return interaction_points_figure(viscosity_mean, (viscosity_lower, viscosity_upper))
+
+
+# Comparativo de desgaste: óleo base, média observada e o desgaste predito para a seleção (C e D).
+# desgaste_interval = (inferior, superior) adiciona a barra de erro do modo de réplicas à seleção atual.
+def desgaste_figure(selected_tipo_antidesgaste, selected_quant_antidesgaste, desgaste_predicted,
+                    desgaste_interval=None):
+    desgaste_comparison_data = [
+        {"Condição": "Óleo Base sem Aditivo Antidesgaste", "Desgaste (mm)": 0.771},
+        {"Condição": "Com Aditivo Antidesgaste (Média Observada)", "Desgaste (mm)": 0.409},
+        {"Condição": f"Sua Seleção: {selected_tipo_antidesgaste} ({selected_quant_antidesgaste}%)",
+         "Desgaste (mm)": desgaste_predicted}
+    ]
+    df_desgaste_comparison = pd.DataFrame(desgaste_comparison_data)
+
+    error_columns = {}
+    if desgaste_interval is not None:
+        df_desgaste_comparison["IC 95% (superior)"] = [0.0, 0.0, desgaste_interval[1] - desgaste_predicted]
+        df_desgaste_comparison["IC 95% (inferior)"] = [0.0, 0.0, desgaste_predicted - desgaste_interval[0]]
+        error_columns = {"error_y": "IC 95% (superior)", "error_y_minus": "IC 95% (inferior)"}
+
+    fig_desgaste = px.bar(df_desgaste_comparison, x="Condição", y="Desgaste (mm)",
+                          title="Comparativo de Desgaste (Qualitativo)",
+                          color="Condição",
+                          **error_columns,
+                          color_discrete_map={
+                              "Óleo Base sem Aditivo Antidesgaste": "red",
+                              "Com Aditivo Antidesgaste (Média Observada)": "lightgray",
+                              f"Sua Seleção: {selected_tipo_antidesgaste} ({selected_quant_antidesgaste}%)": "blue"
+                          })
+    fig_desgaste.update_layout(yaxis_title="Desgaste (mm)")
+    return fig_desgaste
+
+
+# --- Otimização, Superfícies e Sensibilidade ---
+# Formulações viáveis no plano desgaste x IAT (tabela de doe_pff.tables.optimization_table), com a
+# fronteira de Pareto destacada e o tamanho do ponto pela desejabilidade
+def pareto_figure(df_optimization):
+    fig_pareto = px.scatter(df_optimization, x="Desgaste (mm)", y="Acidez Predita",
+                            color="Fronteira de Pareto", symbol="Busca", size="Desejabilidade",
+                            title="Formulações Viáveis: IAT vs. Desgaste",
+                            color_discrete_map={"Sim": "blue", "Não": "lightgray"},
+                            hover_data=list(df_optimization.columns))
+    fig_pareto.update_layout(
+        xaxis_title="Desgaste Predito (mm)",
+        yaxis_title="Acidez Predita (mg KOH/g)",
+        legend_title="Fronteira de Pareto / Busca"
+    )
+    return fig_pareto
+
+
+# Eixo do gráfico em valores reais; fatores categóricos ficam nos códigos -1/+1 com o nome do nível
+def surface_axis_layout(factor_index, coded_axis):
+    letter, factor_name, factor_type, levels = FACTORS[factor_index]
+    axis_layout = {"title": f"{factor_name} ({letter})"}
+    if factor_type == "categorical":
+        axis_layout.update(tickvals=[-1, 1], ticktext=list(levels))
+        return coded_axis, axis_layout
+    center, half_range = NUMERICAL_SCALES[factor_name]
+    return center + half_range * coded_axis, axis_layout
+
+
+# Superfície (plot_type "Superfície 3D") ou contorno da resposta sobre a grade (x_axis, y_axis, z) de
+# doe_pff.surface, com os eixos dos fatores x_index e y_index em valores reais
+def surface_figure(response, x_index, y_index, x_axis, y_axis, z, plot_type):
+    x_values, x_layout = surface_axis_layout(x_index, x_axis)
+    y_values, y_layout = surface_axis_layout(y_index, y_axis)
+    label = RESPONSE_LABELS[response]
+
+    if plot_type == "Superfície 3D":
+        fig_surface = go.Figure(go.Surface(x=x_values, y=y_values, z=z, colorscale="Viridis",
+                                           colorbar=dict(title=label)))
+        fig_surface.update_layout(scene=dict(xaxis=x_layout, yaxis=y_layout, zaxis=dict(title=label)),
+                                  height=600)
+    else:
+        fig_surface = go.Figure(go.Contour(x=x_values, y=y_values, z=z, colorscale="Viridis",
+                                           contours=dict(showlabels=True), colorbar=dict(title=label)))
+        fig_surface.update_layout(xaxis=x_layout, yaxis=y_layout)
+    fig_surface.update_layout(title=f"Superfície de Resposta: {RESPONSE_NAMES[response]}")
+    return fig_surface
+
+
+# Índices de Sobol (tabela de doe_pff.tables.sensitivity_table): barras agrupadas, um painel por resposta
+def sensitivity_figure(df_sensitivity):
+    fig_sensitivity = px.bar(df_sensitivity.melt(id_vars=["Resposta", "Fator"], var_name="Índice", value_name="Valor"),
+                             x="Fator", y="Valor", color="Índice", facet_col="Resposta", barmode="group",
+                             title="Índices de Sobol por Fator e Resposta")
+    fig_sensitivity.for_each_annotation(lambda annotation: annotation.update(text=annotation.text.split("=")[-1]))
+    fig_sensitivity.update_layout(yaxis_title="Fração da Variância", legend_title="Índice", height=500)
+    fig_sensitivity.update_xaxes(title_text="", tickangle=-45)
+    return fig_sensitivity
+
+
+# --- Efeitos ---
+# Gráfico meia-normal (|efeito| ordenado vs. quantil) ou de Pareto dos efeitos de uma resposta (linhas
+# de doe_pff.tables.effects_tables), com as margens ME e SME de Lenth
+def effects_figure(df_response, lenth_limits, plot_type, max_pareto_effects=30):
+    df_response = df_response.assign(Magnitude=df_response["Estimativa"].abs()).sort_values("Magnitude")
+    color_map = {"Sim": "red", "Não": "gray"}
+    if plot_type == "Meia-normal":
+        df_response["Quantil Meia-Normal"] = half_normal_quantiles(len(df_response))
+        fig_effects = px.scatter(df_response, x="Magnitude", y="Quantil Meia-Normal", color="Significativo (Lenth)",
+                                 color_discrete_map=color_map, hover_data=["Efeito", "Cadeia de Confundimento", "Estimativa"],
+                                 text=np.where(df_response["Significativo (Lenth)"] == "Sim", df_response["Efeito"], ""),
+                                 title="Gráfico Meia-Normal dos Efeitos")
+        fig_effects.update_traces(textposition="middle left")
+        fig_effects.update_layout(xaxis_title="|Efeito|", yaxis_title="Quantil da Meia-Normal")
+    else:
+        df_pareto = df_response.tail(max_pareto_effects)
+        fig_effects = px.bar(df_pareto, x="Magnitude", y="Efeito", orientation="h", color="Significativo (Lenth)",
+                             color_discrete_map=color_map, hover_data=["Cadeia de Confundimento", "Estimativa"],
+                             title=f"Gráfico de Pareto dos Efeitos ({len(df_pareto)} maiores)")
+        fig_effects.update_layout(xaxis_title="|Efeito|", yaxis_title="Efeito",
+                                  yaxis=dict(categoryorder="array", categoryarray=df_pareto["Efeito"].tolist()))
+    fig_effects.add_vline(x=lenth_limits["ME"], line_dash="dash", line_color="orange",
+                          annotation_text=f"ME = {lenth_limits['ME']:.3g}")
+    fig_effects.add_vline(x=lenth_limits["SME"], line_dash="dot", line_color="red",
+                          annotation_text=f"SME = {lenth_limits['SME']:.3g}", annotation_position="bottom right")
+    fig_effects.update_layout(legend_title="Significativo (Lenth)")
+    return fig_effects
+
+
+# --- Cesta de Cenários ---
+# Todos os cenários sobrepostos no plano IAT x viscosidade, coloridos pelo desgaste. `current`
+# ({resposta: valor}) marca a formulação selecionada na sidebar.
+def scenario_scatter_figure(df_scenarios, current=None):
+    iat_column, viscosity_column, desgaste_column = SCENARIO_RESPONSE_COLUMNS.values()
+    fig_scenarios = px.scatter(df_scenarios, x=iat_column, y=viscosity_column, color=desgaste_column,
+                               hover_name="Cenário", color_continuous_scale="RdYlGn_r",
+                               title="Cenários: IAT vs. Viscosidade (cor: desgaste)")
+    fig_scenarios.update_traces(marker=dict(size=10, line=dict(width=1, color="white")))
+    if current is not None:
+        fig_scenarios.add_trace(go.Scatter(x=[current["iat"]], y=[current["viscosity"]], mode="markers",
+                                           marker=dict(symbol="star", size=16, color="black"),
+                                           name="Seleção Atual (sidebar)"))
+    fig_scenarios.update_layout(xaxis_title=iat_column, yaxis_title=viscosity_column,
+                                legend=dict(orientation="h", y=-0.2))
+    return fig_scenarios
+
+
+# Comparação lado a lado: uma barra por cenário em cada resposta (painéis com escalas próprias)
+def scenario_comparison_figure(df_scenarios):
+    df_long = df_scenarios.melt(id_vars="Cenário", value_vars=list(SCENARIO_RESPONSE_COLUMNS.values()),
+                                var_name="Resposta", value_name="Valor")
+    fig_comparison = px.bar(df_long, x="Valor", y="Cenário", color="Cenário", facet_col="Resposta",
+                            orientation="h", title="Comparação dos Cenários Selecionados")
+    fig_comparison.update_xaxes(matches=None, title_text="")
+    fig_comparison.update_yaxes(categoryorder="array", categoryarray=df_scenarios["Cenário"].tolist()[::-1])
+    fig_comparison.for_each_annotation(lambda annotation: annotation.update(text=annotation.text.split("=")[-1]))
+    fig_comparison.update_layout(showlegend=False, height=max(300, 60 + 28 * len(df_scenarios)))
+    return fig_comparison
@@ -0,0 +1,215 @@
+"""Ajuste do modelo de IAT a partir dos ensaios do laboratório.
+
+Monta a matriz do modelo para um conjunto escolhido de efeitos principais e interações e estima
+coeficientes, erros padrão e R² por mínimos quadrados. O ajuste é mantido na forma fatorada
+[R | Qᵀy] da decomposição QR e atualizado a cada novo ensaio com rotações de Givens (atualização
+de posto um, O(p²) por ensaio), sem refazer o ajuste desde o início. A soma dos quadrados dos
+resíduos sai da própria atualização. LabRuns guarda os ensaios e reaproveita o ajuste enquanto os
+termos escolhidos não mudam.
+"""
+import itertools
+
+import numpy as np
+
+from doe_pff.coding import FACTOR_LETTERS
+from doe_pff.models import IAT_TERMS
+
+# Termos da equação do artigo (índices dos fatores A..F; () é o intercepto)
+PAPER_TERMS = tuple(factor_indices for factor_indices, _ in IAT_TERMS)
+# Termos candidatos: intercepto, efeitos principais, interações de 2 fatores e as de 3 fatores do artigo
+CANDIDATE_TERMS = (
+    ((),)
+    + tuple((j,) for j in range(len(FACTOR_LETTERS)))
+    + tuple(itertools.combinations(range(len(FACTOR_LETTERS)), 2))
+    + tuple(term for term in PAPER_TERMS if len(term) == 3)
+)
+
+
+# "BF" -> (1, 5); "" ou "Intercepto" -> ()
+def parse_term(name):
+    if name in ("", "Intercepto"):
+        return ()
+    return tuple(sorted(FACTOR_LETTERS.index(letter) for letter in name.upper()))
+
+
+# (1, 5) -> "BF"; () -> "Intercepto"
+def term_name(factor_indices):
+    return "".join(FACTOR_LETTERS[j] for j in factor_indices) or "Intercepto"
+
+
+# Matriz do modelo (N, p): uma coluna por termo, produto dos fatores codificados (1 para o intercepto)
+def model_matrix(coded_factors, terms):
+    coded_factors = np.atleast_2d(np.asarray(coded_factors, dtype=float))
+    matrix = np.ones((coded_factors.shape[0], len(terms)))
+    for k, factor_indices in enumerate(terms):
+        for j in factor_indices:
+            matrix[:, k] *= coded_factors[:, j]
+    return matrix
+
+
+class IncrementalLeastSquares:
+    # Mínimos quadrados com atualização incremental da fatoração QR.
+    # O estado é a matriz aumentada [R | Qᵀy] (p x (p + 1)), a soma dos quadrados dos resíduos e as
+    # somas de y e y² (para o R²); os ensaios em si não precisam ser guardados.
+    def __init__(self, terms=PAPER_TERMS):
+        self.terms = tuple(tuple(factor_indices) for factor_indices in terms)
+        if () not in self.terms:
+            raise ValueError("O modelo precisa incluir o intercepto")
+        n_terms = len(self.terms)
+        self._r_augmented = np.zeros((n_terms, n_terms + 1))
+        self.residual_sum_of_squares = 0.0
+        self.n_runs = 0
+        self._sum_y = 0.0
+        self._sum_y_squared = 0.0
+
+    @property
+    def n_terms(self):
+        return len(self.terms)
+
+    # Atualização de posto um: incorpora um ensaio (6 fatores codificados, IAT medido) com rotações
+    # de Givens que anulam a nova linha contra R
+    def append_run(self, coded_run, response):
+        row = np.append(model_matrix(coded_run, self.terms)[0], float(response))
+        r_augmented = self._r_augmented
+        for k in range(self.n_terms):
+            if row[k] == 0.0:
+                continue
+            radius = np.hypot(r_augmented[k, k], row[k])
+            cos, sin = r_augmented[k, k] / radius, row[k] / radius
+            r_row = r_augmented[k, k:].copy()
+            r_augmented[k, k:] = cos * r_row + sin * row[k:]
+            row[k:] = cos * row[k:] - sin * r_row
+        # O que sobra da resposta após as rotações é o resíduo desse ensaio no novo ajuste
+        self.residual_sum_of_squares += row[-1] ** 2
+        self.n_runs += 1
+        self._sum_y += float(response)
+        self._sum_y_squared += float(response) ** 2
+
+    # Vários ensaios de uma vez: uma QR de [R | Qᵀy; 0 | √RSS; X | y], equivalente às atualizações
+    # de posto um em sequência, porém vetorizada
+    def append_runs(self, coded_runs, responses):
+        responses = np.asarray(responses, dtype=float)
+        if len(responses) == 0:
+            return
+        stacked = np.vstack([
+            self._r_augmented,
+            np.append(np.zeros(self.n_terms), np.sqrt(self.residual_sum_of_squares)),
+            np.column_stack([model_matrix(coded_runs, self.terms), responses]),
+        ])
+        triangular = np.linalg.qr(stacked, mode="r")
+        self._r_augmented = triangular[:self.n_terms]
+        self.residual_sum_of_squares = float(triangular[self.n_terms, self.n_terms] ** 2)
+        self.n_runs += len(responses)
+        self._sum_y += float(responses.sum())
+        self._sum_y_squared += float((responses ** 2).sum())
+
+    @property
+    def is_estimable(self):
+        diagonal = np.abs(np.diag(self._r_augmented))
+        return self.n_runs >= self.n_terms and diagonal.min() > 1e-10 * max(diagonal.max(), 1.0)
+
+    def _require_estimable(self):
+        if not self.is_estimable:
+            raise ValueError(f"Ensaios insuficientes para estimar {self.n_terms} termos: {self.n_runs} ensaio(s) "
+                             "ou termos confundidos no conjunto atual")
+
+    @property
+    def coefficients(self):
+        self._require_estimable()
+        return np.linalg.solve(self._r_augmented[:, :-1], self._r_augmented[:, -1])
+
+    @property
+    def degrees_of_freedom(self):
+        return self.n_runs - self.n_terms
+
+    @property
+    def residual_std(self):
+        if self.degrees_of_freedom <= 0:
+            return np.nan
+        return np.sqrt(self.residual_sum_of_squares / self.degrees_of_freedom)
+
+    # Erros padrão: s * sqrt(diag((RᵀR)⁻¹)), com (RᵀR)⁻¹ = R⁻¹ R⁻ᵀ
+    @property
+    def standard_errors(self):
+        self._require_estimable()
+        r_inverse = np.linalg.inv(self._r_augmented[:, :-1])
+        return self.residual_std * np.sqrt((r_inverse ** 2).sum(axis=1))
+
+    @property
+    def r_squared(self):
+        total_sum_of_squares = self._sum_y_squared - self._sum_y ** 2 / max(self.n_runs, 1)
+        if total_sum_of_squares <= 0:
+            return np.nan
+        return 1 - self.residual_sum_of_squares / total_sum_of_squares
+
+    @property
+    def r_squared_adjusted(self):
+        if self.degrees_of_freedom <= 0:
+            return np.nan
+        return 1 - (1 - self.r_squared) * (self.n_runs - 1) / self.degrees_of_freedom
+
+    # Termos ajustados no mesmo formato de IAT_TERMS, para uso direto em calculate_iat(..., terms=...)
+    def fitted_terms(self):
+        return tuple(zip(self.terms, (float(c) for c in self.coefficients)))
+
+    # Semiamplitude do intervalo de predição aproximado (t * s), no papel do ± 0.17 do artigo
+    def prediction_error_range(self, confidence=0.95):
+        from scipy.stats import t
+
+        return float(t.ppf((1 + confidence) / 2, self.degrees_of_freedom) * self.residual_std)
+
+    # Tabela de coeficientes: termo, coeficiente, erro padrão, estatística t e valor-p
+    def summary(self):
+        from scipy.stats import t
+
+        coefficients = self.coefficients
+        standard_errors = self.standard_errors
+        t_values = coefficients / standard_errors
+        p_values = 2 * t.sf(np.abs(t_values), self.degrees_of_freedom)
+        return {
+            "term": [term_name(factor_indices) for factor_indices in self.terms],
+            "coefficient": coefficients,
+            "standard_error": standard_errors,
+            "t": t_values,
+            "p_value": p_values,
+        }
+
+
+# Termos a partir dos nomes escolhidos ("BF", ...), sem o intercepto, que é sempre incluído na frente
+def terms_from_names(names):
+    return ((),) + tuple(parse_term(name) for name in names)
+
+
+class LabRuns:
+    # Ensaios do laboratório (fatores codificados (N, 6) e IAT medido (N,)) e o ajuste sobre eles.
+    # Um ensaio adicionado atualiza o ajuste existente com uma rotação de posto um; só uma mudança
+    # nos termos refaz o ajuste a partir de todos os ensaios.
+    def __init__(self, coded_runs=None, responses=None):
+        if coded_runs is None:
+            coded_runs, responses = np.empty((0, len(FACTOR_LETTERS))), np.empty(0)
+        self.coded_runs = np.asarray(coded_runs, dtype=float).reshape(-1, len(FACTOR_LETTERS))
+        self.responses = np.asarray(responses, dtype=float)
+        self._fit = None
+
+    def __len__(self):
+        return len(self.responses)
+
+    # Ajuste com os termos dados, reaproveitado enquanto os termos não mudam
+    def fit(self, terms):
+        terms = tuple(tuple(factor_indices) for factor_indices in terms)
+        if self._fit is None or self._fit.terms != terms:
+            self._fit = IncrementalLeastSquares(terms)
+            self._fit.append_runs(self.coded_runs, self.responses)
+        return self._fit
+
+    def append_run(self, coded_run, response):
+        coded_run = np.asarray(coded_run, dtype=float).reshape(len(FACTOR_LETTERS))
+        self.coded_runs = np.vstack([self.coded_runs, coded_run])
+        self.responses = np.append(self.responses, float(response))
+        if self._fit is not None:
+            self._fit.append_run(coded_run, response)
+
+
+# O ajuste só substitui a equação do artigo quando é estimável e tem graus de liberdade para o erro
+def fit_is_usable(fit):
+    return fit.is_estimable and fit.degrees_of_freedom > 0
@@ -0,0 +1,186 @@
+"""Instrumentação das reexecuções da página: tempo por seção e chamadas aos modelos.
+
+Cada reexecução cria um RerunMetrics, que mede as seções (`with rerun.section("nome"):`) e conta as
+chamadas aos modelos vetorizados feitas durante a reexecução: a primeira reexecução instrumentada
+registra count_model_call como gancho de doe_pff.models (set_model_call_hook), e daí em diante
+calculate_iat_batch, viscosity_trend_batch e desgaste_trend_batch o chamam; ele só registra algo se
+houver uma reexecução ativa na thread (ContextVar). Ao final, a reexecução é somada a um
+MetricsRegistry compartilhado entre as sessões, que guarda uma janela móvel das últimas medições
+de cada seção (percentis) e os totais acumulados, e pode ser gravado em JSON ou no formato texto
+do Prometheus.
+
+Os modelos não dependem deste módulo: sem reexecuções instrumentadas (lote, servidor, workers), o
+gancho nem é registrado. Desligada numa sessão, a instrumentação custa uma consulta à ContextVar por
+chamada de modelo, e as seções usam um gerenciador de contexto nulo compartilhado. Só usa a
+biblioteca padrão e o NumPy.
+"""
+import json
+import os
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+
+import numpy as np
+
+from doe_pff.models import set_model_call_hook
+
+DEFAULT_WINDOW = 1000
+DEFAULT_PERCENTILES = (50, 90, 99)
+DEFAULT_DUMP_INTERVAL = 10.0  # segundos entre gravações automáticas do arquivo de métricas
+PROMETHEUS_EXTENSIONS = (".prom", ".txt")
+METRIC_PREFIX = "doe_pff"
+
+_active_rerun = ContextVar("doe_pff_active_rerun", default=None)
+_NULL_SECTION = nullcontext()
+
+
+# Gancho dos modelos vetorizados: soma uma chamada e as linhas avaliadas à reexecução ativa
+def count_model_call(model, n_rows):
+    rerun = _active_rerun.get()
+    if rerun is not None:
+        rerun.model_calls[model] += 1
+        rerun.model_rows[model] += n_rows
+
+
+class RerunMetrics:
+    # sections: {nome: segundos}; seções repetidas na mesma reexecução são somadas
+    def __init__(self):
+        self.sections = {}
+        self.model_calls = Counter()
+        self.model_rows = Counter()
+        self._start = time.perf_counter()
+        _active_rerun.set(self)
+
+    @contextmanager
+    def section(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.sections[name] = self.sections.get(name, 0.0) + time.perf_counter() - start
+
+    # Encerra a contagem de chamadas e registra o tempo total da reexecução (seção "total")
+    def finish(self):
+        self.sections["total"] = time.perf_counter() - self._start
+        _active_rerun.set(None)
+        return self
+
+
+class _DisabledRerun:
+    sections = {}
+
+    def section(self, name):
+        return _NULL_SECTION
+
+    def finish(self):
+        return self
+
+
+DISABLED_RERUN = _DisabledRerun()
+
+
+# Início de uma reexecução: com enabled=False, devolve um objeto inerte e desliga a contagem na thread
+# (uma reexecução anterior interrompida por st.stop ou st.rerun pode ter deixado a ContextVar ativa)
+def start_rerun(enabled):
+    if enabled:
+        set_model_call_hook(count_model_call)
+        return RerunMetrics()
+    _active_rerun.set(None)
+    return DISABLED_RERUN
+
+
+class MetricsRegistry:
+    # Métricas agregadas de todas as sessões do processo; os métodos podem ser chamados de várias
+    # threads (uma por sessão do Streamlit)
+    def __init__(self, window=DEFAULT_WINDOW):
+        self.window = window
+        self.reruns = 0
+        self._lock = threading.Lock()
+        self._durations = {}  # seção -> deque com as últimas `window` durações (s)
+        self._duration_totals = Counter()
+        self._duration_counts = Counter()
+        self._model_calls = Counter()
+        self._model_rows = Counter()
+        self._last_dump = 0.0
+
+    def record(self, rerun):
+        with self._lock:
+            self.reruns += 1
+            for name, seconds in rerun.sections.items():
+                if name not in self._durations:
+                    self._durations[name] = deque(maxlen=self.window)
+                self._durations[name].append(seconds)
+                self._duration_totals[name] += seconds
+                self._duration_counts[name] += 1
+            self._model_calls.update(rerun.model_calls)
+            self._model_rows.update(rerun.model_rows)
+
+    # Resumo em segundos: {"reruns", "window", "sections": {nome: {"count", "sum", "last", "p50", ...}},
+    # "model_calls": {modelo: {"calls", "rows"}}}. Os percentis usam só a janela móvel.
+    def summary(self, percentiles=DEFAULT_PERCENTILES):
+        with self._lock:
+            windows = {name: np.array(values) for name, values in self._durations.items()}
+            sections = {
+                name: {"count": self._duration_counts[name], "sum": self._duration_totals[name],
+                       "last": float(values[-1])}
+                for name, values in windows.items()
+            }
+            model_calls = {model: {"calls": calls, "rows": self._model_rows[model]}
+                           for model, calls in self._model_calls.items()}
+            reruns = self.reruns
+        for name, values in windows.items():
+            for q, value in zip(percentiles, np.percentile(values, percentiles)):
+                sections[name][f"p{q:g}"] = float(value)
+        return {"reruns": reruns, "window": self.window, "sections": sections, "model_calls": model_calls}
+
+    def to_json(self, percentiles=DEFAULT_PERCENTILES):
+        return json.dumps(self.summary(percentiles), indent=2, ensure_ascii=False)
+
+    # Formato texto de exposição do Prometheus: um summary por seção e contadores por modelo
+    def to_prometheus(self, percentiles=DEFAULT_PERCENTILES):
+        summary = self.summary(percentiles)
+        section_metric = f"{METRIC_PREFIX}_section_seconds"
+        lines = [
+            f"# HELP {METRIC_PREFIX}_reruns_total Reexecuções instrumentadas da página.",
+            f"# TYPE {METRIC_PREFIX}_reruns_total counter",
+            f"{METRIC_PREFIX}_reruns_total {summary['reruns']}",
+            f"# HELP {section_metric} Tempo por seção da página (percentis nas últimas {summary['window']} medições).",
+            f"# TYPE {section_metric} summary",
+        ]
+        for name, values in sorted(summary["sections"].items()):
+            for q in percentiles:
+                lines.append(f'{section_metric}{{section="{name}",quantile="{q / 100:g}"}} {values[f"p{q:g}"]!r}')
+            lines.append(f'{section_metric}_sum{{section="{name}"}} {values["sum"]!r}')
+            lines.append(f'{section_metric}_count{{section="{name}"}} {values["count"]}')
+        for field, help_text in (("calls", "Chamadas aos modelos vetorizados."),
+                                 ("rows", "Formulações avaliadas pelos modelos vetorizados.")):
+            lines.append(f"# HELP {METRIC_PREFIX}_model_{field}_total {help_text}")
+            lines.append(f"# TYPE {METRIC_PREFIX}_model_{field}_total counter")
+            for model, counts in sorted(summary["model_calls"].items()):
+                lines.append(f'{METRIC_PREFIX}_model_{field}_total{{model="{model}"}} {counts[field]}')
+        return "\n".join(lines) + "\n"
+
+    # Grava no formato indicado pela extensão (.prom/.txt: Prometheus; demais: JSON). A escrita é
+    # atômica (arquivo temporário + os.replace), para que o coletor nunca leia um arquivo pela metade.
+    def dump(self, path):
+        if os.path.splitext(path)[1].lower() in PROMETHEUS_EXTENSIONS:
+            content = self.to_prometheus()
+        else:
+            content = self.to_json()
+        temporary_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporary_path, "w", encoding="utf-8") as output:
+            output.write(content)
+        os.replace(temporary_path, path)
+        self._last_dump = time.monotonic()
+
+    # Grava apenas se a última gravação tiver mais de `interval` segundos; devolve se gravou
+    def dump_if_due(self, path, interval=DEFAULT_DUMP_INTERVAL):
+        with self._lock:
+            now = time.monotonic()
+            if now - self._last_dump < interval:
+                return False
+            self._last_dump = now
+        self.dump(path)
+        return True
@@ -0,0 +1,111 @@
+"""Tabela pré-calculada das respostas para todas as combinações discretas da sidebar.
+
+A sidebar oferece 2 x 3 x 2 x 3 x 2 x 3 = 216 combinações de níveis. A tabela guarda, para cada
+uma, os fatores codificados e as três respostas, além dos índices das combinações vizinhas usadas
+pelos gráficos: no gráfico de perturbação, cada fator nos seus extremos com os demais fixos; na
+interação A x D, A e D nos extremos. Como toda vizinha também é uma das 216 combinações, as séries
+dos gráficos saem da própria tabela, por indexação.
+
+A combinação é identificada pelos índices dos níveis na ordem de FACTORS (state_index), na mesma
+ordem das linhas de discrete_level_grid. O ruído dos modelos qualitativos é sorteado uma vez, com
+semente fixa, para que tabelas construídas com modelos de IAT diferentes tenham a mesma viscosidade
+e o mesmo desgaste.
+"""
+import numpy as np
+
+from doe_pff.coding import FACTORS, code_factor_columns_checked
+from doe_pff.models import (
+    IAT_ERROR_RANGE,
+    IAT_TERMS,
+    calculate_desgaste_qualitative_batch,
+    calculate_iat_batch,
+    calculate_viscosity_qualitative_batch,
+)
+from doe_pff.montecarlo import DEFAULT_N_REPLICATES, replicate_statistics
+from doe_pff.optimize import discrete_level_grid
+
+LEVEL_COUNTS = tuple(len(levels) for _, _, _, levels in FACTORS)
+N_STATES = int(np.prod(LEVEL_COUNTS))
+DEFAULT_NOISE_SEED = 2019
+INTERACTION_FACTORS = (0, 3)  # A (Tipo de Antioxidante) x D (Quantidade de Antidesgaste)
+
+
+# Índices dos níveis (um por fator, na ordem de FACTORS) -> índice da combinação (0..215)
+def state_index(level_indices):
+    return int(np.ravel_multi_index(tuple(level_indices), LEVEL_COUNTS))
+
+
+# Índice da combinação -> índices dos níveis
+def level_indices(state):
+    return tuple(int(index) for index in np.unravel_index(state, LEVEL_COUNTS))
+
+
+# Valores reais das colunas A–F (na ordem de FACTORS) -> índices das combinações (N,). Valores
+# inválidos geram ValueError (code_factor_columns_checked); linhas com algum fator numérico fora dos
+# níveis da sidebar (ex.: B = 0.35) não são uma das 216 combinações e recebem -1.
+def states_from_factor_columns(columns):
+    code_factor_columns_checked(columns)
+    level_index_columns = []
+    on_level = np.ones(len(columns[0]), dtype=bool)
+    for (_, _, factor_type, levels), values in zip(FACTORS, columns):
+        if factor_type == "categorical":
+            positions = {level: i for i, level in enumerate(levels)}
+            level_index_columns.append(np.fromiter(map(positions.__getitem__, values), np.int64, count=len(values)))
+            continue
+        numbers, level_values = np.asarray(values, dtype=float), np.asarray(levels, dtype=float)
+        indices = np.abs(numbers[:, None] - level_values).argmin(axis=1)
+        on_level &= np.isclose(numbers, level_values[indices])
+        level_index_columns.append(indices)
+    return np.where(on_level, np.ravel_multi_index(level_index_columns, LEVEL_COUNTS), -1)
+
+
+# Índices das combinações obtidas movendo os fatores `factor_indices` para `moved_levels` e
+# mantendo os demais, para todas as combinações de uma vez: (216,)
+def _moved_states(levels, factor_indices, moved_levels):
+    moved = levels.copy()
+    for j, level in zip(factor_indices, moved_levels):
+        moved[j] = level
+    return np.ravel_multi_index(moved, LEVEL_COUNTS)
+
+
+class DiscreteLookupTable:
+    # Arrays indexados pela combinação (primeiro eixo de tamanho 216):
+    #   coded (216, 6), iat, viscosity, desgaste,
+    #   perturbation (216, 6, 2): IAT com cada fator no nível mais baixo/mais alto,
+    #   interaction (216, 2, 2): viscosidade com A em [baixo, alto] x D em [mínimo, máximo]
+    def __init__(self, iat_terms=IAT_TERMS, iat_error_range=IAT_ERROR_RANGE, seed=DEFAULT_NOISE_SEED):
+        self.iat_terms = iat_terms
+        self.iat_error_range = iat_error_range
+        self.coded = discrete_level_grid()
+        self.iat = calculate_iat_batch(self.coded, terms=iat_terms)[0]
+
+        rng = np.random.default_rng(seed)
+        self.viscosity = calculate_viscosity_qualitative_batch(self.coded, rng)
+        # O desgaste do modelo escalar depende só de C e D: um sorteio por combinação de C e D,
+        # compartilhado pelas combinações que diferem apenas nos demais fatores
+        levels = np.array(np.unravel_index(np.arange(N_STATES), LEVEL_COUNTS))
+        cd_index = levels[2] * LEVEL_COUNTS[3] + levels[3]
+        first_states = np.unique(cd_index, return_index=True)[1]
+        self.desgaste = calculate_desgaste_qualitative_batch(self.coded[first_states], rng)[cd_index]
+
+        self.perturbation_states = np.stack([
+            np.stack([_moved_states(levels, (j,), (level,)) for level in (0, n_levels - 1)], axis=-1)
+            for j, n_levels in enumerate(LEVEL_COUNTS)
+        ], axis=1)
+        factor_a, factor_d = INTERACTION_FACTORS
+        self.interaction_states = np.stack([
+            np.stack([_moved_states(levels, INTERACTION_FACTORS, (level_a, level_d))
+                      for level_d in (0, LEVEL_COUNTS[factor_d] - 1)], axis=-1)
+            for level_a in (0, LEVEL_COUNTS[factor_a] - 1)
+        ], axis=1)
+        self.perturbation = self.iat[self.perturbation_states]
+        self.interaction = self.viscosity[self.interaction_states]
+
+
+# Modo de réplicas para todas as combinações de uma vez: {"viscosity"/"desgaste": (média, p2.5, p97.5)},
+# cada um (216,). Os percentis usam a mesma sequência de ruído para todas as linhas.
+def replicate_lookup(n_replicates=DEFAULT_N_REPLICATES, seed=None):
+    statistics = replicate_statistics(discrete_level_grid(), n_replicates=n_replicates, seed=seed,
+                                      percentiles=(2.5, 97.5))
+    return {response: (values["mean"], values["percentiles"][:, 0], values["percentiles"][:, -1])
+            for response, values in statistics.items()}
@@ -0,0 +1,221 @@
+import numpy as np
+
+from doe_pff.coding import get_coded_value_categorical
+
+# --- Implementação dos Modelos (Baseado nos achados do Artigo) ---
+
+# Coeficientes da equação linear do artigo para Acidez, como (índices dos fatores A..F, coeficiente)
+# ÍNDICE DE ACIDEZ = 1.92 + 0.03 * A – 0.01 * B + 1.28 * C + 0.99 * D + 0.01 * E + 0.01 * F + 0.02 * AB + 0.03 * AC + 0.05 * AF – 0.03 * BD + 0.91 * BF + 0.03 * ABD – 0.02 * ABF ± 0.17
+IAT_TERMS = (
+    ((), 1.92),
+    ((0,), 0.03),
+    ((1,), -0.01),
+    ((2,), 1.28),
+    ((3,), 0.99),
+    ((4,), 0.01),
+    ((5,), 0.01),
+    ((0, 1), 0.02),
+    ((0, 2), 0.03),
+    ((0, 5), 0.05),
+    ((1, 3), -0.03),
+    ((1, 5), 0.91),
+    ((0, 1, 3), 0.03),  # Interação ABD
+    ((0, 1, 5), -0.02),  # Interação ABF
+)
+# O artigo menciona +/- 0.17 como erro, o que representa uma faixa de incerteza.
+IAT_ERROR_RANGE = 0.17
+
+
+# Gancho opcional dos modelos vetorizados, chamado com (modelo, linhas avaliadas). A instrumentação
+# da página (doe_pff.instrumentation) registra o seu; sem gancho, lote, servidor e workers não pagam
+# nada além de um teste por chamada.
+_model_call_hook = None
+
+
+def set_model_call_hook(hook):
+    global _model_call_hook
+    _model_call_hook = hook
+
+
+# Modelo preditivo para o Índice de Acidez (IAT) - Baseado na Equação do Artigo
+# Assume que A, B, C, D, E, F são os valores codificados (-1, 0, +1)
+# `terms` e `error_range` permitem usar um modelo ajustado aos ensaios (ver doe_pff.fitting)
+def calculate_iat(A_coded, B_coded, C_coded, D_coded, E_coded, F_coded, terms=IAT_TERMS,
+                  error_range=IAT_ERROR_RANGE):
+    coded = (A_coded, B_coded, C_coded, D_coded, E_coded, F_coded)
+    iat = 0.0
+    for factor_indices, coefficient in terms:
+        term = coefficient
+        for j in factor_indices:
+            term *= coded[j]
+        iat += term
+    return iat, error_range
+
+
+# Versão vetorizada de calculate_iat: recebe uma matriz (N, 6) de fatores codificados A–F
+# e devolve as N predições de uma só vez, junto com a faixa de incerteza.
+def calculate_iat_batch(coded_factors, terms=IAT_TERMS, error_range=IAT_ERROR_RANGE):
+    coded_factors = np.asarray(coded_factors, dtype=float)
+    if coded_factors.ndim != 2 or coded_factors.shape[1] != 6:
+        raise ValueError(f"Esperada uma matriz (N, 6) de fatores codificados, recebido {coded_factors.shape}")
+    if _model_call_hook is not None:
+        _model_call_hook("iat", coded_factors.shape[0])
+
+    # Colunas contíguas evitam acessos com passo ao multiplicar os termos
+    columns = np.ascontiguousarray(coded_factors.T)
+    iat = np.zeros(coded_factors.shape[0])
+    term = np.empty_like(iat)
+    for factor_indices, coefficient in terms:
+        if not factor_indices:
+            iat += coefficient
+            continue
+        np.multiply(columns[factor_indices[0]], coefficient, out=term)
+        for j in factor_indices[1:]:
+            term *= columns[j]
+        iat += term
+    return iat, error_range
+
+
+# Modelo qualitativo para Viscosidade - Baseado nas tendências discutidas no artigo
+# O artigo afirmou que não foi possível propor um modelo preditivo linear válido devido à curvatura.
+# Esta função reflete as tendências dominantes e a interação A x D.
+def calculate_viscosity_qualitative(A_coded, B_val_actual, C_coded, D_val_actual, E_coded, F_val_actual):
+    # Valores base aproximados da Tabela 18 do artigo para Leve/Médio vs Pesado/Médio
+    base_viscosity = 0.0
+    if E_coded == -1:  # Leve/Médio
+        base_viscosity = 40.0  # Aproximado do range de 30-50 para Leve/Médio
+    else:  # Pesado/Médio
+        base_viscosity = 70.0  # Aproximado do range de 60-80 para Pesado/Médio
+
+    # Efeito da Quantidade de Antidesgaste (D_val_actual)
+    # "o aumento na concentração de antidesgaste promove uma redução na viscosidade do lubrificante"
+    # Adicionando um pequeno efeito negativo direto da quantidade, escalado.
+    D_val_scaled_for_effect = (D_val_actual - 0.5) / 2.5  # Escala de 0 a 1 para o range de D
+    base_viscosity += -3 * D_val_scaled_for_effect  # Penalidade por aumentar D
+
+    # Interação A (Tipo de Antioxidante) x D (Quant. de Antidesgaste) - Figura 40 do artigo
+    # Isso é um ajuste sobre a base.
+    if A_coded == -1:  # Amínico
+        # "viscosidade do lubrificante assume um valor máximo no nível inferior da variável D"
+        # "diminuindo seu valor conforme o aumento da quantidade de antidesgaste"
+        base_viscosity += -8 * D_val_scaled_for_effect  # Acentua a queda com D_val_actual
+    else:  # Fenólico
+        # "viscosidade assume o menor valor no nível inferior da variável D"
+        # "aumentando seu valor conforme o aumento do nível de antidesgaste"
+        base_viscosity += 8 * D_val_scaled_for_effect  # Acentua o aumento com D_val_actual
+
+    # Adicionar uma pequena variação aleatória para simular ruído/variabilidade
+    noise = np.random.uniform(-1, 1)
+    predicted_viscosity = base_viscosity + noise
+
+    # Garantir que a viscosidade esteja dentro de um range razoável observado no artigo (30-87 cSt)
+    return max(28, min(89, predicted_viscosity))
+
+
+# Modelo qualitativo para Desgaste - Baseado nas conclusões do artigo
+# O artigo afirmou que não foi possível propor um modelo preditivo significativo para o desgaste.
+# Esta função ilustra a importância dos aditivos e as tendências qualitativas.
+def calculate_desgaste_qualitative(selected_tipo_antidesgaste, D_val_actual):
+    # O artigo afirma que o óleo base sem aditivo tem desgaste de 0.771 mm
+    # e a média com aditivos é de 0.409 mm.
+
+    # Se "Sem Aditivo Antidesgaste" fosse uma opção, o valor seria 0.771.
+    # Como o usuário SEMPRE seleciona um tipo de aditivo (Com Zinco ou Sem Zinco),
+    # o valor inicial será próximo da média com aditivos.
+    desgaste = 0.409
+
+    # C_coded = -1 (Com Zinco), +1 (Sem Zinco)
+    C_coded = get_coded_value_categorical("Tipo de Antidesgaste", selected_tipo_antidesgaste)
+
+    # "o emprego do Antidesgaste sem Zinco, por conciliar proteção contra desgaste e baixa acidez."
+    # Isso sugere que "Sem Zinco" resulta em um desgaste ligeiramente menor.
+    if C_coded == -1:  # Com Zinco
+        desgaste += 0.015  # Um pouco mais de desgaste
+    else:  # Sem Zinco
+        desgaste -= 0.005  # Um pouco menos de desgaste
+
+    # "bastando acrescentar esse aditivo em sua menor proporção (0,5 %), para conseguir a proteção desejada."
+    # Isso implica que, uma vez que o aditivo é adicionado, a quantidade D_val_actual não tem um grande efeito
+    # de redução adicional no desgaste. Podemos adicionar uma pequena penalidade se a quantidade for muito baixa (mas ainda presente).
+    if D_val_actual < 0.75:  # Se a quantidade for próxima do mínimo (0.5), talvez um leve aumento ou sem mudança
+        desgaste += 0.005  # Pequeno aumento para ilustrar que o mínimo é já eficaz, mas não "super" eficaz.
+
+    # Adicionar uma pequena variação aleatória para simular ruído/variabilidade
+    noise = np.random.uniform(-0.005, 0.005)
+    predicted_desgaste = desgaste + noise
+
+    # Garantir que o desgaste esteja dentro de um range razoável observado no artigo (0.348 - 0.428 com aditivo)
+    return max(0.34, min(0.43, predicted_desgaste))
+
+
+# --- Versões Vetorizadas dos Modelos Qualitativos ---
+# Recebem a matriz (N, 6) de fatores codificados A–F. As quantidades reais usadas pelos modelos
+# escalares são obtidas da codificação: D_val_scaled_for_effect = (D_real - 0.5) / 2.5 = (D_coded + 1) / 2
+# e D_real < 0.75 equivale a D_coded < -0.8.
+# Cada modelo é separado em tendência (sem ruído nem corte), ruído uniforme e faixa de corte,
+# os mesmos usados pelos modelos escalares.
+VISCOSITY_NOISE_RANGE = (-1, 1)
+VISCOSITY_BOUNDS = (28, 89)
+DESGASTE_NOISE_RANGE = (-0.005, 0.005)
+DESGASTE_BOUNDS = (0.34, 0.43)
+
+
+def viscosity_trend_batch(coded_factors):
+    coded_factors = np.asarray(coded_factors, dtype=float)
+    if _model_call_hook is not None:
+        _model_call_hook("viscosity", coded_factors.shape[0])
+    A_coded, D_coded, E_coded = coded_factors[:, 0], coded_factors[:, 3], coded_factors[:, 4]
+    D_val_scaled_for_effect = (D_coded + 1) / 2
+
+    viscosity = np.where(E_coded == -1, 40.0, 70.0)
+    viscosity += -3 * D_val_scaled_for_effect
+    viscosity += np.where(A_coded == -1, -8.0, 8.0) * D_val_scaled_for_effect
+    return viscosity
+
+
+def desgaste_trend_batch(coded_factors):
+    coded_factors = np.asarray(coded_factors, dtype=float)
+    if _model_call_hook is not None:
+        _model_call_hook("desgaste", coded_factors.shape[0])
+    C_coded, D_coded = coded_factors[:, 2], coded_factors[:, 3]
+
+    desgaste = np.where(C_coded == -1, 0.409 + 0.015, 0.409 - 0.005)
+    desgaste += np.where(D_coded < -0.8, 0.005, 0.0)
+    return desgaste
+
+
+# Sem `rng`, devolvem a tendência sem ruído (o valor esperado antes do corte), útil para otimização;
+# com um np.random.Generator, somam o mesmo ruído uniforme dos modelos escalares.
+def calculate_viscosity_qualitative_batch(coded_factors, rng=None):
+    viscosity = viscosity_trend_batch(coded_factors)
+    if rng is not None:
+        viscosity += rng.uniform(*VISCOSITY_NOISE_RANGE, size=viscosity.shape)
+    return np.clip(viscosity, *VISCOSITY_BOUNDS)
+
+
+def calculate_desgaste_qualitative_batch(coded_factors, rng=None):
+    desgaste = desgaste_trend_batch(coded_factors)
+    if rng is not None:
+        desgaste += rng.uniform(*DESGASTE_NOISE_RANGE, size=desgaste.shape)
+    return np.clip(desgaste, *DESGASTE_BOUNDS)
+
+
+# --- Respostas sem Ruído ---
+# IAT e as tendências (com corte) de viscosidade e desgaste: as respostas determinísticas usadas pelas
+# superfícies de resposta, pela análise de sensibilidade e pela cesta de cenários.
+MODEL_RESPONSES = ("iat", "viscosity", "desgaste")
+
+
+def model_response_batch(response, coded_factors, iat_terms=IAT_TERMS):
+    if response == "iat":
+        return calculate_iat_batch(coded_factors, terms=iat_terms)[0]
+    if response == "viscosity":
+        return calculate_viscosity_qualitative_batch(coded_factors)
+    if response == "desgaste":
+        return calculate_desgaste_qualitative_batch(coded_factors)
+    raise ValueError(f"Resposta desconhecida: {response!r} (respostas: {', '.join(MODEL_RESPONSES)})")
+
+
+# Todas as respostas de uma vez: {"iat"/"viscosity"/"desgaste": (N,)}
+def model_responses_batch(coded_factors, iat_terms=IAT_TERMS):
+    return {response: model_response_batch(response, coded_factors, iat_terms) for response in MODEL_RESPONSES}
@@ -0,0 +1,87 @@
+"""Modo de réplicas (Monte Carlo) dos modelos qualitativos de viscosidade e desgaste.
+
+Os modelos qualitativos somam um ruído uniforme à tendência e cortam o resultado numa faixa.
+Aqui o ruído é sorteado por um np.random.Generator com semente, de modo que os resultados são
+reproduzíveis, e resumido em média, desvio padrão e percentis para um lote de formulações.
+
+Como o corte é monótono, a resposta de cada formulação é uma transformação monótona do mesmo
+ruído. Basta então sortear e ordenar as réplicas de ruído uma única vez (números aleatórios
+comuns a todas as formulações):
+  - percentis: corte(tendência + percentil do ruído);
+  - média e desvio: somas prefixadas do ruído ordenado, com busca binária dos pontos de corte.
+Assim, 10^6 réplicas por formulação custam O(R log R) uma vez mais O(N log R) por lote, sem
+montar a matriz N x R.
+"""
+import numpy as np
+
+from doe_pff.models import (
+    DESGASTE_BOUNDS,
+    DESGASTE_NOISE_RANGE,
+    VISCOSITY_BOUNDS,
+    VISCOSITY_NOISE_RANGE,
+    desgaste_trend_batch,
+    viscosity_trend_batch,
+)
+
+DEFAULT_N_REPLICATES = 100_000
+DEFAULT_PERCENTILES = (2.5, 50.0, 97.5)
+
+# Resposta: (tendência vetorizada, faixa do ruído uniforme, faixa de corte)
+QUALITATIVE_RESPONSES = {
+    "viscosity": (viscosity_trend_batch, VISCOSITY_NOISE_RANGE, VISCOSITY_BOUNDS),
+    "desgaste": (desgaste_trend_batch, DESGASTE_NOISE_RANGE, DESGASTE_BOUNDS),
+}
+
+
+# Estatísticas de corte(tendência + ruído) para cada tendência, a partir do ruído já ordenado
+def _clipped_statistics(trend, sorted_noise, bounds, percentiles):
+    lower, upper = bounds
+    n_replicates = len(sorted_noise)
+    prefix_sum = np.concatenate([[0.0], np.cumsum(sorted_noise)])
+    prefix_sum_sq = np.concatenate([[0.0], np.cumsum(sorted_noise ** 2)])
+
+    # Réplicas cortadas embaixo: ruído < lower - tendência; em cima: ruído > upper - tendência
+    n_low = np.searchsorted(sorted_noise, lower - trend, side="left")
+    end_middle = np.searchsorted(sorted_noise, upper - trend, side="right")
+    n_high = n_replicates - end_middle
+    n_middle = end_middle - n_low
+
+    noise_sum = prefix_sum[end_middle] - prefix_sum[n_low]
+    noise_sum_sq = prefix_sum_sq[end_middle] - prefix_sum_sq[n_low]
+    total = lower * n_low + upper * n_high + n_middle * trend + noise_sum
+    total_sq = (lower ** 2 * n_low + upper ** 2 * n_high
+                + n_middle * trend ** 2 + 2 * trend * noise_sum + noise_sum_sq)
+
+    mean = total / n_replicates
+    std = np.sqrt(np.maximum(total_sq / n_replicates - mean ** 2, 0.0))
+    noise_percentiles = np.percentile(sorted_noise, percentiles)
+    response_percentiles = np.clip(trend[:, None] + noise_percentiles[None, :], lower, upper)
+    return {"mean": mean, "std": std, "percentiles": response_percentiles}
+
+
+# Resumo das réplicas para uma matriz (N, 6) de formulações codificadas.
+# Devolve {"viscosity": {...}, "desgaste": {...}} com "mean" (N,), "std" (N,) e "percentiles" (N, P),
+# na ordem de `percentiles`. O padrão (2.5, 50, 97.5) dá a mediana e o intervalo de 95%.
+def replicate_statistics(coded_factors, n_replicates=DEFAULT_N_REPLICATES, seed=None,
+                         percentiles=DEFAULT_PERCENTILES):
+    coded_factors = np.atleast_2d(np.asarray(coded_factors, dtype=float))
+    rng = np.random.default_rng(seed)
+    statistics = {}
+    for response, (trend_function, noise_range, bounds) in QUALITATIVE_RESPONSES.items():
+        sorted_noise = np.sort(rng.uniform(*noise_range, size=n_replicates))
+        statistics[response] = _clipped_statistics(trend_function(coded_factors), sorted_noise, bounds,
+                                                   percentiles)
+    return statistics
+
+
+# Amostras brutas (N, n_samples) de cada resposta, sorteadas numa única operação; úteis para
+# histogramas e violinos. Para resumos com muitas réplicas, prefira replicate_statistics.
+def sample_replicates(coded_factors, n_samples, seed=None):
+    coded_factors = np.atleast_2d(np.asarray(coded_factors, dtype=float))
+    rng = np.random.default_rng(seed)
+    samples = {}
+    for response, (trend_function, noise_range, bounds) in QUALITATIVE_RESPONSES.items():
+        trend = trend_function(coded_factors)
+        noise = rng.uniform(*noise_range, size=(len(trend), n_samples))
+        samples[response] = np.clip(trend[:, None] + noise, *bounds)
+    return samples
@@ -0,0 +1,177 @@
+"""Otimização multi-resposta das formulações no espaço de fatores A–F.
+
+Busca as formulações que minimizam o IAT mantendo a viscosidade dentro de uma faixa
+alvo e o desgaste abaixo de um limite. São avaliadas todas as combinações discretas
+de níveis da sidebar e, para cada combinação dos fatores categóricos (A, C, E), o cubo
+codificado contínuo de B, D e F, com refinamento final via scipy. O resultado traz a
+fronteira de Pareto e a classificação por desejabilidade de Derringer.
+"""
+import itertools
+
+import numpy as np
+
+from doe_pff.coding import FACTORS, get_coded_value_categorical, get_coded_value_numerical
+from doe_pff.models import (
+    IAT_TERMS,
+    calculate_desgaste_qualitative_batch,
+    calculate_iat,
+    calculate_iat_batch,
+    calculate_viscosity_qualitative_batch,
+)
+
+DEFAULT_VISCOSITY_BAND = (30.0, 50.0)  # cSt, faixa típica do óleo base Leve/Médio
+DEFAULT_DESGASTE_MAX = 0.42  # mm
+DEFAULT_GRID_POINTS = 41  # pontos por eixo contínuo (B, D, F) na busca em grade
+DUPLICATE_DECIMALS = 9  # casas (codificadas) para considerar duas formulações iguais
+
+CATEGORICAL_INDICES = tuple(j for j, (_, _, factor_type, _) in enumerate(FACTORS) if factor_type == "categorical")
+NUMERICAL_INDICES = tuple(j for j, (_, _, factor_type, _) in enumerate(FACTORS) if factor_type == "numerical")
+
+
+# Todas as combinações discretas de níveis oferecidas na sidebar (2 x 3 x 2 x 3 x 2 x 3 = 216), codificadas
+def discrete_level_grid():
+    coded_levels = []
+    for _, factor_name, factor_type, levels in FACTORS:
+        if factor_type == "categorical":
+            coded_levels.append([get_coded_value_categorical(factor_name, level) for level in levels])
+        else:
+            coded_levels.append([get_coded_value_numerical(factor_name, level) for level in levels])
+    return np.array(list(itertools.product(*coded_levels)), dtype=float)
+
+
+# Avalia as restrições de viscosidade e desgaste (modelos sem ruído) para uma matriz codificada
+def _feasibility(coded_factors, viscosity_band, desgaste_max):
+    viscosity = calculate_viscosity_qualitative_batch(coded_factors)
+    desgaste = calculate_desgaste_qualitative_batch(coded_factors)
+    feasible = (viscosity >= viscosity_band[0]) & (viscosity <= viscosity_band[1]) & (desgaste <= desgaste_max)
+    return feasible, viscosity, desgaste
+
+
+# Minimiza o IAT em (B, D, F) a partir do melhor ponto da grade, com A, C, E fixos
+def _refine_continuous(start, d_bounds, iat_terms):
+    from scipy.optimize import minimize
+
+    def objective(x):
+        coded = start.copy()
+        coded[list(NUMERICAL_INDICES)] = x
+        return calculate_iat(*coded, terms=iat_terms)[0]
+
+    result = minimize(objective, start[list(NUMERICAL_INDICES)], method="L-BFGS-B",
+                      bounds=[(-1.0, 1.0), d_bounds, (-1.0, 1.0)])
+    refined = start.copy()
+    refined[list(NUMERICAL_INDICES)] = result.x
+    return refined
+
+
+# Melhor formulação contínua para cada combinação de A, C, E que tenha alguma região viável
+def _continuous_candidates(viscosity_band, desgaste_max, grid_points, refine, iat_terms):
+    axis = np.linspace(-1.0, 1.0, grid_points)
+    B_grid, F_grid = (values.ravel() for values in np.meshgrid(axis, axis, indexing="ij"))
+    candidates = []
+    for A_coded, C_coded, E_coded in itertools.product((-1.0, 1.0), repeat=3):
+        # Viscosidade e desgaste dependem apenas de A, C, D e E: as faixas inviáveis de D são
+        # descartadas antes de avaliar o IAT sobre B x F.
+        probe = np.zeros((grid_points, 6))
+        probe[:, 0], probe[:, 2], probe[:, 3], probe[:, 4] = A_coded, C_coded, axis, E_coded
+        feasible, _, _ = _feasibility(probe, viscosity_band, desgaste_max)
+        if not feasible.any():
+            continue
+        D_feasible = axis[feasible]
+
+        coded = np.empty((len(D_feasible) * len(B_grid), 6))
+        coded[:, 0], coded[:, 2], coded[:, 4] = A_coded, C_coded, E_coded
+        coded[:, 1] = np.tile(B_grid, len(D_feasible))
+        coded[:, 3] = np.repeat(D_feasible, len(B_grid))
+        coded[:, 5] = np.tile(F_grid, len(D_feasible))
+        iat, _ = calculate_iat_batch(coded, terms=iat_terms)
+        best = coded[np.argmin(iat)]
+
+        if refine:
+            # Os modelos qualitativos são monótonos em D, então a região viável é um intervalo
+            refined = _refine_continuous(best, (D_feasible.min(), D_feasible.max()), iat_terms)
+            if _feasibility(refined[None, :], viscosity_band, desgaste_max)[0][0]:
+                best = refined
+        candidates.append(best)
+    return np.array(candidates).reshape(-1, 6)
+
+
+# Máscara dos pontos não dominados (todas as colunas de `objectives` são minimizadas)
+def pareto_mask(objectives):
+    objectives = np.asarray(objectives, dtype=float)
+    no_worse = (objectives[:, None, :] <= objectives[None, :, :]).all(axis=2)
+    better = (objectives[:, None, :] < objectives[None, :, :]).any(axis=2)
+    dominated = (no_worse & better).any(axis=0)
+    return ~dominated
+
+
+# --- Funções de Desejabilidade de Derringer ---
+def _desirability_smaller_is_better(values, lower, upper):
+    if upper <= lower:
+        return np.where(values <= lower, 1.0, 0.0)
+    return np.clip((upper - values) / (upper - lower), 0.0, 1.0)
+
+
+def _desirability_larger_is_better(values, lower, upper):
+    if upper <= lower:
+        return np.where(values >= upper, 1.0, 0.0)
+    return np.clip((values - lower) / (upper - lower), 0.0, 1.0)
+
+
+# Sobe de 0 (lower) a 1 (target) e desce até 0 (upper). Lados de largura zero (faixa degenerada, como
+# lower == upper) valem 1 só no próprio alvo, em vez de 0/0.
+def _desirability_target_is_best(values, lower, target, upper):
+    below = _desirability_larger_is_better(values, lower, target)
+    above = _desirability_smaller_is_better(values, target, upper)
+    return np.where(values <= target, below, above)
+
+
+# Desejabilidade global: média geométrica de IAT (menor é melhor), viscosidade (alvo no centro da faixa)
+# e desgaste (menor é melhor, até o limite)
+def desirability(iat, viscosity, desgaste, viscosity_band, desgaste_max):
+    d_iat = _desirability_smaller_is_better(iat, iat.min(), iat.max())
+    d_viscosity = _desirability_target_is_best(viscosity, viscosity_band[0], sum(viscosity_band) / 2,
+                                               viscosity_band[1])
+    d_desgaste = _desirability_smaller_is_better(desgaste, desgaste.min(), desgaste_max)
+    return (d_iat * d_viscosity * d_desgaste) ** (1 / 3)
+
+
+# Executa a busca completa. Devolve um dicionário de arrays alinhados (apenas formulações viáveis),
+# ordenados da maior para a menor desejabilidade:
+#   coded (N, 6), iat, viscosity, desgaste, desirability, pareto (bool) e source ("discreto"/"contínuo")
+def optimize_formulations(viscosity_band=DEFAULT_VISCOSITY_BAND, desgaste_max=DEFAULT_DESGASTE_MAX,
+                          grid_points=DEFAULT_GRID_POINTS, refine=True, iat_terms=IAT_TERMS):
+    discrete = discrete_level_grid()
+    feasible, _, _ = _feasibility(discrete, viscosity_band, desgaste_max)
+    discrete = discrete[feasible]
+    continuous = _continuous_candidates(viscosity_band, desgaste_max, grid_points, refine, iat_terms)
+
+    coded = np.vstack([discrete, continuous])
+    source = np.array(["discreto"] * len(discrete) + ["contínuo"] * len(continuous))
+    # Refinamentos contínuos que terminam num canto repetem uma formulação discreta (ou outro
+    # refinamento): fica só a primeira ocorrência, com a origem discreta quando houver
+    if len(coded):
+        _, first = np.unique(np.round(coded, DUPLICATE_DECIMALS) + 0.0, axis=0, return_index=True)
+        unique_rows = np.sort(first)
+        coded, source = coded[unique_rows], source[unique_rows]
+    iat, _ = calculate_iat_batch(coded, terms=iat_terms)
+    viscosity = calculate_viscosity_qualitative_batch(coded)
+    desgaste = calculate_desgaste_qualitative_batch(coded)
+
+    if len(coded) == 0:
+        scores = np.zeros(0)
+        pareto = np.zeros(0, dtype=bool)
+    else:
+        scores = desirability(iat, viscosity, desgaste, viscosity_band, desgaste_max)
+        viscosity_target = sum(viscosity_band) / 2
+        pareto = pareto_mask(np.column_stack([iat, np.abs(viscosity - viscosity_target), desgaste]))
+
+    order = np.argsort(-scores, kind="stable")
+    return {
+        "coded": coded[order],
+        "iat": iat[order],
+        "viscosity": viscosity[order],
+        "desgaste": desgaste[order],
+        "desirability": scores[order],
+        "pareto": pareto[order],
+        "source": source[order],
+    }
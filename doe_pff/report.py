@@ -0,0 +1,347 @@
+"""Relatório estático (HTML) de várias formulações, sem Streamlit.
+
+Para cada formulação de um arquivo CSV/Parquet (colunas A–F com os valores reais e, opcionalmente,
+a coluna "Cenário", como na exportação da cesta de cenários), o relatório traz os cartões de
+resultados e os gráficos de perturbação do IAT, da interação A x D na viscosidade e do comparativo
+de desgaste, montados com as mesmas funções da página (doe_pff.figures). Formulações nos níveis da
+sidebar usam os mesmos valores da página (doe_pff.lookup.DiscreteLookupTable); as demais (ex.:
+B = 0.35, aceito pela cesta) usam as respostas sem ruído de doe_pff.models, como a cesta.
+
+O arquivo gerado é autocontido e fica pequeno mesmo com centenas de formulações:
+  - o plotly.js é embutido uma única vez, e o template de layout do Plotly, comum a todas as
+    figuras, também é gravado uma vez só (e nem é montado em cada figura);
+  - cada figura distinta é montada e gravada uma vez, identificada pelos seus dados: nos níveis da
+    sidebar, o gráfico de perturbação depende da combinação inteira (no máximo 216), a interação
+    A x D não depende dos níveis de A e D (36) e o desgaste depende apenas de C e D (6).
+    Formulações repetidas compartilham as mesmas figuras;
+  - as figuras são desenhadas no navegador só quando a seção aparece na tela (ou antes de imprimir).
+
+As figuras são montadas em paralelo por processos; pandas e Plotly são importados só quando usados.
+
+Uso:
+    python -m doe_pff.report formulacoes.csv relatorio.html --workers 4
+"""
+import html
+import os
+import sys
+import time
+from datetime import datetime
+from contextlib import contextmanager
+
+import numpy as np
+
+from doe_pff.coding import FACTOR_LETTERS, FACTORS, code_factor_columns_checked
+from doe_pff.lookup import INTERACTION_FACTORS, states_from_factor_columns
+from doe_pff.models import calculate_iat_batch, model_response_batch, model_responses_batch
+
+DEFAULT_TITLE = "Relatório de Formulações"
+CHUNKS_PER_WORKER = 4  # blocos de figuras por processo, para equilibrar a carga
+FIGURE_KINDS = ("perturbation", "interaction", "desgaste")
+SLIM_TEMPLATE = "doe_pff_report_slim"
+
+
+# Níveis exibidos de cada formulação (texto, na ordem de FACTORS): o nível da sidebar quando o valor
+# coincide com um deles, senão o próprio valor
+def _factor_labels(columns):
+    label_columns = []
+    for (_, _, factor_type, levels), values in zip(FACTORS, columns):
+        if factor_type == "categorical":
+            label_columns.append([str(value) for value in values])
+            continue
+        numbers, level_values = np.asarray(values, dtype=float), np.asarray(levels, dtype=float)
+        indices = np.abs(numbers[:, None] - level_values).argmin(axis=1)
+        on_level = np.isclose(numbers, level_values[indices])
+        label_columns.append([str(levels[index]) if close else f"{number:g}"
+                              for number, index, close in zip(numbers, indices, on_level)])
+    return list(zip(*label_columns))
+
+
+# IAT com cada fator no nível mais baixo/mais alto e os demais fixos, para formulações quaisquer: (N, 6, 2)
+def _perturbation_series(coded, iat_terms):
+    n_rows, n_factors = coded.shape
+    moved = np.repeat(coded[:, None, None, :], n_factors, axis=1).repeat(2, axis=2)
+    for j in range(n_factors):
+        moved[:, j, :, j] = (-1.0, 1.0)
+    return calculate_iat_batch(moved.reshape(-1, n_factors), terms=iat_terms)[0].reshape(n_rows, n_factors, 2)
+
+
+# Viscosidade sem ruído com A em [baixo, alto] x D em [mínimo, máximo], para formulações quaisquer: (N, 2, 2)
+def _interaction_points(coded):
+    moved = np.repeat(coded[:, None, None, :], 2, axis=1).repeat(2, axis=2)
+    first, second = INTERACTION_FACTORS
+    moved[:, :, :, first] = np.array([-1.0, 1.0])[:, None]
+    moved[:, :, :, second] = np.array([-1.0, 1.0])[None, :]
+    return model_response_batch("viscosity", moved.reshape(-1, coded.shape[1])).reshape(-1, 2, 2)
+
+
+# Valores dos cartões e séries dos gráficos de cada formulação, a partir das colunas A–F (valores
+# reais, na ordem de FACTORS). Linhas nos níveis da sidebar vêm da tabela `lookup`, como na página;
+# as demais, das respostas sem ruído. Valores inválidos geram ValueError.
+def formulation_inputs(columns, lookup=None):
+    if lookup is None:
+        from doe_pff.lookup import DiscreteLookupTable
+
+        lookup = DiscreteLookupTable()
+    states = states_from_factor_columns(columns)
+    on_level = states >= 0
+    inputs = {
+        "labels": _factor_labels(columns),
+        "on_level": on_level,
+        "iat_error_range": lookup.iat_error_range,
+        "iat": lookup.iat[states],
+        "viscosity": lookup.viscosity[states],
+        "desgaste": lookup.desgaste[states],
+        "perturbation": lookup.perturbation[states],
+        "interaction": lookup.interaction[states],
+    }
+    if not on_level.all():
+        off_level = ~on_level
+        coded = code_factor_columns_checked(columns)[off_level]
+        for response, values in model_responses_batch(coded, lookup.iat_terms).items():
+            inputs[response][off_level] = values
+        inputs["perturbation"][off_level] = _perturbation_series(coded, lookup.iat_terms)
+        inputs["interaction"][off_level] = _interaction_points(coded)
+    return inputs
+
+
+# Figuras distintas (kind, dados) e, para cada formulação, as chaves das suas três figuras. Os dados
+# identificam a figura: formulações com os mesmos dados compartilham a figura.
+def figure_jobs(inputs):
+    keys_by_job = {}
+    formulation_keys = []
+    for labels, iat, desgaste, perturbation, interaction in zip(
+            inputs["labels"], inputs["iat"].tolist(), inputs["desgaste"].tolist(),
+            inputs["perturbation"].tolist(), inputs["interaction"].tolist()):
+        jobs = (("perturbation", (tuple(map(tuple, perturbation)), iat, labels)),
+                ("interaction", (tuple(map(tuple, interaction)),)),
+                ("desgaste", (labels[2], labels[3], desgaste)))
+        formulation_keys.append(tuple(keys_by_job.setdefault(job, f"{job[0][0]}{len(keys_by_job)}")
+                                      for job in jobs))
+    return [(key, kind, args) for (kind, args), key in keys_by_job.items()], formulation_keys
+
+
+# Template padrão reduzido ao que o plotly.express consulta ao montar as figuras (cores): validar e
+# copiar o template completo em cada figura custaria mais que a própria figura. Como o template é
+# retirado do JSON e aplicado no navegador, o resultado é o mesmo das figuras da página.
+@contextmanager
+def _slim_default_template():
+    import plotly.graph_objects as go
+    import plotly.io as pio
+
+    default = pio.templates.default
+    full = pio.templates[default]
+    pio.templates[SLIM_TEMPLATE] = go.layout.Template(layout=dict(colorway=full.layout.colorway,
+                                                                  colorscale=full.layout.colorscale))
+    pio.templates.default = SLIM_TEMPLATE
+    try:
+        yield
+    finally:
+        pio.templates.default = default
+
+
+# Monta as figuras [(chave, kind, dados)] e devolve [(chave, JSON)], sem o template de layout, que é
+# gravado uma vez no relatório. Roda nos processos de trabalho.
+def render_figures(jobs):
+    from plotly.io.json import to_json_plotly
+
+    from doe_pff import figures
+
+    rendered = []
+    with _slim_default_template():
+        for key, kind, args in jobs:
+            if kind == "perturbation":
+                figure = figures.perturbation_series_figure(*args)
+            elif kind == "interaction":
+                figure = figures.interaction_points_figure(*args)
+            else:
+                figure = figures.desgaste_figure(*args)
+            figure_json = figure.to_plotly_json()
+            figure_json["layout"].pop("template", None)
+            rendered.append((key, to_json_plotly(figure_json)))
+    return rendered
+
+
+# Figuras de figure_jobs, montadas em até `workers` processos: {chave: JSON}
+def render_all_figures(jobs, workers=1):
+    if workers <= 1 or len(jobs) <= 1:
+        return dict(render_figures(jobs))
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    n_chunks = min(len(jobs), workers * CHUNKS_PER_WORKER)
+    chunks = [jobs[i::n_chunks] for i in range(n_chunks)]
+    with ProcessPoolExecutor(max_workers=min(workers, n_chunks)) as pool:
+        return {key: figure_json for rendered in pool.map(render_figures, chunks) for key, figure_json in rendered}
+
+
+# JSON dentro de <script>: "</" não pode aparecer literalmente
+def _script_json(text):
+    return text.replace("</", "<\\/")
+
+
+_STYLE = """
+body { font-family: system-ui, sans-serif; margin: 0 auto; max-width: 1200px; padding: 1rem 2rem; color: #262730; }
+h1 { margin-bottom: 0.2rem; }
+.note { color: #555; font-size: 0.9rem; }
+table { border-collapse: collapse; font-size: 0.85rem; margin: 0.5rem 0; }
+th, td { border-bottom: 1px solid #e6e6e6; padding: 0.25rem 0.6rem; text-align: left; }
+td.number { text-align: right; font-variant-numeric: tabular-nums; }
+section.formulation { border-top: 2px solid #e6e6e6; margin-top: 2rem; padding-top: 0.5rem; break-before: page; }
+.cards { display: grid; grid-template-columns: repeat(3, 1fr); gap: 1rem; margin: 1rem 0; }
+.card { border: 1px solid #e6e6e6; border-radius: 0.5rem; padding: 0.75rem 1rem; }
+.card h3 { font-size: 0.95rem; margin: 0 0 0.3rem; }
+.card .value { font-size: 1.4rem; font-weight: 600; }
+.charts { display: grid; grid-template-columns: 1fr; gap: 0.5rem; }
+.chart { min-height: 450px; }
+"""
+
+# Desenha cada gráfico quando ele se aproxima da área visível; antes de imprimir, desenha todos
+_RENDER_SCRIPT = """
+(function () {
+  const payload = JSON.parse(document.getElementById("report-figures").textContent);
+  const config = {responsive: true, displaylogo: false};
+  function draw(element) {
+    if (element.dataset.drawn) return;
+    element.dataset.drawn = "1";
+    const figure = structuredClone(payload.figures[element.dataset.figure]);
+    figure.layout.template = payload.template;
+    Plotly.newPlot(element, figure.data, figure.layout, config);
+  }
+  const charts = document.querySelectorAll("div.chart");
+  const observer = new IntersectionObserver(function (entries) {
+    for (const entry of entries) {
+      if (entry.isIntersecting) {
+        observer.unobserve(entry.target);
+        draw(entry.target);
+      }
+    }
+  }, {rootMargin: "400px"});
+  charts.forEach(function (element) { observer.observe(element); });
+  window.addEventListener("beforeprint", function () { charts.forEach(draw); });
+})();
+"""
+
+
+def _factor_cells(labels):
+    return "".join(f"<td>{html.escape(label)}</td>" for label in labels)
+
+
+# Seção da formulação `i` de `inputs`: fatores, cartões de resultados e os três gráficos
+def _formulation_section(number, name, inputs, i, keys):
+    factor_header = "".join(f"<th>{letter} · {html.escape(factor_name)}</th>"
+                            for letter, factor_name, _, _ in FACTORS)
+    charts = "".join(f'<div class="chart" data-figure="{key}"></div>' for key in keys)
+    off_level_note = ("" if inputs["on_level"][i] else
+                      '<p class="note">Fora dos níveis da sidebar: valores e gráficos pelas respostas sem ruído, '
+                      'como na cesta de cenários.</p>\n')
+    return f"""<section class="formulation" id="f{number}">
+<h2>{number}. {html.escape(name)}</h2>
+{off_level_note}<table><tr>{factor_header}</tr><tr>{_factor_cells(inputs["labels"][i])}</tr></table>
+<div class="cards">
+<div class="card"><h3>Índice de Acidez Total (IAT)</h3><div class="value">{inputs["iat"][i]:.2f} ± {inputs["iat_error_range"]:.2f} mg KOH/g</div></div>
+<div class="card"><h3>Viscosidade Cinemática (40°C)</h3><div class="value">{inputs["viscosity"][i]:.2f} cSt</div></div>
+<div class="card"><h3>Desgaste por 4 Esferas</h3><div class="value">{inputs["desgaste"][i]:.3f} mm</div></div>
+</div>
+<div class="charts">{charts}</div>
+</section>
+"""
+
+
+# Monta o relatório (texto HTML) para as formulações dadas pelas colunas A–F (valores reais, na ordem
+# de FACTORS) com os nomes dados. Devolve (HTML, figuras distintas).
+def build_report(names, columns, workers=1, title=DEFAULT_TITLE):
+    import plotly.io as pio
+    from plotly.io.json import to_json_plotly
+    from plotly.offline import get_plotlyjs
+
+    inputs = formulation_inputs(columns)
+    jobs, formulation_keys = figure_jobs(inputs)
+    figures_json = render_all_figures(jobs, workers)
+    template_json = to_json_plotly(pio.templates[pio.templates.default].to_plotly_json())
+    payload = ('{"template":' + template_json + ',"figures":{'
+               + ",".join(f'"{key}":{figure_json}' for key, figure_json in sorted(figures_json.items())) + "}}")
+
+    summary_header = "".join(f"<th>{letter}</th>" for letter in FACTOR_LETTERS)
+    summary_rows = "".join(
+        f'<tr><td><a href="#f{i + 1}">{i + 1}</a></td><td>{html.escape(name)}</td>{_factor_cells(inputs["labels"][i])}'
+        f'<td class="number">{inputs["iat"][i]:.2f}</td><td class="number">{inputs["viscosity"][i]:.2f}</td>'
+        f'<td class="number">{inputs["desgaste"][i]:.3f}</td></tr>'
+        for i, name in enumerate(names))
+    sections = "".join(_formulation_section(i + 1, name, inputs, i, keys)
+                       for i, (name, keys) in enumerate(zip(names, formulation_keys)))
+    n_off_level = int((~inputs["on_level"]).sum())
+    off_level_count = f" ({n_off_level} fora dos níveis da sidebar)" if n_off_level else ""
+
+    report = f"""<!DOCTYPE html>
+<html lang="pt-BR">
+<head>
+<meta charset="utf-8">
+<title>{html.escape(title)}</title>
+<style>{_STYLE}</style>
+<script>{get_plotlyjs()}</script>
+</head>
+<body>
+<h1>{html.escape(title)}</h1>
+<p class="note">{len(names)} formulações{off_level_count} · gerado em {datetime.now():%d/%m/%Y %H:%M} · IAT pela equação do artigo (R² = 0.9938).
+Viscosidade e desgaste vêm dos modelos qualitativos (tendências do artigo, com o mesmo ruído de semente fixa da página
+nos níveis da sidebar e sem ruído fora deles): a viscosidade tem curvatura significativa e o desgaste não tem modelo
+preditivo significativo no estudo original.</p>
+<table>
+<tr><th>#</th><th>Formulação</th>{summary_header}<th>IAT (mg KOH/g)</th><th>Viscosidade (cSt)</th><th>Desgaste (mm)</th></tr>
+{summary_rows}
+</table>
+{sections}
+<script type="application/json" id="report-figures">{_script_json(payload)}</script>
+<script>{_RENDER_SCRIPT}</script>
+</body>
+</html>
+"""
+    return report, len(jobs)
+
+
+# Lê as formulações (CSV ou Parquet), gera o relatório e devolve (formulações, figuras distintas)
+def write_report(input_path, output_path, workers=1, title=DEFAULT_TITLE):
+    import pandas as pd
+
+    if os.path.splitext(input_path)[1].lower() in (".parquet", ".pq"):
+        df = pd.read_parquet(input_path)
+    else:
+        df = pd.read_csv(input_path)
+    missing = [letter for letter in FACTOR_LETTERS if letter not in df.columns]
+    if missing:
+        raise ValueError(f"Colunas de fatores ausentes no arquivo: {', '.join(missing)}")
+
+    if "Cenário" in df.columns:
+        names = [str(name) if pd.notna(name) else f"Formulação {i + 1}" for i, name in enumerate(df["Cenário"])]
+    else:
+        names = [f"Formulação {i + 1}" for i in range(len(df))]
+    report, n_figures = build_report(names, [df[letter].to_numpy() for letter in FACTOR_LETTERS], workers, title)
+    with open(output_path, "w", encoding="utf-8") as output:
+        output.write(report)
+    return len(names), n_figures
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Gera um relatório HTML autocontido com resultados e gráficos de várias formulações.")
+    parser.add_argument("input", help="Formulações (.csv ou .parquet) com as colunas A–F e, opcionalmente, Cenário")
+    parser.add_argument("output", help="Arquivo HTML de saída")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Número de processos para montar as figuras (padrão: número de CPUs)")
+    parser.add_argument("--title", default=DEFAULT_TITLE, help=f"Título do relatório (padrão: {DEFAULT_TITLE})")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    try:
+        n_formulations, n_figures = write_report(args.input, args.output, workers=args.workers, title=args.title)
+    except ValueError as error:
+        sys.exit(f"Erro: {error}")
+    size_mb = os.path.getsize(args.output) / 2**20
+    print(f"{n_formulations} formulações ({n_figures} figuras distintas) em {args.output}: "
+          f"{size_mb:.1f} MiB, {time.perf_counter() - start:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
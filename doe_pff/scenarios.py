@@ -0,0 +1,52 @@
+"""Cesta de cenários: respostas de muitas formulações, recalculadas só onde a tabela mudou.
+
+A cesta guarda, para cada linha da tabela de cenários (identificada por um id estável, como o
+índice do DataFrame editado), os fatores codificados e as respostas já calculadas. A cada
+atualização, as linhas são alinhadas pelo id e comparadas com os fatores guardados: só as linhas
+novas ou com algum fator alterado passam pelos modelos, num único lote; as demais reaproveitam as
+respostas anteriores e as linhas removidas são descartadas. Trocar os termos do modelo de IAT
+recalcula a cesta inteira.
+
+Viscosidade e desgaste são as tendências dos modelos qualitativos, sem ruído, para que as
+respostas de uma linha dependam apenas dos seus fatores.
+"""
+import numpy as np
+
+from doe_pff.coding import FACTORS
+from doe_pff.models import IAT_TERMS, MODEL_RESPONSES, model_responses_batch
+
+
+class ScenarioBasket:
+    def __init__(self):
+        self.row_ids = np.empty(0, dtype=np.int64)
+        self.coded = np.empty((0, len(FACTORS)))
+        self.responses = {response: np.empty(0) for response in MODEL_RESPONSES}
+        self.iat_terms = None
+
+    def __len__(self):
+        return len(self.row_ids)
+
+    # Alinha a cesta às linhas atuais (ids (N,) e fatores codificados (N, 6)), na ordem dada, e
+    # recalcula apenas as linhas novas ou alteradas. Devolve os índices (nas linhas atuais) recalculados.
+    def update(self, row_ids, coded, iat_terms=IAT_TERMS):
+        row_ids = np.asarray(row_ids, dtype=np.int64)
+        coded = np.asarray(coded, dtype=float).reshape(len(row_ids), len(FACTORS))
+        previous = np.zeros(len(row_ids), dtype=np.int64)
+        stale = np.ones(len(row_ids), dtype=bool)
+        if iat_terms == self.iat_terms and len(self.row_ids) and len(row_ids):
+            order = np.argsort(self.row_ids)
+            previous = order[np.searchsorted(self.row_ids, row_ids, sorter=order).clip(max=len(order) - 1)]
+            stale = (self.row_ids[previous] != row_ids) | (self.coded[previous] != coded).any(axis=1)
+
+        recomputed = np.flatnonzero(stale)
+        kept = np.flatnonzero(~stale)
+        fresh = model_responses_batch(coded[recomputed], iat_terms)
+        responses = {}
+        for response in MODEL_RESPONSES:
+            values = np.empty(len(row_ids))
+            values[kept] = self.responses[response][previous[kept]]
+            values[recomputed] = fresh[response]
+            responses[response] = values
+
+        self.row_ids, self.coded, self.responses, self.iat_terms = row_ids.copy(), coded.copy(), responses, iat_terms
+        return recomputed
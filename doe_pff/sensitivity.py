@@ -0,0 +1,99 @@
+"""Análise de sensibilidade global: índices de Sobol de primeira ordem e totais.
+
+O espaço A–F é amostrado por quase-Monte Carlo (sequência de Sobol embaralhada, via scipy.stats.qmc)
+no esquema de Saltelli: duas matrizes A e B e, para cada fator i, a matriz A_B^(i) (A com a coluna i
+de B). Fatores categóricos recebem -1 ou +1 com probabilidade 1/2; B, D e F são uniformes no cubo
+codificado [-1, 1].
+
+Estimadores: primeira ordem de Saltelli (2010), S_i = E[f(B) (f(A_B^(i)) - f(A))] / V, e total de
+Jansen, ST_i = E[(f(A) - f(A_B^(i)))²] / (2 V). As amostras são geradas e avaliadas em blocos, que
+devolvem apenas somas parciais; os blocos podem ser distribuídos entre processos e a memória não
+cresce com o número de amostras.
+"""
+import os
+
+import numpy as np
+
+from doe_pff.coding import FACTORS
+from doe_pff.models import IAT_TERMS, MODEL_RESPONSES, model_responses_batch
+
+DEFAULT_N_SAMPLES = 2 ** 16
+DEFAULT_CHUNK_SIZE = 2 ** 15  # potência de 2, para que cada bloco seja um trecho balanceado da sequência
+DEFAULT_WORKERS = min(os.cpu_count() or 1, 8)  # para scripts; a página calcula num só processo
+
+CATEGORICAL_MASK = np.array([factor_type == "categorical" for _, _, factor_type, _ in FACTORS])
+SENSITIVITY_RESPONSES = MODEL_RESPONSES
+
+
+# Converte pontos do hipercubo unitário para fatores codificados
+def _to_coded(unit_samples):
+    return np.where(CATEGORICAL_MASK, np.where(unit_samples < 0.5, -1.0, 1.0), 2 * unit_samples - 1)
+
+
+# Somas parciais de um bloco [start, start + n) da sequência de Sobol (d = 2 x 6 dimensões).
+# Função de nível de módulo para poder ser enviada a outros processos.
+def _saltelli_partial_sums(start, n_samples, seed, iat_terms):
+    from scipy.stats import qmc
+
+    n_factors = len(FACTORS)
+    sampler = qmc.Sobol(d=2 * n_factors, scramble=True, seed=seed)
+    if start:
+        sampler.fast_forward(start)
+    unit_samples = sampler.random(n_samples)
+    matrix_a = _to_coded(unit_samples[:, :n_factors])
+    matrix_b = _to_coded(unit_samples[:, n_factors:])
+
+    f_a = model_responses_batch(matrix_a, iat_terms)
+    f_b = model_responses_batch(matrix_b, iat_terms)
+    sums = {
+        response: {
+            "sum": f_a[response].sum() + f_b[response].sum(),
+            "sum_sq": (f_a[response] ** 2).sum() + (f_b[response] ** 2).sum(),
+            "first_order": np.zeros(n_factors),
+            "total": np.zeros(n_factors),
+        }
+        for response in SENSITIVITY_RESPONSES
+    }
+    for i in range(n_factors):
+        matrix_ab = matrix_a.copy()
+        matrix_ab[:, i] = matrix_b[:, i]
+        f_ab = model_responses_batch(matrix_ab, iat_terms)
+        for response in SENSITIVITY_RESPONSES:
+            difference = f_ab[response] - f_a[response]
+            sums[response]["first_order"][i] = (f_b[response] * difference).sum()
+            sums[response]["total"][i] = (difference ** 2).sum()
+    return sums
+
+
+# Índices de Sobol para IAT, viscosidade e desgaste (modelos sem ruído).
+# Custa n_samples x (6 + 2) avaliações de cada modelo. Devolve, por resposta,
+# {"first_order": (6,), "total": (6,), "variance": float}, na ordem dos fatores A–F.
+def sobol_indices(n_samples=DEFAULT_N_SAMPLES, seed=None, iat_terms=IAT_TERMS, workers=1,
+                  chunk_size=DEFAULT_CHUNK_SIZE):
+    if seed is None:
+        seed = int(np.random.default_rng().integers(2 ** 32))
+    chunks = [(start, min(chunk_size, n_samples - start)) for start in range(0, n_samples, chunk_size)]
+
+    if workers > 1 and len(chunks) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=min(workers, len(chunks))) as pool:
+            partial_sums = list(pool.map(_saltelli_partial_sums, *zip(*chunks),
+                                         [seed] * len(chunks), [iat_terms] * len(chunks)))
+    else:
+        partial_sums = [_saltelli_partial_sums(start, n, seed, iat_terms) for start, n in chunks]
+
+    indices = {}
+    for response in SENSITIVITY_RESPONSES:
+        total_sum = sum(partial[response]["sum"] for partial in partial_sums)
+        total_sum_sq = sum(partial[response]["sum_sq"] for partial in partial_sums)
+        mean = total_sum / (2 * n_samples)
+        variance = total_sum_sq / (2 * n_samples) - mean ** 2
+        first_order = sum(partial[response]["first_order"] for partial in partial_sums) / n_samples
+        total = sum(partial[response]["total"] for partial in partial_sums) / (2 * n_samples)
+        if variance <= 0:
+            first_order, total = np.zeros_like(first_order), np.zeros_like(total)
+        else:
+            first_order, total = first_order / variance, total / variance
+        indices[response] = {"first_order": first_order, "total": total, "variance": variance}
+    return indices
@@ -0,0 +1,444 @@
+"""Servidor HTTP local de pontuação: IAT, viscosidade e desgaste como endpoints JSON.
+
+Só usa a biblioteca padrão e o NumPy. As requisições são tratadas com asyncio (HTTP/1.1 com
+keep-alive); lotes grandes são decodificados, pontuados e serializados num pool de processos, para
+que o laço de eventos continue atendendo as demais conexões.
+
+Endpoints:
+    GET  /health      -> {"status": "ok"}
+    GET  /stats       -> requisições, formulações, tempo de servidor e acertos do cache
+    POST /iat         -> {"iat": ..., "error_range": ...}   (uma formulação)
+    POST /viscosity   -> {"viscosity": ...}                 (uma formulação)
+    POST /desgaste    -> {"desgaste": ...}                  (uma formulação)
+    POST /score       -> {"n": N, "iat": [...], "iat_error_range": ..., "viscosity": [...], "desgaste": [...]}
+
+Formulações: valores reais por letra, {"A": "Amínico", "B": 0.5, ...}, ou codificados,
+{"coded": [6 valores]}. O /score aceita colunas, {"A": [...], ..., "F": [...]} (o formato mais
+rápido), uma lista de formulações, {"formulations": [{...}, ...]}, ou {"coded": [[...], ...]};
+"responses" escolhe as respostas (padrão: as três). Para grandes volumes, o /score também aceita o
+corpo binário (Content-Type: application/octet-stream) com a matriz codificada (N, 6) em float64
+little-endian, por linhas, e as respostas em ?responses=iat,viscosity: sem decodificar JSON, o
+tempo de servidor fica dominado pela serialização da resposta, que é sempre JSON. Viscosidade e
+desgaste são as tendências dos modelos qualitativos, sem ruído, de modo que a mesma formulação
+sempre tem a mesma resposta e pode ser servida do cache.
+
+O cache LRU guarda as respostas já serializadas: por formulação (valores codificados) nos endpoints
+individuais e pelo conteúdo do corpo no /score — consultar um cache linha a linha custaria mais que
+recalcular o lote vetorizado.
+
+Uso:
+    python -m doe_pff.server --port 8765 --workers 4
+"""
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from urllib.parse import parse_qs
+
+import numpy as np
+
+from doe_pff.coding import FACTOR_LETTERS, FACTORS, code_factor_columns_checked
+from doe_pff.models import (
+    IAT_ERROR_RANGE,
+    calculate_desgaste_qualitative_batch,
+    calculate_iat_batch,
+    calculate_viscosity_qualitative_batch,
+)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_WORKERS = min(os.cpu_count() or 1, 8)
+DEFAULT_CACHE_ENTRIES = 4096
+DEFAULT_CACHE_BYTES = 256 * 2 ** 20
+INLINE_BODY_BYTES = 64 * 2 ** 10  # corpos menores são pontuados no próprio laço de eventos
+MAX_BODY_BYTES = 256 * 2 ** 20
+OUTPUT_DECIMALS = 6
+BINARY_CONTENT_TYPE = "application/octet-stream"
+
+# Resposta: função da matriz codificada (N, 6) -> (N,)
+RESPONSE_MODELS = {
+    "iat": lambda coded: calculate_iat_batch(coded)[0],
+    "viscosity": calculate_viscosity_qualitative_batch,
+    "desgaste": calculate_desgaste_qualitative_batch,
+}
+SINGLE_ENDPOINTS = {"/iat": "iat", "/viscosity": "viscosity", "/desgaste": "desgaste"}
+HTTP_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+                413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+# --- Decodificação e Pontuação (funções de módulo, executadas também nos processos do pool) ---
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+# Cada valor dos fatores deve ser um número (fatores numéricos) ou um dos níveis (categóricos). O
+# ValueError aponta o campo e a formulação, em vez do erro interno da conversão (ex.: "unhashable
+# type: 'dict'" para um objeto no lugar do nível); `field(letra, linha)` dá o nome do campo.
+def _check_factor_values(columns, field):
+    for (letter, _, factor_type, levels), values in zip(FACTORS, columns):
+        # Verificação vetorizada primeiro; a varredura valor a valor só roda se houver algo errado
+        if factor_type == "categorical":
+            try:
+                if set(values) <= set(levels):
+                    continue
+            except TypeError:  # valores não hasheáveis (listas, objetos)
+                pass
+            is_valid, expected = (lambda value: isinstance(value, str) and value in levels,
+                                  f"um dos níveis: {', '.join(levels)}")
+        else:
+            try:
+                array = np.asarray(values)
+            except ValueError:  # listas aninhadas de tamanhos diferentes
+                array = None
+            if array is not None and array.ndim == 1 and array.dtype.kind in "iuf":
+                continue
+            is_valid, expected = _is_number, "um número"
+        row = next((i for i, value in enumerate(values) if not is_valid(value)), None)
+        if row is not None:
+            raise ValueError(f"Valor inválido em {field(letter, row)}: {values[row]!r} (esperado {expected})")
+
+
+# "coded": uma formulação (6 números) ou uma lista de formulações -> matriz (N, 6)
+def _coded_array(values):
+    try:
+        array = np.asarray(values)
+    except ValueError:
+        array = None
+    if array is not None and array.ndim in (1, 2) and array.shape[-1:] == (len(FACTORS),) \
+            and array.dtype.kind in "iuf":
+        return array.astype(float).reshape(-1, len(FACTORS))
+
+    if not isinstance(values, list):
+        raise ValueError(f"'coded' deve ser uma lista com {len(FACTORS)} números ou uma lista de formulações")
+    single = not any(isinstance(row, list) for row in values)
+    for i, row in enumerate([values] if single else values):
+        name = "coded" if single else f"coded[{i}]"
+        if not isinstance(row, list) or len(row) != len(FACTORS):
+            raise ValueError(f"{name} deve ser uma lista com {len(FACTORS)} números")
+        for j, value in enumerate(row):
+            if not _is_number(value):
+                raise ValueError(f"Valor inválido em {name}[{j}]: {value!r} (esperado um número)")
+    raise ValueError(f"'coded' deve ter {len(FACTORS)} números por formulação")
+
+
+# Matriz codificada (N, 6) a partir do corpo já decodificado; ValueError com a causa se inválido
+def coded_from_payload(payload):
+    if not isinstance(payload, dict):
+        raise ValueError("O corpo deve ser um objeto JSON")
+    if "coded" in payload:
+        coded = _coded_array(payload["coded"])
+    elif "formulations" in payload:
+        formulations = payload["formulations"]
+        if not isinstance(formulations, list) or not all(isinstance(row, dict) for row in formulations):
+            raise ValueError("'formulations' deve ser uma lista de objetos com as letras A–F")
+        missing = sorted({letter for row in formulations for letter in FACTOR_LETTERS if letter not in row})
+        if missing:
+            raise ValueError(f"Fatores ausentes em 'formulations': {', '.join(missing)}")
+        columns = [[row[letter] for row in formulations] for letter in FACTOR_LETTERS]
+        _check_factor_values(columns, lambda letter, row: f"formulations[{row}].{letter}")
+        coded = code_factor_columns_checked(columns)
+    else:
+        missing = [letter for letter in FACTOR_LETTERS if letter not in payload]
+        if missing:
+            raise ValueError(f"Fatores ausentes: {', '.join(missing)} (ou envie 'coded' / 'formulations')")
+        is_column = {letter: isinstance(payload[letter], list) for letter in FACTOR_LETTERS}
+        columns = [payload[letter] if is_column[letter] else [payload[letter]] for letter in FACTOR_LETTERS]
+        _check_factor_values(columns, lambda letter, row: f"{letter}[{row}]" if is_column[letter] else letter)
+        coded = code_factor_columns_checked(columns)
+    if not np.isfinite(coded).all():
+        raise ValueError("Os fatores devem ser números finitos")
+    return coded
+
+
+def _requested_responses(payload):
+    responses = payload.get("responses", tuple(RESPONSE_MODELS))
+    if not isinstance(responses, (list, tuple)) or not all(isinstance(response, str) and response in RESPONSE_MODELS
+                                                            for response in responses):
+        raise ValueError(f"'responses' deve ser uma lista com {', '.join(RESPONSE_MODELS)}")
+    return tuple(responses)
+
+
+# Array JSON de números com `decimals` casas, montado byte a byte pelo NumPy: cada valor ocupa um
+# campo de largura fixa (espaços à esquerda são válidos em JSON). float.__repr__, usado por
+# json.dumps, custaria ~10x mais por valor e dominaria o tempo de um lote.
+def encode_number_array(values, decimals=OUTPUT_DECIMALS):
+    values = np.asarray(values, dtype=float)
+    scale = 10 ** decimals
+    scaled = np.rint(values * scale)
+    if len(values) == 0 or not np.isfinite(scaled).all() or np.abs(values).max() >= 10 ** 9:
+        return json.dumps(np.round(values, decimals).tolist()).encode()
+
+    # Parte inteira e decimais separadas cabem em uint32, bem mais rápido que dividir em int64
+    magnitude = np.abs(scaled)
+    integer_part = (magnitude // scale).astype(np.uint32)
+    fraction = (magnitude - integer_part * float(scale)).astype(np.uint32)
+    n_int_digits = len(str(int(integer_part.max())))
+    powers = 10 ** np.arange(max(n_int_digits, decimals), dtype=np.uint32)
+    # Campo: [sinal][parte inteira][.][decimais][,]
+    field = np.empty((len(values), n_int_digits + decimals + 3), dtype=np.uint8)
+    field[:, 0] = ord(" ")
+    field[:, 1:1 + n_int_digits] = integer_part[:, None] // powers[n_int_digits - 1::-1] % 10 + ord("0")
+    field[:, 1 + n_int_digits] = ord(".")
+    field[:, 2 + n_int_digits:-1] = fraction[:, None] // powers[decimals - 1::-1] % 10 + ord("0")
+    field[:, -1] = ord(",")
+    # Zeros à esquerda viram espaços (JSON não aceita "05.2"), mantendo um dígito antes do ponto;
+    # o sinal vai logo antes do primeiro dígito
+    n_leading = n_int_digits - 1 - (integer_part[:, None] >= powers[1:n_int_digits]).sum(axis=1)
+    field[:, 1:n_int_digits][np.arange(n_int_digits - 1) < n_leading[:, None]] = ord(" ")
+    negative = np.flatnonzero(scaled < 0)
+    field[negative, n_leading[negative]] = ord("-")
+    return b"[" + field.tobytes()[:-1] + b"]"
+
+
+# Pontua um lote e devolve o JSON {"n", resposta: [...]} (com "iat_error_range" se o IAT for pedido)
+def score_coded(coded, responses=tuple(RESPONSE_MODELS)):
+    parts = [b'{"n": %d' % len(coded)]
+    for response in responses:
+        parts.append(b', "%s": %s' % (response.encode(), encode_number_array(RESPONSE_MODELS[response](coded))))
+        if response == "iat":
+            parts.append(b', "iat_error_range": %s' % json.dumps(IAT_ERROR_RANGE).encode())
+    return b"".join(parts) + b"}"
+
+
+# Corpo do /score -> (corpo da resposta, formulações). Só bytes vão e voltam dos processos do pool.
+# Com `binary_responses`, o corpo é a matriz codificada (N, 6) em float64 little-endian, por linhas.
+def score_batch_body(body, binary_responses=None):
+    if binary_responses is None:
+        payload = json.loads(body)
+        coded, responses = coded_from_payload(payload), _requested_responses(payload)
+    else:
+        if len(body) % (8 * len(FACTORS)):
+            raise ValueError(f"O corpo binário deve ter N x {len(FACTORS)} valores float64")
+        coded, responses = np.frombuffer(body, dtype="<f8").reshape(-1, len(FACTORS)), binary_responses
+        if not np.isfinite(coded).all():
+            raise ValueError("Os fatores devem ser números finitos")
+    return score_coded(coded, responses), len(coded)
+
+
+class LRUCache:
+    # Respostas serializadas, (bytes, formulações), limitadas em entradas e em bytes; usado só pela
+    # thread do laço de eventos, sem trava
+    def __init__(self, max_entries=DEFAULT_CACHE_ENTRIES, max_bytes=DEFAULT_CACHE_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.n_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        value = self._entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        if self.max_entries <= 0 or len(value[0]) > self.max_bytes:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self.n_bytes -= len(previous[0])
+        self._entries[key] = value
+        self.n_bytes += len(value[0])
+        while len(self._entries) > self.max_entries or self.n_bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.n_bytes -= len(evicted[0])
+
+
+# asyncio e concurrent.futures são importados só pelo servidor, para que os processos do pool, que
+# apenas executam score_batch_body, carreguem o mínimo possível.
+class ScoringServer:
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, workers=DEFAULT_WORKERS,
+                 cache_entries=DEFAULT_CACHE_ENTRIES, cache_bytes=DEFAULT_CACHE_BYTES,
+                 inline_body_bytes=INLINE_BODY_BYTES):
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.inline_body_bytes = inline_body_bytes
+        self.cache = LRUCache(cache_entries, cache_bytes)
+        self.requests = 0
+        self.formulations = 0
+        # Tempo de parede com alguma pontuação em andamento, medido no laço de eventos: inclui a espera
+        # na fila do pool e a transferência entre processos, e requisições simultâneas contam uma vez só
+        self.server_seconds = 0.0
+        self._in_flight = 0
+        self._busy_since = 0.0
+        self._pool = None
+
+    def stats(self):
+        return {
+            "requests": self.requests,
+            "formulations": self.formulations,
+            "server_seconds": self.server_seconds + (time.perf_counter() - self._busy_since
+                                                     if self._in_flight else 0.0),
+            "cache": {"entries": len(self.cache), "bytes": self.cache.n_bytes,
+                      "hits": self.cache.hits, "misses": self.cache.misses},
+            "workers": self.workers,
+        }
+
+    # Marca uma pontuação em andamento; o tempo ocupado só avança enquanto houver alguma
+    @contextmanager
+    def _busy(self):
+        if self._in_flight == 0:
+            self._busy_since = time.perf_counter()
+        self._in_flight += 1
+        try:
+            yield
+        finally:
+            self._in_flight -= 1
+            if self._in_flight == 0:
+                self.server_seconds += time.perf_counter() - self._busy_since
+
+    # Uma formulação: a chave do cache são os valores codificados, qualquer que seja o formato enviado
+    def _score_single(self, response, body):
+        coded = coded_from_payload(json.loads(body))
+        if len(coded) != 1:
+            raise ValueError("Este endpoint pontua uma formulação; use /score para lotes")
+        key = (response, coded.tobytes())
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        value = round(float(RESPONSE_MODELS[response](coded)[0]), OUTPUT_DECIMALS)
+        result = {"iat": value, "error_range": IAT_ERROR_RANGE} if response == "iat" else {response: value}
+        content = json.dumps(result).encode()
+        self.cache.put(key, (content, 1))
+        return content, 1
+
+    async def _score_batch(self, body, binary_responses=None):
+        key = ("/score", binary_responses, hashlib.blake2b(body, digest_size=16).digest())
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        if self._pool is None or len(body) <= self.inline_body_bytes:
+            content, n_formulations = score_batch_body(body, binary_responses)
+        else:
+            import asyncio
+
+            content, n_formulations = await asyncio.get_running_loop().run_in_executor(
+                self._pool, score_batch_body, body, binary_responses)
+        self.cache.put(key, (content, n_formulations))
+        return content, n_formulations
+
+    # (status, corpo JSON) de uma requisição
+    async def dispatch(self, method, target, body, content_type="application/json"):
+        path, _, query = target.partition("?")
+        if path in ("/health", "/stats"):
+            if method != "GET":
+                return 405, {"error": "Use GET"}
+            return 200, {"status": "ok"} if path == "/health" else self.stats()
+        if path != "/score" and path not in SINGLE_ENDPOINTS:
+            return 404, {"error": f"Endpoint desconhecido: {path}"}
+        if method != "POST":
+            return 405, {"error": "Use POST com um corpo JSON"}
+
+        try:
+            with self._busy():
+                if path == "/score" and content_type == BINARY_CONTENT_TYPE:
+                    responses = parse_qs(query).get("responses", [",".join(RESPONSE_MODELS)])[0].split(",")
+                    content, n_formulations = await self._score_batch(
+                        body, _requested_responses({"responses": responses}))
+                elif path == "/score":
+                    content, n_formulations = await self._score_batch(body)
+                else:
+                    content, n_formulations = self._score_single(SINGLE_ENDPOINTS[path], body)
+        except ValueError as error:  # entrada inválida (inclui json.JSONDecodeError)
+            return 400, {"error": str(error)}
+        self.requests += 1
+        self.formulations += n_formulations
+        return 200, content
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, version = request_line.decode("latin-1").split()
+                headers = {}
+                while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                content_length = int(headers.get("content-length", 0))
+                if content_length > MAX_BODY_BYTES:
+                    await self._respond(writer, 413, {"error": f"Corpo acima de {MAX_BODY_BYTES} bytes"}, False)
+                    break
+                body = await reader.readexactly(content_length)
+                keep_alive = (headers.get("connection", "").lower() != "close"
+                              if version == "HTTP/1.1" else headers.get("connection", "").lower() == "keep-alive")
+                try:
+                    status, content = await self.dispatch(
+                        method, target, body, headers.get("content-type", "application/json").split(";")[0].strip())
+                except Exception as error:  # a conexão continua atendendo mesmo com um erro inesperado
+                    status, content = 500, {"error": f"{type(error).__name__}: {error}"}
+                await self._respond(writer, status, content, keep_alive)
+                if not keep_alive:
+                    break
+        except (ValueError, EOFError, ConnectionError):  # EOFError inclui asyncio.IncompleteReadError
+            pass  # requisição malformada ou cliente desconectado: encerra a conexão
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _respond(writer, status, content, keep_alive):
+        if not isinstance(content, bytes):
+            content = json.dumps(content, ensure_ascii=False).encode()
+        writer.write(
+            f"HTTP/1.1 {status} {HTTP_REASONS[status]}\r\n"
+            f"Content-Type: application/json\r\nContent-Length: {len(content)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + content)
+        await writer.drain()
+
+    async def serve(self, ready=None):
+        import asyncio
+        from concurrent.futures import ProcessPoolExecutor
+
+        self._pool = ProcessPoolExecutor(max_workers=self.workers) if self.workers > 0 else None
+        try:
+            server = await asyncio.start_server(self.handle_connection, self.host, self.port)
+            self.port = server.sockets[0].getsockname()[1]  # porta real quando port=0
+            if ready is not None:
+                ready(self)
+            async with server:
+                await server.serve_forever()
+        finally:
+            if self._pool is not None:
+                self._pool.shutdown(cancel_futures=True)
+
+
+def main(argv=None):
+    import argparse
+    import asyncio
+
+    parser = argparse.ArgumentParser(description="Servidor HTTP local de pontuação (IAT, viscosidade e desgaste).")
+    parser.add_argument("--host", default=DEFAULT_HOST, help=f"Endereço (padrão: {DEFAULT_HOST})")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT,
+                        help=f"Porta (padrão: {DEFAULT_PORT}; 0 escolhe uma porta livre)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help=f"Processos para lotes grandes (padrão: {DEFAULT_WORKERS}; "
+                             "0 pontua tudo no laço de eventos)")
+    parser.add_argument("--cache-entries", type=int, default=DEFAULT_CACHE_ENTRIES,
+                        help=f"Respostas no cache LRU (padrão: {DEFAULT_CACHE_ENTRIES}; 0 desliga o cache)")
+    args = parser.parse_args(argv)
+
+    server = ScoringServer(args.host, args.port, workers=args.workers, cache_entries=args.cache_entries)
+
+    def ready(running):
+        print(f"Servidor de pontuação em http://{running.host}:{running.port}", flush=True)
+
+    try:
+        asyncio.run(server.serve(ready))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Superfícies de resposta em grade densa para qualquer par de fatores.
+
+A grade é montada com uma única atribuição por broadcast (os demais fatores ficam fixos) e
+avaliada pelos modelos vetorizados. Antes de ir para o JSON do Plotly, a grade é reduzida de forma
+adaptativa: parte-se de uma grade grossa e só se acrescentam pontos onde a interpolação bilinear não
+reproduz a grade completa dentro de uma tolerância. Os valores são então quantizados em float32.
+"""
+import numpy as np
+
+from doe_pff.coding import FACTORS
+from doe_pff.models import IAT_TERMS, model_response_batch
+
+DEFAULT_RESOLUTION = 500
+DEFAULT_MIN_POINTS = 41  # resolução mínima por eixo numérico após a redução, para contornos suaves
+DEFAULT_TOLERANCE = 0.005  # erro máximo de reconstrução, como fração da amplitude da resposta
+
+
+# Eixo codificado de um fator: fatores categóricos só têm os níveis -1 e +1
+def factor_axis(factor_index, resolution=DEFAULT_RESOLUTION):
+    if FACTORS[factor_index][2] == "categorical":
+        return np.array([-1.0, 1.0])
+    return np.linspace(-1.0, 1.0, resolution)
+
+
+# Avalia `response` na grade (y, x) do par de fatores (x_index, y_index), com os demais fixos em
+# `fixed_coded` (6 valores codificados), com o modelo sem ruído (superfície determinística).
+# Devolve (eixo x, eixo y, Z com forma (len(y), len(x))).
+def response_grid(response, x_index, y_index, fixed_coded, resolution=DEFAULT_RESOLUTION, iat_terms=IAT_TERMS):
+    if x_index == y_index:
+        raise ValueError("Escolha dois fatores diferentes para a superfície de resposta")
+    x_axis = factor_axis(x_index, resolution)
+    y_axis = factor_axis(y_index, resolution)
+
+    coded = np.empty((len(y_axis), len(x_axis), len(FACTORS)))
+    coded[...] = np.asarray(fixed_coded, dtype=float)
+    coded[..., x_index] = x_axis[None, :]
+    coded[..., y_index] = y_axis[:, None]
+
+    z = model_response_batch(response, coded.reshape(-1, len(FACTORS)), iat_terms)
+    return x_axis, y_axis, z.reshape(len(y_axis), len(x_axis))
+
+
+# Matriz (len(axis), len(sample_indices)) de interpolação linear a partir dos pontos amostrados
+def _interpolation_matrix(n_full, sample_indices):
+    weights = np.zeros((n_full, len(sample_indices)))
+    position = np.interp(np.arange(n_full), sample_indices, np.arange(len(sample_indices)))
+    left = np.minimum(np.floor(position).astype(int), len(sample_indices) - 2)
+    fraction = position - left
+    rows = np.arange(n_full)
+    weights[rows, left] = 1 - fraction
+    weights[rows, left + 1] += fraction
+    return weights
+
+
+# Índices amostrados ao longo do eixo 1 de `profiles` (m perfis de comprimento n): parte de
+# `min_points` pontos uniformes e divide ao meio os intervalos cuja interpolação linear erra mais
+# que `tolerance`. Descontinuidades (ex.: o degrau do desgaste em D) recebem pontos só ao seu redor.
+def _adaptive_indices(profiles, tolerance, min_points):
+    n_full = profiles.shape[1]
+    indices = np.unique(np.linspace(0, n_full - 1, min(min_points, n_full)).round().astype(int))
+    while len(indices) < n_full:
+        reconstructed = profiles[:, indices] @ _interpolation_matrix(n_full, indices).T
+        error = np.abs(reconstructed - profiles).max(axis=0)
+        bad_points = np.nonzero(error > tolerance)[0]
+        if len(bad_points) == 0:
+            break
+        # Pontos amostrados têm erro zero, então cada ponto ruim está dentro de um intervalo
+        left = np.unique(np.searchsorted(indices, bad_points) - 1)
+        indices = np.union1d(indices, (indices[left] + indices[left + 1]) // 2)
+    return indices
+
+
+# Redução adaptativa da grade: devolve (eixo x, eixo y, Z em float32) com os pontos necessários para
+# que a reconstrução bilinear fique dentro de `tolerance` x amplitude de Z (metade do erro para cada
+# eixo). Eixos categóricos (2 pontos) não são reduzidos.
+def downsample_grid(x_axis, y_axis, z, tolerance=DEFAULT_TOLERANCE, min_points=DEFAULT_MIN_POINTS):
+    axis_tolerance = tolerance * (float(np.ptp(z)) or 1.0) / 2
+    x_indices = _adaptive_indices(z, axis_tolerance, min_points)
+    y_indices = _adaptive_indices(z[:, x_indices].T, axis_tolerance, min_points)
+    return x_axis[x_indices], y_axis[y_indices], z[np.ix_(y_indices, x_indices)].astype(np.float32)
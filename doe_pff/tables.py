@@ -0,0 +1,276 @@
+"""Tabelas (pandas) da página, sem dependência do Streamlit.
+
+Montam os DataFrames mostrados e exportados pela interface a partir dos resultados da biblioteca:
+ranking da otimização, índices de Sobol, matriz do planejamento, efeitos e limites de Lenth,
+coeficientes do ajuste do IAT, tabela da cesta de cenários e métricas da instrumentação. Também
+leem as tabelas enviadas (corridas, cenários e ensaios do laboratório) e validam os fatores com as
+mesmas regras do lote e do servidor. A interface (est.py) apenas liga os controles a estas funções.
+Como doe_pff.figures, este módulo importa pandas e não é carregado por `import doe_pff`.
+"""
+import io
+
+import numpy as np
+import pandas as pd
+
+from doe_pff.coding import FACTORS, FACTOR_LETTERS, code_factor_columns_checked, decode_factor_columns
+from doe_pff.design import DESIGN_LETTERS
+from doe_pff.effects import estimate_effects, lenth_significance
+from doe_pff.fitting import term_name
+from doe_pff.models import (
+    IAT_TERMS,
+    calculate_desgaste_qualitative_batch,
+    calculate_iat_batch,
+    calculate_viscosity_qualitative_batch,
+)
+
+# Rótulos das respostas (com a unidade) e os nomes curtos usados em tabelas e títulos
+RESPONSE_LABELS = {
+    "iat": "Acidez Predita (mg KOH/g)",
+    "viscosity": "Viscosidade Predita (cSt)",
+    "desgaste": "Desgaste Predito (mm)",
+}
+RESPONSE_NAMES = {response: label.split(" (")[0] for response, label in RESPONSE_LABELS.items()}
+FACTOR_LABELS = tuple(f"{factor_name} ({letter})" for letter, factor_name, _, _ in FACTORS)
+
+
+# Colunas dos fatores A–F em valores reais, rotuladas "Nome (letra)"
+def _factor_columns(coded_factors):
+    return dict(zip(FACTOR_LABELS, decode_factor_columns(coded_factors)))
+
+
+# Lê uma tabela de corridas (CSV ou Parquet, pela extensão do nome). `source` é um caminho ou um
+# arquivo aberto com o atributo name (como os arquivos enviados pelo st.file_uploader).
+def read_run_table(source):
+    if str(getattr(source, "name", source)).lower().endswith(".parquet"):
+        return pd.read_parquet(source)
+    return pd.read_csv(source)
+
+
+# --- Otimização e Sensibilidade ---
+# Ranking da otimização (saída de optimize_formulations, não vazia), com os fatores em valores reais
+def optimization_table(optimization):
+    return pd.DataFrame({
+        **_factor_columns(optimization["coded"]),
+        "Acidez Predita": optimization["iat"],
+        "Viscosidade Predita": optimization["viscosity"],
+        "Desgaste (mm)": optimization["desgaste"],
+        "Desejabilidade": optimization["desirability"],
+        "Fronteira de Pareto": np.where(optimization["pareto"], "Sim", "Não"),
+        "Busca": optimization["source"],
+    }).round(3)
+
+
+# Índices de Sobol (saída de sobol_indices) em formato longo: uma linha por resposta e fator
+def sensitivity_table(indices):
+    return pd.concat([
+        pd.DataFrame({
+            "Resposta": RESPONSE_NAMES[response],
+            "Fator": FACTOR_LABELS,
+            "Primeira Ordem (S)": response_indices["first_order"],
+            "Total (ST)": response_indices["total"],
+        })
+        for response, response_indices in indices.items()
+    ], ignore_index=True).round(4)
+
+
+# --- Planejamentos e Efeitos ---
+# Matriz do planejamento (-1/+1, em ordem padrão) com as corridas numeradas a partir de 1. Com 6
+# fatores, as colunas A–F da sidebar são acrescentadas nos níveis reais.
+def design_table(design):
+    design_matrix = design.design_matrix()
+    df_design = pd.DataFrame(design_matrix.astype(int), columns=list(DESIGN_LETTERS[:design.n_factors]))
+    if design.n_factors == len(FACTORS):
+        df_design = pd.concat([df_design, pd.DataFrame(_factor_columns(design_matrix))], axis=1)
+    df_design.index = pd.RangeIndex(1, design.n_runs + 1, name="Corrida")
+    return df_design
+
+
+# Tabela de efeitos de várias respostas (formato longo) e limites de Lenth por resposta
+def effects_tables(design_matrix, responses, response_names):
+    effects = estimate_effects(design_matrix, responses)
+    lenth = lenth_significance(effects["estimate"])
+    df_effects = pd.concat([
+        pd.DataFrame({
+            "Resposta": response_name,
+            "Efeito": effects["name"],
+            "Cadeia de Confundimento": effects["alias_chain"],
+            "Ordem": effects["order"],
+            "Estimativa": effects["estimate"][:, k],
+            "Significativo (Lenth)": np.where(lenth["significant"][:, k], "Sim", "Não"),
+        })
+        for k, response_name in enumerate(response_names)
+    ], ignore_index=True)
+    df_lenth = pd.DataFrame({"Resposta": response_names, "PSE": lenth["pse"], "ME": lenth["me"], "SME": lenth["sme"]})
+    return df_effects, df_lenth
+
+
+# Efeitos das três respostas dos modelos (sem ruído) num planejamento com os fatores A–F
+def simulated_effects_tables(design_matrix, iat_terms=IAT_TERMS):
+    responses = np.column_stack([
+        calculate_iat_batch(design_matrix, terms=iat_terms)[0],
+        calculate_viscosity_qualitative_batch(design_matrix),
+        calculate_desgaste_qualitative_batch(design_matrix),
+    ])
+    return effects_tables(design_matrix, responses, list(RESPONSE_NAMES.values()))
+
+
+# Efeitos de uma tabela de corridas: colunas dos fatores codificadas em -1/+1 e uma ou mais de resposta
+def run_table_effects(df_table, factor_columns, response_columns):
+    return effects_tables(df_table[factor_columns].to_numpy(dtype=float),
+                          df_table[response_columns].to_numpy(dtype=float),
+                          [str(column) for column in response_columns])
+
+
+# Efeitos de uma resposta (linhas de effects_tables) e os seus limites de Lenth (PSE, ME e SME)
+def response_effects(df_effects, df_lenth, response_name):
+    return (df_effects[df_effects["Resposta"] == response_name],
+            df_lenth.set_index("Resposta").loc[response_name])
+
+
+# Colunas numéricas de uma tabela de corridas e, entre elas, as que parecem fatores (só -1 e +1)
+def run_table_columns(df_table):
+    numeric_columns = list(df_table.select_dtypes("number").columns)
+    coded_columns = [column for column in numeric_columns if df_table[column].isin((-1, 1)).all()]
+    return numeric_columns, coded_columns
+
+
+# --- Ajuste do Modelo de IAT ---
+# Lê os ensaios do laboratório (CSV com as colunas A–F em valores reais e o IAT medido). Níveis
+# desconhecidos, valores não numéricos e células vazias geram ValueError (nenhum ensaio é usado).
+def read_lab_runs(source):
+    df_runs = pd.read_csv(source)
+    missing = [column for column in FACTOR_LETTERS + ("IAT",) if column not in df_runs.columns]
+    if missing:
+        raise ValueError(f"Colunas ausentes: {', '.join(missing)}")
+    coded_runs = code_factor_columns_checked([df_runs[letter].to_numpy() for letter in FACTOR_LETTERS])
+    responses = pd.to_numeric(df_runs["IAT"], errors="coerce").to_numpy(dtype=float)
+    if not np.isfinite(responses).all():
+        raise ValueError("A coluna IAT tem valores ausentes, não numéricos ou não finitos")
+    return coded_runs, responses
+
+
+# Coeficientes ajustados (IncrementalLeastSquares estimável) ao lado dos coeficientes do artigo
+def fit_summary_table(iat_fit):
+    fit_summary = iat_fit.summary()
+    paper_coefficients = {term_name(term): coefficient for term, coefficient in IAT_TERMS}
+    return pd.DataFrame({
+        "Termo": fit_summary["term"],
+        "Coeficiente": fit_summary["coefficient"],
+        "Erro Padrão": fit_summary["standard_error"],
+        "t": fit_summary["t"],
+        "Valor-p": fit_summary["p_value"],
+        "Coeficiente do Artigo": [paper_coefficients.get(term) for term in fit_summary["term"]],
+    }).round(4)
+
+
+# --- Cesta de Cenários ---
+# A tabela de cenários guarda o nome e os valores reais dos fatores nas colunas A–F (o mesmo formato
+# de doe_pff.batch e do servidor de pontuação). O índice (inteiro) identifica as linhas na
+# ScenarioBasket, para que só as linhas novas ou alteradas sejam recalculadas.
+SCENARIO_COLUMNS = ["Cenário", *FACTOR_LETTERS]
+# Colunas de resposta da tabela de cenários, na ordem de MODEL_RESPONSES
+SCENARIO_RESPONSE_COLUMNS = {
+    "iat": "IAT (mg KOH/g)",
+    "viscosity": "Viscosidade (cSt)",
+    "desgaste": "Desgaste (mm)",
+}
+
+
+def empty_scenario_table():
+    return pd.DataFrame({
+        "Cenário": pd.Series(dtype=object),
+        **{letter: pd.Series(dtype=object if factor_type == "categorical" else float)
+           for letter, _, factor_type, _ in FACTORS},
+    })
+
+
+# Tabela importada (CSV ou Parquet): exige as colunas A–F; o nome do cenário é opcional
+def scenario_table_from_file(source):
+    df_uploaded = read_run_table(source)
+    missing = [letter for letter in FACTOR_LETTERS if letter not in df_uploaded.columns]
+    if missing:
+        raise ValueError(f"Colunas de fatores ausentes no arquivo: {', '.join(missing)}")
+    if "Cenário" not in df_uploaded.columns:
+        df_uploaded.insert(0, "Cenário", [f"Cenário {i + 1}" for i in range(len(df_uploaded))])
+    code_factor_columns_checked([df_uploaded[letter].to_numpy() for letter in FACTOR_LETTERS])
+    df_table = df_uploaded[SCENARIO_COLUMNS].astype(
+        {letter: float for letter, _, factor_type, _ in FACTORS if factor_type != "categorical"})
+    df_table["Cenário"] = df_table["Cenário"].fillna("").astype(str)
+    return df_table
+
+
+# Nova tabela com uma linha a mais ({letra: valor real}), num índice ainda não usado pelas demais
+def append_scenario_row(df_table, factor_values):
+    df_table = df_table.copy()
+    next_row_id = df_table.index.max() + 1 if len(df_table) else 0
+    df_table.loc[next_row_id] = {"Cenário": f"Cenário {len(df_table) + 1}", **factor_values}
+    return df_table
+
+
+# Linhas com todos os fatores preenchidos (as incompletas ficam de fora) e os seus fatores codificados.
+# Níveis desconhecidos ou valores inválidos geram ValueError.
+def complete_scenario_rows(df_table):
+    complete = df_table[df_table[list(FACTOR_LETTERS)].notna().all(axis=1)]
+    return complete, code_factor_columns_checked([complete[letter].to_numpy() for letter in FACTOR_LETTERS])
+
+
+# Rótulos únicos para os gráficos: nomes vazios ou repetidos recebem o número da linha
+def scenario_labels(names):
+    labels = names.fillna("").astype(str).str.strip()
+    numbers = pd.Series(np.arange(1, len(labels) + 1), index=labels.index).astype(str)
+    unique = (labels != "") & ~labels.duplicated(keep=False)
+    return labels.where(unique, labels.where(labels != "", "Cenário") + " #" + numbers).tolist()
+
+
+# Respostas da cesta por cenário (rótulos únicos), no formato das figuras de cenários
+def scenario_results_table(complete, basket):
+    return pd.DataFrame({
+        "Cenário": scenario_labels(complete["Cenário"]),
+        **{column: basket.responses[response] for response, column in SCENARIO_RESPONSE_COLUMNS.items()},
+    })
+
+
+# Cenários escolhidos pelo rótulo, na ordem dada
+def select_scenarios(df_scenarios, labels):
+    return df_scenarios.set_index("Cenário").loc[labels].reset_index()
+
+
+# Tabela exportada: nome e fatores reais de cada cenário seguidos das respostas calculadas
+def scenario_export_table(complete, df_scenarios):
+    return complete[SCENARIO_COLUMNS].reset_index(drop=True).assign(
+        **{column: df_scenarios[column] for column in SCENARIO_RESPONSE_COLUMNS.values()})
+
+
+def to_parquet_bytes(df):
+    buffer = io.BytesIO()
+    df.to_parquet(buffer, index=False)
+    return buffer.getvalue()
+
+
+# --- Instrumentação ---
+# Tempos por seção (esta reexecução e percentis de todas as sessões, em ms) e chamadas aos modelos, a
+# partir de MetricsRegistry.summary() e do RerunMetrics da reexecução atual
+def metrics_tables(summary, rerun):
+    df_sections = pd.DataFrame([
+        {
+            "Seção": name,
+            "Esta Reexecução (ms)": rerun.sections.get(name, np.nan) * 1000,
+            "p50 (ms)": values["p50"] * 1000,
+            "p90 (ms)": values["p90"] * 1000,
+            "p99 (ms)": values["p99"] * 1000,
+            "Medições": values["count"],
+        }
+        for name, values in summary["sections"].items()
+    ]).round(3)
+    df_models = pd.DataFrame([
+        {
+            "Modelo": model,
+            "Chamadas (esta reexecução)": rerun.model_calls.get(model, 0),
+            "Linhas (esta reexecução)": rerun.model_rows.get(model, 0),
+            "Chamadas (total)": counts["calls"],
+            "Linhas (total)": counts["rows"],
+        }
+        for model, counts in summary["model_calls"].items()
+    ], columns=["Modelo", "Chamadas (esta reexecução)", "Linhas (esta reexecução)", "Chamadas (total)",
+                "Linhas (total)"])
+    return df_sections, df_models
@@ -1,137 +1,514 @@
+import os
+
 import streamlit as st
-import pandas as pd
-import numpy as np
-import plotly.graph_objects as go
-import plotly.express as px
+
+from doe_pff.coding import FACTORS, FACTOR_LETTERS, FACTOR_LEVELS, code_factor_columns
+from doe_pff.design import DESIGN_LETTERS, FractionalFactorialDesign, minimum_aberration_design
+from doe_pff.figures import (
+    desgaste_figure,
+    effects_figure,
+    interaction_figure,
+    pareto_figure,
+    perturbation_figure,
+    scenario_comparison_figure,
+    scenario_scatter_figure,
+    sensitivity_figure,
+    surface_figure,
+)
+from doe_pff.fitting import CANDIDATE_TERMS, PAPER_TERMS, LabRuns, fit_is_usable, term_name, terms_from_names
+from doe_pff.instrumentation import DEFAULT_DUMP_INTERVAL, MetricsRegistry, start_rerun
+from doe_pff.models import IAT_ERROR_RANGE, IAT_TERMS, model_responses_batch
+from doe_pff.lookup import DiscreteLookupTable, replicate_lookup, state_index
+from doe_pff.montecarlo import DEFAULT_N_REPLICATES
+from doe_pff.optimize import DEFAULT_DESGASTE_MAX, DEFAULT_VISCOSITY_BAND, optimize_formulations
+from doe_pff.scenarios import ScenarioBasket
+from doe_pff.sensitivity import DEFAULT_N_SAMPLES, sobol_indices
+from doe_pff.surface import DEFAULT_RESOLUTION, downsample_grid, response_grid
+from doe_pff.tables import (
+    FACTOR_LABELS,
+    RESPONSE_LABELS,
+    RESPONSE_NAMES,
+    append_scenario_row,
+    complete_scenario_rows,
+    design_table,
+    empty_scenario_table,
+    fit_summary_table,
+    metrics_tables,
+    optimization_table,
+    read_lab_runs,
+    read_run_table,
+    response_effects,
+    run_table_columns,
+    run_table_effects,
+    scenario_export_table,
+    scenario_results_table,
+    scenario_table_from_file,
+    select_scenarios,
+    sensitivity_table,
+    simulated_effects_tables,
+    to_parquet_bytes,
+)
 
 # --- Configuração da Página Streamlit ---
 # REMOVIDO o argumento 'icon' para compatibilidade com versões mais antigas do Streamlit
 st.set_page_config(layout="wide", page_title="DOE PFF - Lubrificantes Industriais")
 
-
-# --- Funções Auxiliares para Codificação de Fatores ---
-# Converte valores categóricos selecionados para seus códigos -1 ou +1
-def get_coded_value_categorical(factor_name, selected_value):
-    if factor_name == "Tipo de Antioxidante":
-        return -1 if selected_value == "Amínico" else 1
-    elif factor_name == "Tipo de Antidesgaste":
-        return -1 if selected_value == "Com Zinco" else 1
-    elif factor_name == "Tipo de Óleo Base":
-        return -1 if selected_value == "Leve/Médio" else 1
-    return 0
-
-
-# Converte valores numéricos selecionados para seus códigos -1 (min), 0 (centro), +1 (max)
-def get_coded_value_numerical(factor_name, selected_value):
-    if factor_name == "Quantidade de Antioxidante":  # Min=0.2, Centro=0.5, Max=0.8
-        # Ensure selected_value is treated as float for calculation
-        return (float(selected_value) - 0.5) / 0.3
-    elif factor_name == "Quantidade de Antidesgaste":  # Min=0.5, Centro=1.75, Max=3.0
-        return (float(selected_value) - 1.75) / 1.25
-    elif factor_name == "Razão de Óleo Base":  # Min=20, Centro=50, Max=80
-        return (float(selected_value) - 50) / 30
-    return 0
-
-
-# --- Implementação dos Modelos (Baseado nos achados do Artigo) ---
-
-# Modelo preditivo para o Índice de Acidez (IAT) - Baseado na Equação do Artigo
-# Assume que A, B, C, D, E, F são os valores codificados (-1, 0, +1)
-def calculate_iat(A_coded, B_coded, C_coded, D_coded, E_coded, F_coded):
-    # Coeficientes da equação linear do artigo para Acidez
-    # ÍNDICE DE ACIDEZ = 1.92 + 0.03 * A – 0.01 * B + 1.28 * C + 0.99 * D + 0.01 * E + 0.01 * F + 0.02 * AB + 0.03 * AC + 0.05 * AF – 0.03 * BD + 0.91 * BF + 0.03 * ABD – 0.02 * ABF ± 0.17
-
-    iat = (
-            1.92
-            + 0.03 * A_coded
-            - 0.01 * B_coded
-            + 1.28 * C_coded
-            + 0.99 * D_coded
-            + 0.01 * E_coded
-            + 0.01 * F_coded
-            + 0.02 * (A_coded * B_coded)
-            + 0.03 * (A_coded * C_coded)
-            + 0.05 * (A_coded * F_coded)
-            - 0.03 * (B_coded * D_coded)
-            + 0.91 * (B_coded * F_coded)
-            + 0.03 * (A_coded * B_coded * D_coded)  # Interação ABD
-            - 0.02 * (A_coded * B_coded * F_coded)  # Interação ABF
-    )
-    # O artigo menciona +/- 0.17 como erro, o que representa uma faixa de incerteza.
-    error_range = 0.17
-    return iat, error_range
-
-
-# Modelo qualitativo para Viscosidade - Baseado nas tendências discutidas no artigo
-# O artigo afirmou que não foi possível propor um modelo preditivo linear válido devido à curvatura.
-# Esta função reflete as tendências dominantes e a interação A x D.
-def calculate_viscosity_qualitative(A_coded, B_val_actual, C_coded, D_val_actual, E_coded, F_val_actual):
-    # Valores base aproximados da Tabela 18 do artigo para Leve/Médio vs Pesado/Médio
-    base_viscosity = 0.0
-    if E_coded == -1:  # Leve/Médio
-        base_viscosity = 40.0  # Aproximado do range de 30-50 para Leve/Médio
-    else:  # Pesado/Médio
-        base_viscosity = 70.0  # Aproximado do range de 60-80 para Pesado/Médio
-
-    # Efeito da Quantidade de Antidesgaste (D_val_actual)
-    # "o aumento na concentração de antidesgaste promove uma redução na viscosidade do lubrificante"
-    # Adicionando um pequeno efeito negativo direto da quantidade, escalado.
-    D_val_scaled_for_effect = (D_val_actual - 0.5) / 2.5  # Escala de 0 a 1 para o range de D
-    base_viscosity += -3 * D_val_scaled_for_effect  # Penalidade por aumentar D
-
-    # Interação A (Tipo de Antioxidante) x D (Quant. de Antidesgaste) - Figura 40 do artigo
-    # Isso é um ajuste sobre a base.
-    if A_coded == -1:  # Amínico
-        # "viscosidade do lubrificante assume um valor máximo no nível inferior da variável D"
-        # "diminuindo seu valor conforme o aumento da quantidade de antidesgaste"
-        base_viscosity += -8 * D_val_scaled_for_effect  # Acentua a queda com D_val_actual
-    else:  # Fenólico
-        # "viscosidade assume o menor valor no nível inferior da variável D"
-        # "aumentando seu valor conforme o aumento do nível de antidesgaste"
-        base_viscosity += 8 * D_val_scaled_for_effect  # Acentua o aumento com D_val_actual
-
-    # Adicionar uma pequena variação aleatória para simular ruído/variabilidade
-    noise = np.random.uniform(-1, 1)
-    predicted_viscosity = base_viscosity + noise
-
-    # Garantir que a viscosidade esteja dentro de um range razoável observado no artigo (30-87 cSt)
-    return max(28, min(89, predicted_viscosity))
-
-
-# Modelo qualitativo para Desgaste - Baseado nas conclusões do artigo
-# O artigo afirmou que não foi possível propor um modelo preditivo significativo para o desgaste.
-# Esta função ilustra a importância dos aditivos e as tendências qualitativas.
-def calculate_desgaste_qualitative(selected_tipo_antidesgaste, D_val_actual):
-    # O artigo afirma que o óleo base sem aditivo tem desgaste de 0.771 mm
-    # e a média com aditivos é de 0.409 mm.
-
-    # Se "Sem Aditivo Antidesgaste" fosse uma opção, o valor seria 0.771.
-    # Como o usuário SEMPRE seleciona um tipo de aditivo (Com Zinco ou Sem Zinco),
-    # o valor inicial será próximo da média com aditivos.
-    desgaste = 0.409
-
-    # C_coded = -1 (Com Zinco), +1 (Sem Zinco)
-    C_coded = get_coded_value_categorical("Tipo de Antidesgaste", selected_tipo_antidesgaste)
-
-    # "o emprego do Antidesgaste sem Zinco, por conciliar proteção contra desgaste e baixa acidez."
-    # Isso sugere que "Sem Zinco" resulta em um desgaste ligeiramente menor.
-    if C_coded == -1:  # Com Zinco
-        desgaste += 0.015  # Um pouco mais de desgaste
-    else:  # Sem Zinco
-        desgaste -= 0.005  # Um pouco menos de desgaste
-
-    # "bastando acrescentar esse aditivo em sua menor proporção (0,5 %), para conseguir a proteção desejada."
-    # Isso implica que, uma vez que o aditivo é adicionado, a quantidade D_val_actual não tem um grande efeito
-    # de redução adicional no desgaste. Podemos adicionar uma pequena penalidade se a quantidade for muito baixa (mas ainda presente).
-    if D_val_actual < 0.75:  # Se a quantidade for próxima do mínimo (0.5), talvez um leve aumento ou sem mudança
-        desgaste += 0.005  # Pequeno aumento para ilustrar que o mínimo é já eficaz, mas não "super" eficaz.
-
-    # Adicionar uma pequena variação aleatória para simular ruído/variabilidade
-    noise = np.random.uniform(-0.005, 0.005)
-    predicted_desgaste = desgaste + noise
-
-    # Garantir que o desgaste esteja dentro de um range razoável observado no artigo (0.348 - 0.428 com aditivo)
-    return max(0.34, min(0.43, predicted_desgaste))
+# --- Instrumentação (Opcional) ---
+# Tempo de cada seção da página e chamadas aos modelos em cada reexecução. Fica desligada (custo
+# desprezível) a menos que a página seja aberta com ?debug=1, que mostra o painel de instrumentação
+# no fim da página, ou que DOE_PFF_METRICS_FILE indique o arquivo (.json ou .prom) lido pelo coletor.
+DEBUG_QUERY_PARAM = "debug"
+METRICS_FILE = os.environ.get("DOE_PFF_METRICS_FILE")
+
+
+# Métricas de todas as sessões do processo (janela móvel por seção e totais acumulados)
+@st.cache_resource(show_spinner=False)
+def metrics_registry():
+    return MetricsRegistry()
+
+
+debug_panel = st.query_params.get(DEBUG_QUERY_PARAM) in ("1", "true")
+instrumentation_enabled = debug_panel or bool(METRICS_FILE)
+rerun_metrics = start_rerun(instrumentation_enabled)
+
+# --- Tabela Pré-Calculada e Cache dos Gráficos ---
+# Os caches são compartilhados entre sessões e descartam as entradas mais antigas ao atingir o limite.
+# A sidebar oferece 216 combinações discretas, então o limite dos gráficos cobre todas elas.
+LOOKUP_CACHE_MAX_ENTRIES = 16
+FIGURE_CACHE_MAX_ENTRIES = 256
+
+
+# Respostas, séries de perturbação e pontos de interação das 216 combinações, calculados de uma vez.
+# A chave são os termos e a faixa de erro do modelo de IAT: com novos coeficientes (um novo ajuste),
+# a tabela é reconstruída automaticamente. A página só indexa a tabela pela combinação selecionada.
+@st.cache_resource(max_entries=LOOKUP_CACHE_MAX_ENTRIES, show_spinner=False)
+def build_lookup_table(iat_terms, iat_error_range):
+    return DiscreteLookupTable(iat_terms, iat_error_range)
+
+
+# Modo de réplicas: média e intervalo de 95% (percentis 2.5 e 97.5) de viscosidade e desgaste para
+# todas as combinações, calculados de uma vez por (número de réplicas, semente)
+@st.cache_resource(max_entries=LOOKUP_CACHE_MAX_ENTRIES, show_spinner=False)
+def build_replicate_lookup(n_replicates, seed):
+    return replicate_lookup(n_replicates, seed)
+
+
+# --- Construtores Memoizados dos Gráficos ---
+# Cada gráfico é chaveado apenas pelo que determina o seu conteúdo (a combinação selecionada ou só os
+# fatores dos quais depende), de modo que mover um controle da sidebar reconstrói somente os gráficos
+# afetados. As figuras ficam em st.cache_resource
+# (sem cópia a cada leitura): são apenas lidas por st.plotly_chart e nunca alteradas depois de criadas.
+
+# Depende de todos os fatores (o ponto atual do IAT muda com qualquer um deles): a chave é a combinação
+# selecionada e os termos do modelo de IAT. As séries vêm prontas da tabela (_lookup não entra na chave).
+@st.cache_resource(max_entries=FIGURE_CACHE_MAX_ENTRIES, show_spinner=False)
+def build_perturbation_figure(state, iat_terms, _lookup):
+    return perturbation_figure(_lookup, state)
+
+
+# A interação é chaveada pela combinação e pelas configurações de réplicas, (n_replicates, seed) ou None.
+# Os argumentos com "_" não entram na chave (convenção do Streamlit).
+@st.cache_resource(max_entries=FIGURE_CACHE_MAX_ENTRIES, show_spinner=False)
+def build_interaction_figure(state, replicate_settings, _lookup, _replicates=None):
+    return interaction_figure(_lookup, state, _replicates)
+
+
+# Depende apenas de C e D (e do desgaste predito para essa combinação)
+@st.cache_resource(max_entries=FIGURE_CACHE_MAX_ENTRIES, show_spinner=False)
+def build_desgaste_figure(selected_tipo_antidesgaste, selected_quant_antidesgaste, desgaste_predicted,
+                          desgaste_interval=None):
+    return desgaste_figure(selected_tipo_antidesgaste, selected_quant_antidesgaste, desgaste_predicted,
+                           desgaste_interval)
+
+
+# Resultado da otimização (gráfico de Pareto e ranking), chaveado pelas restrições
+@st.cache_resource(max_entries=FIGURE_CACHE_MAX_ENTRIES, show_spinner=False)
+def build_optimization_outputs(viscosity_band, desgaste_max, iat_terms):
+    optimization = optimize_formulations(viscosity_band=viscosity_band, desgaste_max=desgaste_max,
+                                         iat_terms=iat_terms)
+    if len(optimization["iat"]) == 0:
+        return None, None
+    df_optimization = optimization_table(optimization)
+    return pareto_figure(df_optimization), df_optimization
+
+
+# Grade densa da superfície de resposta, já reduzida para o envio ao navegador.
+# Chave: (resposta, par de fatores, níveis fixos dos demais fatores, termos do modelo de IAT).
+@st.cache_data(max_entries=FIGURE_CACHE_MAX_ENTRIES, show_spinner=False)
+def cached_response_surface(response, x_index, y_index, fixed_levels, iat_terms):
+    x_axis, y_axis, z = response_grid(response, x_index, y_index, fixed_levels, iat_terms=iat_terms)
+    return downsample_grid(x_axis, y_axis, z)
+
+
+@st.cache_resource(max_entries=FIGURE_CACHE_MAX_ENTRIES, show_spinner=False)
+def build_surface_figure(response, x_index, y_index, fixed_levels, plot_type, iat_terms):
+    x_axis, y_axis, z = cached_response_surface(response, x_index, y_index, fixed_levels, iat_terms)
+    return surface_figure(response, x_index, y_index, x_axis, y_axis, z, plot_type), z.shape
+
+
+# Seção de superfícies como fragmento: trocar o par de fatores ou a resposta reexecuta apenas esta seção
+@st.fragment
+def render_surface_section(current_coded_params, iat_terms):
+    surf_col1, surf_col2, surf_col3, surf_col4 = st.columns(4)
+    with surf_col1:
+        response = st.selectbox("Resposta", list(RESPONSE_LABELS), format_func=RESPONSE_NAMES.__getitem__,
+                                key="surf_resp")
+    with surf_col2:
+        x_index = st.selectbox("Fator no Eixo X", range(len(FACTORS)), index=1,
+                               format_func=FACTOR_LABELS.__getitem__, key="surf_x")
+    with surf_col3:
+        y_index = st.selectbox("Fator no Eixo Y", range(len(FACTORS)), index=5,
+                               format_func=FACTOR_LABELS.__getitem__, key="surf_y")
+    with surf_col4:
+        plot_type = st.radio("Tipo de Gráfico", ["Contorno", "Superfície 3D"], horizontal=True, key="surf_type")
+
+    if x_index == y_index:
+        st.warning("Escolha dois fatores diferentes para os eixos X e Y.")
+        return
+
+    # Os fatores do par são varridos na grade, então não fazem parte da chave do cache
+    fixed_levels = tuple(0.0 if j in (x_index, y_index) else value for j, value in enumerate(current_coded_params))
+    # Viscosidade e desgaste não dependem do modelo de IAT: a chave usa sempre os termos do artigo
+    surface_iat_terms = iat_terms if response == "iat" else IAT_TERMS
+    fig_surface, z_shape = build_surface_figure(response, x_index, y_index, fixed_levels, plot_type, surface_iat_terms)
+    st.plotly_chart(fig_surface, use_container_width=True)
+    st.caption(f"Grade calculada com até {DEFAULT_RESOLUTION} x {DEFAULT_RESOLUTION} pontos e reduzida "
+               f"adaptativamente para {z_shape[1]} x {z_shape[0]} pontos enviados ao navegador.")
+
+
+# Seção de otimização como fragmento: mover seus próprios controles reexecuta apenas esta seção
+@st.fragment
+def render_optimization_section(iat_terms):
+    opt_col1, opt_col2 = st.columns(2)
+    with opt_col1:
+        viscosity_band = st.slider("Faixa Alvo de Viscosidade (cSt)", min_value=28.0, max_value=89.0,
+                                   value=DEFAULT_VISCOSITY_BAND, step=1.0, key="opt_visc")
+    with opt_col2:
+        desgaste_max = st.slider("Desgaste Máximo (mm)", min_value=0.34, max_value=0.43,
+                                 value=DEFAULT_DESGASTE_MAX, step=0.005, format="%.3f", key="opt_desgaste")
+
+    fig_pareto, df_optimization = build_optimization_outputs(viscosity_band, desgaste_max, iat_terms)
+    if fig_pareto is None:
+        st.error("Nenhuma formulação atende às restrições selecionadas. Amplie a faixa de viscosidade ou o limite de desgaste.")
+        return
+
+    st.plotly_chart(fig_pareto, use_container_width=True)
+    st.markdown("**Ranking por Desejabilidade de Derringer** (10 melhores formulações viáveis)")
+    st.dataframe(df_optimization.head(10), use_container_width=True, hide_index=True)
+
+
+# Semente fixa: o mesmo número de amostras sempre produz os mesmos índices
+SENSITIVITY_SEED = 2019
+SENSITIVITY_SAMPLE_OPTIONS = tuple(2 ** exponent for exponent in range(12, 21))
+
+
+# Índices de Sobol (barras agrupadas por resposta) e tabela, chaveados pelo número de amostras e
+# pelos termos do modelo de IAT em uso. Roda num só processo: um pool por cache miss, dentro do
+# servidor do Streamlit, multiplicaria os processos com várias sessões (2^20 amostras levam ~2 s).
+@st.cache_resource(max_entries=FIGURE_CACHE_MAX_ENTRIES, show_spinner=False)
+def build_sensitivity_outputs(n_samples, iat_terms):
+    indices = sobol_indices(n_samples, seed=SENSITIVITY_SEED, iat_terms=iat_terms, workers=1)
+    df_sensitivity = sensitivity_table(indices)
+    return sensitivity_figure(df_sensitivity), df_sensitivity
+
+
+# Seção de sensibilidade como fragmento: trocar o número de amostras reexecuta apenas esta seção
+@st.fragment
+def render_sensitivity_section(iat_terms):
+    n_samples = st.select_slider("Número de Amostras (N)", options=SENSITIVITY_SAMPLE_OPTIONS,
+                                 value=DEFAULT_N_SAMPLES, format_func=lambda n: f"{n:,}".replace(",", "."),
+                                 key="sobol_n")
+    with st.spinner("Calculando os índices de Sobol..."):
+        fig_sensitivity, df_sensitivity = build_sensitivity_outputs(n_samples, iat_terms)
+    st.plotly_chart(fig_sensitivity, use_container_width=True)
+    st.dataframe(df_sensitivity, use_container_width=True, hide_index=True)
+    st.caption(f"{n_samples * (len(FACTORS) + 2):,} avaliações de cada modelo "
+               "(esquema de Saltelli com sequência de Sobol).".replace(",", "."))
+
+
+# Planejamento de aberração mínima: a busca depende só de (k, corridas) e o objeto não é alterado depois
+@st.cache_resource(max_entries=FIGURE_CACHE_MAX_ENTRIES, show_spinner=False)
+def cached_minimum_aberration_design(n_factors, n_runs):
+    return minimum_aberration_design(n_factors, n_runs)
+
+
+RESOLUTION_LABELS = {3: "III", 4: "IV", 5: "V", 6: "VI", 7: "VII", 8: "VIII"}
+
+
+# Seção do gerador de planejamentos como fragmento: seus controles reexecutam apenas esta seção
+@st.fragment
+def render_design_section():
+    design_col1, design_col2, design_col3 = st.columns([1, 1, 2])
+    with design_col1:
+        n_factors = st.number_input("Número de Fatores (k)", min_value=3, max_value=15, value=len(FACTORS), step=1,
+                                    key="design_k")
+    with design_col3:
+        generators_text = st.text_input("Geradores (opcional)", placeholder="E=ABC, F=-BCD", key="design_generators",
+                                        help="Deixe em branco para buscar o planejamento de aberração mínima.")
+    generators = [generator.strip() for generator in generators_text.replace(";", ",").split(",") if generator.strip()]
+    with design_col2:
+        # Até 1024 corridas, para que a matriz continue leve na página
+        run_options = [2 ** exponent for exponent in range(1, min(n_factors, 10) + 1) if 2 ** exponent > n_factors]
+        n_runs = st.selectbox("Número de Corridas", run_options, index=min(1, len(run_options) - 1),
+                              key="design_runs", disabled=bool(generators))
+
+    try:
+        if generators:
+            design = FractionalFactorialDesign(n_factors, generators)
+        else:
+            with st.spinner("Buscando o planejamento de aberração mínima..."):
+                design = cached_minimum_aberration_design(n_factors, n_runs)
+    except ValueError as error:
+        st.error(str(error))
+        return
+
+    metric_col1, metric_col2, metric_col3 = st.columns(3)
+    metric_col1.metric("Planejamento", f"2^({design.n_factors}-{design.n_generators}) = {design.n_runs} corridas")
+    metric_col2.metric("Resolução", "Fatorial completo" if design.resolution is None
+                       else RESOLUTION_LABELS.get(design.resolution, str(design.resolution)))
+    metric_col3.metric("Padrão de Comprimento de Palavras (A₃, A₄, ...)",
+                       ", ".join(str(count) for count in design.word_length_pattern) or "—")
+    if design.n_generators:
+        st.markdown(f"**Geradores:** {', '.join(design.generator_names())}")
+        st.markdown(f"**Relação de definição:** `{design.defining_relation_name()}`")
+        st.markdown("**Cadeias de confundimento** (efeitos principais e interações de 2 fatores)")
+        st.dataframe({"Cadeia": design.alias_chain_names(max_order=2)}, use_container_width=True, hide_index=True)
+
+    df_design = design_table(design)
+    st.markdown("**Matriz do planejamento** (codificação -1/+1 em ordem padrão)")
+    st.dataframe(df_design, use_container_width=True)
+    st.download_button("Baixar Matriz (CSV)", df_design.to_csv().encode("utf-8"),
+                       file_name=f"planejamento_{design.n_factors}_{design.n_generators}.csv", mime="text/csv")
+
+
+# Planejamento de aberração mínima com os 6 fatores da sidebar e as três respostas simuladas (sem ruído).
+# As tabelas ficam em st.cache_resource (sem cópia a cada leitura): a seção apenas filtra e lê.
+@st.cache_resource(max_entries=FIGURE_CACHE_MAX_ENTRIES, show_spinner=False)
+def cached_simulated_effects(n_runs, iat_terms):
+    return simulated_effects_tables(cached_minimum_aberration_design(len(FACTORS), n_runs).design_matrix(),
+                                    iat_terms)
+
+
+# Gráfico de efeitos memoizado: a seção não depende da sidebar, então a reexecução da página reaproveita
+# a figura. source_key identifica as corridas: ("simulado", n_runs, iat_terms) ou ("tabela", id do
+# arquivo, colunas dos fatores, colunas de resposta); os argumentos com "_" não entram na chave.
+@st.cache_resource(max_entries=FIGURE_CACHE_MAX_ENTRIES, show_spinner=False)
+def cached_effects_figure(source_key, response_name, plot_type, _df_response, _lenth_limits):
+    return effects_figure(_df_response, _lenth_limits, plot_type)
+
+
+# Seção de efeitos como fragmento: trocar a fonte, a resposta ou o gráfico reexecuta apenas esta seção
+@st.fragment
+def render_effects_section(iat_terms):
+    source = st.radio("Corridas", ["Planejamento simulado (fatores A–F)", "Tabela de ensaios (CSV/Parquet)"],
+                      horizontal=True, key="effects_source")
+    if source.startswith("Planejamento"):
+        n_runs = st.selectbox("Número de Corridas", [8, 16, 32, 64], index=1, key="effects_runs")
+        df_effects, df_lenth = cached_simulated_effects(n_runs, iat_terms)
+        source_key = ("simulado", n_runs, iat_terms)
+        design = cached_minimum_aberration_design(len(FACTORS), n_runs)
+        design_name = (f"Planejamento 2^(6-{design.n_generators}) de aberração mínima ({', '.join(design.generator_names())})"
+                       if design.n_generators else "Fatorial completo 2^6")
+        st.caption(f"{design_name}, com as respostas dos modelos sem ruído.")
+    else:
+        uploaded_table = st.file_uploader("Tabela de Corridas", type=["csv", "parquet"], key="effects_upload")
+        if uploaded_table is None:
+            st.info("Envie uma tabela com as colunas dos fatores codificadas em -1/+1 e uma ou mais colunas de resposta.")
+            return
+        df_table = read_run_table(uploaded_table)
+        numeric_columns, coded_columns = run_table_columns(df_table)
+        table_col1, table_col2 = st.columns(2)
+        with table_col1:
+            factor_columns = st.multiselect("Colunas dos Fatores", numeric_columns, default=coded_columns,
+                                            key="effects_factors")
+        with table_col2:
+            response_columns = st.multiselect("Colunas de Resposta",
+                                              [column for column in numeric_columns if column not in factor_columns],
+                                              default=[column for column in numeric_columns if column not in coded_columns],
+                                              key="effects_responses")
+        if not factor_columns or not response_columns:
+            st.warning("Escolha ao menos uma coluna de fator e uma de resposta.")
+            return
+        try:
+            df_effects, df_lenth = run_table_effects(df_table, factor_columns, response_columns)
+        except ValueError as error:
+            st.error(str(error))
+            return
+        source_key = ("tabela", uploaded_table.file_id, tuple(factor_columns), tuple(response_columns))
+        st.caption("Letras dos efeitos: " + ", ".join(
+            f"{letter} = {column}" for letter, column in zip(DESIGN_LETTERS, factor_columns)))
+
+    effects_col1, effects_col2 = st.columns(2)
+    with effects_col1:
+        response_name = st.selectbox("Resposta", df_lenth["Resposta"].tolist(), key="effects_response")
+    with effects_col2:
+        plot_type = st.radio("Tipo de Gráfico", ["Meia-normal", "Pareto"], horizontal=True, key="effects_plot")
+    df_response, lenth_limits = response_effects(df_effects, df_lenth, response_name)
+    st.plotly_chart(cached_effects_figure(source_key, response_name, plot_type, df_response, lenth_limits),
+                    use_container_width=True)
+
+    metric_col1, metric_col2, metric_col3 = st.columns(3)
+    metric_col1.metric("PSE (Lenth)", f"{lenth_limits['PSE']:.4g}")
+    metric_col2.metric("Margem de Erro (ME)", f"{lenth_limits['ME']:.4g}")
+    metric_col3.metric("Margem Simultânea (SME)", f"{lenth_limits['SME']:.4g}")
+    st.dataframe(df_response.drop(columns="Resposta").round(4), use_container_width=True, hide_index=True)
+
+
+# --- Cesta de Cenários ---
+# A tabela de cenários (doe_pff.tables) guarda o nome e os valores reais dos fatores nas colunas A–F.
+# A tabela base, a versão do editor e a cesta com as respostas já calculadas ficam em
+# st.session_state; a cada reexecução, a cesta compara a tabela editada com a anterior (pelo índice
+# das linhas) e recalcula só as linhas novas ou alteradas.
+SCENARIO_COMPARISON_DEFAULT = 8  # cenários pré-selecionados no gráfico de comparação
+
+
+# Substitui a tabela base do editor: uma nova versão recria o editor com o conteúdo novo. O índice
+# (inteiro) identifica as linhas na cesta e é mantido, para não recalcular as linhas que não mudaram.
+def replace_scenario_table(df_table):
+    st.session_state.scenario_table = df_table
+    st.session_state.scenario_version += 1
+
+
+# Botão "Adicionar Seleção da Sidebar": acrescenta a formulação da sidebar à tabela editada. Roda como
+# callback, antes da reexecução, para que o editor já seja recriado com a nova linha.
+def add_scenario_row(edited, current_row):
+    replace_scenario_table(append_scenario_row(edited, current_row))
+
+
+# Configuração das colunas do editor: níveis válidos para os fatores categóricos e faixa para os numéricos
+def scenario_column_config():
+    column_config = {"Cenário": st.column_config.TextColumn("Cenário")}
+    for letter, factor_name, factor_type, levels in FACTORS:
+        label = f"{letter} · {factor_name}"
+        if factor_type == "categorical":
+            column_config[letter] = st.column_config.SelectboxColumn(label, options=list(levels), required=True)
+        else:
+            column_config[letter] = st.column_config.NumberColumn(label, min_value=levels[0], max_value=levels[-1],
+                                                                  required=True)
+    return column_config
+
+
+# Seção da cesta de cenários como fragmento: editar a tabela reexecuta apenas esta seção
+@st.fragment
+def render_scenario_section(current_row, current_coded_params, iat_terms):
+    if "scenario_table" not in st.session_state:
+        st.session_state.scenario_table = empty_scenario_table()
+        st.session_state.scenario_version = 0
+        st.session_state.scenario_basket = ScenarioBasket()
+
+    import_col, add_col = st.columns([3, 1])
+    with import_col:
+        uploaded_scenarios = st.file_uploader("Importar Cenários (CSV/Parquet)", type=["csv", "parquet"],
+                                              key="scenario_upload")
+    # O arquivo enviado continua no widget nas reexecuções seguintes: só é importado uma vez
+    if uploaded_scenarios is not None and uploaded_scenarios.file_id != st.session_state.get("scenario_upload_id"):
+        st.session_state.scenario_upload_id = uploaded_scenarios.file_id
+        try:
+            replace_scenario_table(scenario_table_from_file(uploaded_scenarios))
+        except ValueError as error:
+            st.error(str(error))
+
+    edited = st.data_editor(st.session_state.scenario_table, column_config=scenario_column_config(),
+                            num_rows="dynamic", hide_index=True, use_container_width=True,
+                            key=f"scenario_editor_{st.session_state.scenario_version}")
+
+    with add_col:
+        st.write("")
+        st.button("Adicionar Seleção da Sidebar", on_click=add_scenario_row, args=(edited, current_row),
+                  use_container_width=True, key="scenario_add")
+
+    # Linhas ainda incompletas no editor ficam de fora até terem todos os fatores
+    try:
+        complete, coded = complete_scenario_rows(edited)
+    except ValueError as error:
+        st.error(str(error))
+        return
+    basket = st.session_state.scenario_basket
+    recomputed = basket.update(complete.index, coded, iat_terms)
+    if len(complete) < len(edited):
+        st.caption(f"{len(edited) - len(complete)} linha(s) incompleta(s) ignorada(s).")
+    if not len(complete):
+        st.info("Adicione formulações na tabela, importe um arquivo ou use o botão para copiar a seleção da sidebar.")
+        return
+    st.caption(f"{len(complete)} cenário(s) · {len(recomputed)} recalculado(s) nesta execução.")
+
+    df_scenarios = scenario_results_table(complete, basket)
+    current = {response: values[0]
+               for response, values in model_responses_batch([current_coded_params], iat_terms).items()}
+    st.plotly_chart(scenario_scatter_figure(df_scenarios, current), use_container_width=True)
+
+    compared = st.multiselect("Cenários no Gráfico de Comparação", df_scenarios["Cenário"].tolist(),
+                              default=df_scenarios["Cenário"].tolist()[:SCENARIO_COMPARISON_DEFAULT],
+                              key=f"scenario_compared_{st.session_state.scenario_version}")
+    if compared:
+        st.plotly_chart(scenario_comparison_figure(select_scenarios(df_scenarios, compared)),
+                        use_container_width=True)
+
+    df_export = scenario_export_table(complete, df_scenarios)
+    st.dataframe(df_export.round(4), use_container_width=True, hide_index=True)
+
+    export_col1, export_col2 = st.columns(2)
+    export_col1.download_button("Exportar CSV", df_export.to_csv(index=False).encode("utf-8"),
+                                file_name="cenarios.csv", mime="text/csv", use_container_width=True)
+    export_col2.download_button("Exportar Parquet", to_parquet_bytes(df_export), file_name="cenarios.parquet",
+                                mime="application/octet-stream", use_container_width=True)
+
+
+# Painel de instrumentação (?debug=1): tempos desta reexecução e percentis de todas as sessões, em ms
+def render_instrumentation_panel(registry, rerun):
+    summary = registry.summary()
+    st.caption(f"{summary['reruns']:,} reexecuções instrumentadas neste processo. Percentis sobre as últimas "
+               f"{summary['window']:,} medições de cada seção; as seções .chart incluem a serialização da "
+               f"figura por st.plotly_chart.")
+    df_sections, df_models = metrics_tables(summary, rerun)
+    st.dataframe(df_sections, use_container_width=True, hide_index=True)
+    st.dataframe(df_models, use_container_width=True, hide_index=True)
+
+    download_col1, download_col2 = st.columns(2)
+    download_col1.download_button("Baixar métricas (JSON)", registry.to_json(), file_name="doe_pff_metrics.json",
+                                  mime="application/json", key="metrics_json")
+    download_col2.download_button("Baixar métricas (Prometheus)", registry.to_prometheus(),
+                                  file_name="doe_pff_metrics.prom", mime="text/plain", key="metrics_prom")
+    if METRICS_FILE:
+        st.caption(f"Gravadas em `{METRICS_FILE}` a cada {DEFAULT_DUMP_INTERVAL:g} s, no máximo.")
+
+
+# --- Ajuste do Modelo de IAT aos Ensaios do Laboratório ---
+# Os ensaios (carregados de CSV ou adicionados um a um) e o ajuste sobre eles ficam num LabRuns em
+# st.session_state: um ensaio adicionado atualiza o ajuste existente, e só um novo arquivo ou uma
+# mudança nos termos refaz o ajuste a partir de todos os ensaios.
+def sidebar_iat_fit():
+    state = st.session_state
+    uploaded_runs = st.sidebar.file_uploader("Ensaios do Laboratório (CSV com colunas A–F e IAT)", type="csv",
+                                             key="fit_upload")
+    selected_term_names = st.sidebar.multiselect(
+        "Termos do Modelo", [term_name(term) for term in CANDIDATE_TERMS if term],
+        default=[term_name(term) for term in PAPER_TERMS if term], key="fit_terms")
+
+    upload_id = None if uploaded_runs is None else uploaded_runs.file_id
+    if "lab_runs" not in state or state.get("fit_upload_id") != upload_id:
+        lab_runs = LabRuns()
+        if uploaded_runs is not None:
+            try:
+                lab_runs = LabRuns(*read_lab_runs(uploaded_runs))
+            except ValueError as error:
+                st.sidebar.error(f"Arquivo de ensaios inválido: {error}")
+        state["lab_runs"] = lab_runs
+        state["fit_upload_id"] = upload_id
+
+    with st.sidebar.form("fit_add_run", clear_on_submit=True):
+        st.markdown("**Adicionar Ensaio**")
+        new_run_levels = [st.selectbox(f"{factor_name} ({letter})", levels, key=f"fit_new_{letter}")
+                          for letter, factor_name, _, levels in FACTORS]
+        new_run_iat = st.number_input("IAT Medido (mg KOH/g)", min_value=0.0, value=1.92, step=0.01,
+                                      format="%.2f", key="fit_new_IAT")
+        add_run = st.form_submit_button("Adicionar")
+
+    lab_runs = state["lab_runs"]
+    iat_fit = lab_runs.fit(terms_from_names(selected_term_names))
+    if add_run:
+        lab_runs.append_run(code_factor_columns([[level] for level in new_run_levels])[0], new_run_iat)
+    return iat_fit
 
 
 # --- Título e Introdução do Aplicativo ---
@@ -142,81 +519,124 @@ st.info(
     "Esta ferramenta simula os resultados discutidos na dissertação de mestrado de Marcelo O.Q. de Almeida (2019), demonstrando a aplicação do DOE para análise de fatores e respostas. Modelos preditivos para acidez, e tendências qualitativas para viscosidade e desgaste.")
 
 # --- Sidebar para Seleção dos Fatores ---
+# Os níveis de cada fator vêm de doe_pff.coding.FACTORS, a mesma definição usada pelos modelos
 st.sidebar.header("⚙️ Fatores do Experimento")
 st.sidebar.markdown("Ajuste os níveis de cada fator para observar seu impacto nas propriedades do lubrificante.")
 
 # Fator A: Tipo de Antioxidante
-tipo_antioxidante_options = ["Amínico", "Fenólico"]
+tipo_antioxidante_options = list(FACTOR_LEVELS["A"])
 selected_tipo_antioxidante = st.sidebar.selectbox("Tipo de Antioxidante (A)", tipo_antioxidante_options, key="sel_A")
-A_coded = get_coded_value_categorical("Tipo de Antioxidante", selected_tipo_antioxidante)
 
 # Fator B: Quantidade de Antioxidante
-quant_antioxidante_options_values = [0.2, 0.5, 0.8]
+quant_antioxidante_options_values = list(FACTOR_LEVELS["B"])
 selected_quant_antioxidante = st.sidebar.select_slider("Quantidade de Antioxidante (B) [% peso]",
                                                        options=quant_antioxidante_options_values,
                                                        value=0.5, key="sel_B")
-B_coded = get_coded_value_numerical("Quantidade de Antioxidante", selected_quant_antioxidante)
 
 # Fator C: Tipo de Antidesgaste
-tipo_antidesgaste_options = ["Com Zinco", "Sem Zinco"]
+tipo_antidesgaste_options = list(FACTOR_LEVELS["C"])
 selected_tipo_antidesgaste = st.sidebar.selectbox("Tipo de Antidesgaste (C)", tipo_antidesgaste_options, key="sel_C")
-C_coded = get_coded_value_categorical("Tipo de Antidesgaste", selected_tipo_antidesgaste)
 
 # Fator D: Quantidade de Antidesgaste
-quant_antidesgaste_options_values = [0.5, 1.75, 3.0]
+quant_antidesgaste_options_values = list(FACTOR_LEVELS["D"])
 selected_quant_antidesgaste = st.sidebar.select_slider("Quantidade de Antidesgaste (D) [% peso]",
                                                        options=quant_antidesgaste_options_values,
                                                        value=1.75, key="sel_D")
-D_coded = get_coded_value_numerical("Quantidade de Antidesgaste", selected_quant_antidesgaste)
 
 # Fator E: Tipo de Óleo Base
-tipo_oleo_base_options = ["Leve/Médio", "Pesado/Médio"]
+tipo_oleo_base_options = list(FACTOR_LEVELS["E"])
 selected_tipo_oleo_base = st.sidebar.selectbox("Tipo de Óleo Base (E)", tipo_oleo_base_options, key="sel_E")
-E_coded = get_coded_value_categorical("Tipo de Óleo Base", selected_tipo_oleo_base)
 
 # Fator F: Razão de Óleo Base
-razao_oleo_base_options_values = [20, 50, 80]
+razao_oleo_base_options_values = list(FACTOR_LEVELS["F"])
 selected_razao_oleo_base = st.sidebar.select_slider("Razão de Óleo Base (F) [%]",
                                                     options=razao_oleo_base_options_values,
                                                     value=50, key="sel_F")
-F_coded = get_coded_value_numerical("Razão de Óleo Base", selected_razao_oleo_base)
 
 st.sidebar.markdown("---")
 st.sidebar.write("ℹ️ Quantidade de Anticorrosivo: **1.5% peso (fixo)**")
 st.sidebar.markdown("---")
 
-# --- Cálculo das Respostas com base nas Seleções do Usuário ---
-# Corrigido: As chaves do dicionário devem corresponder aos nomes dos parâmetros de calculate_iat
-current_coded_params_for_iat = {
-    'A_coded': A_coded, 'B_coded': B_coded, 'C_coded': C_coded,
-    'D_coded': D_coded, 'E_coded': E_coded, 'F_coded': F_coded
-}
-
-iat_predicted, iat_error = calculate_iat(**current_coded_params_for_iat)
-viscosity_predicted = calculate_viscosity_qualitative(A_coded, selected_quant_antioxidante, C_coded,
-                                                      selected_quant_antidesgaste, E_coded, selected_razao_oleo_base)
-desgaste_predicted = calculate_desgaste_qualitative(selected_tipo_antidesgaste, selected_quant_antidesgaste)
-
-st.header("📊 Resultados Preditos (Simulados)")
-
-col1, col2, col3 = st.columns(3)
-
-with col1:
-    st.subheader("Índice de Acidez Total (IAT)")
-    st.markdown(f"**{iat_predicted:.2f} ± {iat_error:.2f} mg KOH/g**")
-    st.success(f"**Modelo estatisticamente significativo** com R² = 0.9938.")
-
-with col2:
-    st.subheader("Viscosidade Cinemática (40°C)")
-    st.markdown(f"**{viscosity_predicted:.2f} cSt**")
-    st.warning(
-        "Modelo qualitativo: **Curvatura significativa** no estudo original. Predição baseada em tendências observadas no artigo.")
+# --- Modo de Réplicas (Monte Carlo) ---
+# Em vez de um único valor com ruído a cada execução, mostra a média e o intervalo de 95% de muitas
+# réplicas sorteadas com semente fixa (resultados reproduzíveis).
+replicate_mode = st.sidebar.toggle("🎲 Modo de Réplicas (Monte Carlo)", key="mc_on",
+                                   help="Resume o ruído dos modelos qualitativos de viscosidade e desgaste.")
+replicate_settings = None
+if replicate_mode:
+    n_replicates = st.sidebar.select_slider("Número de Réplicas", options=[1_000, 10_000, 100_000, 1_000_000],
+                                            value=DEFAULT_N_REPLICATES, key="mc_n")
+    replicate_seed = st.sidebar.number_input("Semente", min_value=0, value=42, step=1, key="mc_seed")
+    replicate_settings = (n_replicates, int(replicate_seed))
+    st.sidebar.markdown("---")
+
+# --- Modelo de IAT ---
+# A equação do artigo é o padrão; o modelo ajustado só substitui os coeficientes quando é estimável
+# e tem graus de liberdade para o erro.
+iat_model_source = st.sidebar.radio("📐 Modelo de IAT", ["Equação do artigo (2019)", "Ajustado aos ensaios"],
+                                    key="iat_model")
+iat_terms, iat_error_range, iat_fit = IAT_TERMS, IAT_ERROR_RANGE, None
+if iat_model_source == "Ajustado aos ensaios":
+    iat_fit = sidebar_iat_fit()
+    if fit_is_usable(iat_fit):
+        iat_terms, iat_error_range = iat_fit.fitted_terms(), iat_fit.prediction_error_range()
+iat_fit_in_use = iat_terms is not IAT_TERMS
+st.sidebar.markdown("---")
 
-with col3:
-    st.subheader("Desgaste por 4 Esferas")
-    st.markdown(f"**{desgaste_predicted:.3f} mm**")
-    st.error(
-        "Modelo qualitativo: **Sem modelo preditivo significativo** no estudo original. Valor ilustrativo de tendências e comparação com óleo base.")
+# --- Respostas da Combinação Selecionada ---
+# Índices dos níveis selecionados, na ordem de FACTORS: identificam a combinação na tabela pré-calculada
+selected_levels = (
+    tipo_antioxidante_options.index(selected_tipo_antioxidante),
+    quant_antioxidante_options_values.index(selected_quant_antioxidante),
+    tipo_antidesgaste_options.index(selected_tipo_antidesgaste),
+    quant_antidesgaste_options_values.index(selected_quant_antidesgaste),
+    tipo_oleo_base_options.index(selected_tipo_oleo_base),
+    razao_oleo_base_options_values.index(selected_razao_oleo_base),
+)
+with rerun_metrics.section("results.lookup"):
+    lookup_table = build_lookup_table(iat_terms, iat_error_range)
+    current_state = state_index(selected_levels)
+    current_coded_params = tuple(lookup_table.coded[current_state].tolist())
+
+    iat_predicted, iat_error = lookup_table.iat[current_state], lookup_table.iat_error_range
+    viscosity_predicted = lookup_table.viscosity[current_state]
+    desgaste_predicted = lookup_table.desgaste[current_state]
+    replicate_table = viscosity_interval = desgaste_interval = None
+    if replicate_settings is not None:
+        replicate_table = build_replicate_lookup(*replicate_settings)
+        viscosity_predicted, *viscosity_interval = (values[current_state] for values in replicate_table["viscosity"])
+        desgaste_predicted, *desgaste_interval = (values[current_state] for values in replicate_table["desgaste"])
+
+with rerun_metrics.section("results.render"):
+    st.header("📊 Resultados Preditos (Simulados)")
+
+    col1, col2, col3 = st.columns(3)
+
+    with col1:
+        st.subheader("Índice de Acidez Total (IAT)")
+        st.markdown(f"**{iat_predicted:.2f} ± {iat_error:.2f} mg KOH/g**")
+        if iat_fit_in_use:
+            st.success(f"**Modelo ajustado a {iat_fit.n_runs} ensaios** com R² = {iat_fit.r_squared:.4f}.")
+        else:
+            st.success(f"**Modelo estatisticamente significativo** com R² = 0.9938.")
+
+    with col2:
+        st.subheader("Viscosidade Cinemática (40°C)")
+        st.markdown(f"**{viscosity_predicted:.2f} cSt**")
+        if viscosity_interval is not None:
+            st.caption(f"Média de {replicate_settings[0]:,} réplicas · IC 95%: "
+                       f"[{viscosity_interval[0]:.2f}, {viscosity_interval[1]:.2f}] cSt")
+        st.warning(
+            "Modelo qualitativo: **Curvatura significativa** no estudo original. Predição baseada em tendências observadas no artigo.")
+
+    with col3:
+        st.subheader("Desgaste por 4 Esferas")
+        st.markdown(f"**{desgaste_predicted:.3f} mm**")
+        if desgaste_interval is not None:
+            st.caption(f"Média de {replicate_settings[0]:,} réplicas · IC 95%: "
+                       f"[{desgaste_interval[0]:.3f}, {desgaste_interval[1]:.3f}] mm")
+        st.error(
+            "Modelo qualitativo: **Sem modelo preditivo significativo** no estudo original. Valor ilustrativo de tendências e comparação com óleo base.")
 
 st.markdown("---")
 
@@ -229,101 +649,10 @@ st.subheader("1. Gráfico de Perturbação para Índice de Acidez (IAT)")
 st.info(
     "Este gráfico mostra como a acidez predita muda quando cada fator é variado individualmente de seu valor mais baixo para o mais alto (ou entre categorias), enquanto os outros fatores são mantidos nos valores selecionados atualmente na sidebar.")
 
-perturbation_data = []
-
-# Definir os fatores e seus níveis para a perturbação
-# Cada tupla agora inclui o nome exato do parâmetro em calculate_iat
-factors_for_perturbation = [
-    ("Tipo de Antioxidante (A)", tipo_antioxidante_options, "categorical", "A_coded"),
-    ("Quantidade de Antioxidante (B)", quant_antioxidante_options_values, "numerical", "B_coded"),
-    ("Tipo de Antidesgaste (C)", tipo_antidesgaste_options, "categorical", "C_coded"),
-    ("Quantidade de Antidesgaste (D)", quant_antidesgaste_options_values, "numerical", "D_coded"),
-    ("Tipo de Óleo Base (E)", tipo_oleo_base_options, "categorical", "E_coded"),
-    ("Razão de Óleo Base (F)", razao_oleo_base_options_values, "numerical", "F_coded"),
-]
-
-# Recalcular IAT para cada fator em seus extremos (mantendo os outros no valor selecionado)
-for factor_full_name, levels, factor_type, iat_param_name in factors_for_perturbation:
-    if factor_type == "categorical":
-        for level_val_str in levels:
-            temp_params = current_coded_params_for_iat.copy()
-            # Obter o valor codificado para o nível específico do fator sendo perturbado
-            temp_params[iat_param_name] = get_coded_value_categorical(factor_full_name.split(' (')[0], level_val_str)
-            predicted_val, _ = calculate_iat(**temp_params)
-            perturbation_data.append({
-                "Fator": factor_full_name,
-                "Nível": level_val_str,
-                "Acidez Predita": predicted_val,
-            })
-    else:  # Fatores Numéricos (Min e Max para a linha)
-        # Usar min e max dos níveis reais para calcular os pontos da linha
-        min_val_coded = get_coded_value_numerical(factor_full_name.split(' (')[0], levels[0])
-        max_val_coded = get_coded_value_numerical(factor_full_name.split(' (')[0], levels[-1])
-
-        # Ponto Mínimo do fator
-        temp_params_min = current_coded_params_for_iat.copy()
-        temp_params_min[iat_param_name] = min_val_coded
-        predicted_min, _ = calculate_iat(**temp_params_min)
-        perturbation_data.append({
-            "Fator": factor_full_name,
-            "Nível": str(levels[0]),  # Converter para string para o eixo X
-            "Acidez Predita": predicted_min,
-        })
-
-        # Ponto Máximo do fator
-        temp_params_max = current_coded_params_for_iat.copy()
-        temp_params_max[iat_param_name] = max_val_coded
-        predicted_max, _ = calculate_iat(**temp_params_max)
-        perturbation_data.append({
-            "Fator": factor_full_name,
-            "Nível": str(levels[-1]),  # Converter para string para o eixo X
-            "Acidez Predita": predicted_max,
-        })
-
-df_perturbation = pd.DataFrame(perturbation_data)
-
-fig_perturbation = go.Figure()
-
-# Adicionar as linhas de perturbação
-for factor in df_perturbation['Fator'].unique():
-    df_factor = df_perturbation[df_perturbation['Fator'] == factor]
-    fig_perturbation.add_trace(go.Scatter(x=df_factor['Nível'], y=df_factor['Acidez Predita'],
-                                          mode='lines+markers', name=factor,
-                                          marker=dict(size=8)))
-
-# Adicionar o ponto da seleção atual para cada linha
-# Usamos os valores atualmente selecionados (reais) para os nomes dos níveis no eixo X
-current_iat_val_at_selection, _ = calculate_iat(**current_coded_params_for_iat)
-
-# Mapear os valores selecionados (reais) para as chaves usadas no gráfico de perturbação (Nível)
-# Garante que os valores numéricos sejam convertidos para string para corresponder ao eixo X
-current_selection_display_map = {
-    "Tipo de Antioxidante (A)": selected_tipo_antioxidante,
-    "Quantidade de Antioxidante (B)": str(selected_quant_antioxidante),
-    "Tipo de Antidesgaste (C)": selected_tipo_antidesgaste,
-    "Quantidade de Antidesgaste (D)": str(selected_quant_antidesgaste),
-    "Tipo de Óleo Base (E)": selected_tipo_oleo_base,
-    "Razão de Óleo Base (F)": str(selected_razao_oleo_base),
-}
-
-for factor_full_name in df_perturbation['Fator'].unique():
-    fig_perturbation.add_trace(go.Scatter(
-        x=[current_selection_display_map[factor_full_name]],
-        y=[current_iat_val_at_selection],
-        mode='markers',
-        marker=dict(color='black', size=10, symbol='x'),
-        name=f"Seleção Atual ({factor_full_name.split(' (')[1][0]})",
-        showlegend=False  # Não mostrar na legenda principal para evitar repetição
-    ))
-
-fig_perturbation.update_layout(
-    xaxis_title="Nível do Fator (Mínimo/Máximo ou Categoria)",
-    yaxis_title="Acidez Predita (mg KOH/g)",
-    title="Gráfico de Perturbação para Índice de Acidez (IAT)",
-    legend_title="Fator",
-    hovermode="x unified"
-)
-st.plotly_chart(fig_perturbation, use_container_width=True)
+with rerun_metrics.section("perturbation.figure"):
+    fig_perturbation = build_perturbation_figure(current_state, iat_terms, lookup_table)
+with rerun_metrics.section("perturbation.chart"):
+    st.plotly_chart(fig_perturbation, use_container_width=True)
 
 st.markdown("---")
 
@@ -332,35 +661,10 @@ st.subheader("2. Interação Qualitativa: Tipo de Antioxidante (A) vs. Quantidad
 st.warning(
     "Este gráfico representa visualmente a interação discutida no artigo (Figura 40), utilizando valores aproximados do modelo qualitativo para a viscosidade. **Lembre-se da curvatura significativa** no estudo original para esta resposta.")
 
-interaction_data = []
-quant_antidesgaste_levels_actual = [0.5, 3.0]  # Níveis reais Mínimo e Máximo para Quant. de Antidesgaste (D)
-tipo_antioxidante_levels_str = ["Amínico", "Fenólico"]  # Níveis para Tipo de Antioxidante (A)
-
-for A_val_str in tipo_antioxidante_levels_str:
-    A_coded_for_visc = get_coded_value_categorical("Tipo de Antioxidante", A_val_str)
-    for D_val_float in quant_antidesgaste_levels_actual:
-        visc = calculate_viscosity_qualitative(A_coded_for_visc, selected_quant_antioxidante,
-                                               C_coded, D_val_float, E_coded, selected_razao_oleo_base)
-        interaction_data.append({
-            "Tipo de Antioxidante": A_val_str,
-            "Quantidade de Antidesgaste": D_val_float,
-            "Viscosidade Predita": visc
-        })
-
-df_interaction = pd.DataFrame(interaction_data)
-
-fig_interaction = px.line(df_interaction, x="Quantidade de Antidesgaste", y="Viscosidade Predita",
-                          color="Tipo de Antioxidante", markers=True,
-                          title="Interação A x D para Viscosidade (Qualitativo)",
-                          hover_data={"Quantidade de Antidesgaste": True, "Viscosidade Predita": ':.2f',
-                                      "Tipo de Antioxidante": True})
-fig_interaction.update_layout(
-    xaxis_title="Quantidade de Antidesgaste (% peso)",
-    yaxis_title="Viscosidade Predita (cSt)",
-    legend_title="Tipo de Antioxidante",
-    hovermode="x unified"
-)
-st.plotly_chart(fig_interaction, use_container_width=True)
+with rerun_metrics.section("interaction.figure"):
+    fig_interaction = build_interaction_figure(current_state, replicate_settings, lookup_table, replicate_table)
+with rerun_metrics.section("interaction.chart"):
+    st.plotly_chart(fig_interaction, use_container_width=True)
 
 st.markdown("---")
 
@@ -369,24 +673,100 @@ st.subheader("3. Comparativo Qualitativo de Desgaste por 4 Esferas")
 st.warning(
     "Esta seção ilustra a importância fundamental da presença de aditivos antidesgaste, conforme as conclusões do artigo. **Lembre-se que não foi encontrado um modelo preditivo significativo para o desgaste** no estudo original.")
 
-desgaste_comparison_data = [
-    {"Condição": "Óleo Base sem Aditivo Antidesgaste", "Desgaste (mm)": 0.771},
-    {"Condição": "Com Aditivo Antidesgaste (Média Observada)", "Desgaste (mm)": 0.409},
-    {"Condição": f"Sua Seleção: {selected_tipo_antidesgaste} ({selected_quant_antidesgaste}%)",
-     "Desgaste (mm)": desgaste_predicted}
-]
-df_desgaste_comparison = pd.DataFrame(desgaste_comparison_data)
-
-fig_desgaste = px.bar(df_desgaste_comparison, x="Condição", y="Desgaste (mm)",
-                      title="Comparativo de Desgaste (Qualitativo)",
-                      color="Condição",
-                      color_discrete_map={
-                          "Óleo Base sem Aditivo Antidesgaste": "red",
-                          "Com Aditivo Antidesgaste (Média Observada)": "lightgray",
-                          f"Sua Seleção: {selected_tipo_antidesgaste} ({selected_quant_antidesgaste}%)": "blue"
-                      })
-fig_desgaste.update_layout(yaxis_title="Desgaste (mm)")
-st.plotly_chart(fig_desgaste, use_container_width=True)
+with rerun_metrics.section("desgaste.figure"):
+    fig_desgaste = build_desgaste_figure(selected_tipo_antidesgaste, selected_quant_antidesgaste, desgaste_predicted,
+                                         None if desgaste_interval is None else tuple(desgaste_interval))
+with rerun_metrics.section("desgaste.chart"):
+    st.plotly_chart(fig_desgaste, use_container_width=True)
+
+st.markdown("---")
+# --- Otimização Multi-Resposta ---
+st.subheader("4. Otimização Multi-Resposta das Formulações")
+st.info(
+    "Busca as formulações que minimizam o IAT mantendo a viscosidade dentro da faixa alvo e o desgaste abaixo do limite. São avaliadas todas as combinações discretas de níveis da sidebar e, para cada combinação de A, C e E, os valores contínuos de B, D e F. Viscosidade e desgaste usam a tendência dos modelos qualitativos, sem ruído.")
+
+render_optimization_section(iat_terms)
+
+st.markdown("---")
+
+# --- Superfícies de Resposta por Par de Fatores ---
+st.subheader("5. Superfícies de Resposta por Par de Fatores")
+st.info(
+    "Mapa da resposta escolhida sobre uma grade densa de dois fatores, com os demais mantidos nos valores selecionados na sidebar. Fatores categóricos aparecem apenas nos seus dois níveis. Viscosidade e desgaste usam a tendência dos modelos qualitativos, sem ruído.")
+
+render_surface_section(current_coded_params, iat_terms)
+
+st.markdown("---")
+
+# --- Ajuste do Modelo de IAT ---
+st.subheader("6. Ajuste do Modelo de IAT aos Ensaios do Laboratório")
+st.info(
+    "Os coeficientes do IAT podem ser reestimados a partir dos ensaios do laboratório (sidebar > Modelo de IAT > Ajustado aos ensaios). Cada novo ensaio atualiza o ajuste por mínimos quadrados de forma incremental, e o modelo ajustado passa a ser usado em todas as seções da página.")
+
+if iat_fit is None:
+    st.markdown("Em uso: **equação do artigo (2019)**.")
+elif not iat_fit_in_use:
+    st.warning(
+        f"{iat_fit.n_runs} ensaio(s) para {iat_fit.n_terms} termos: são necessários mais ensaios (e termos não confundidos) para estimar o modelo com graus de liberdade para o erro. A equação do artigo continua em uso.")
+else:
+    fit_col1, fit_col2, fit_col3, fit_col4 = st.columns(4)
+    fit_col1.metric("Ensaios", iat_fit.n_runs)
+    fit_col2.metric("R²", f"{iat_fit.r_squared:.4f}")
+    fit_col3.metric("R² Ajustado", f"{iat_fit.r_squared_adjusted:.4f}")
+    fit_col4.metric("Erro de Predição (±)", f"{iat_error_range:.3f}")
+
+    st.dataframe(fit_summary_table(iat_fit), use_container_width=True, hide_index=True)
+
+st.markdown("---")
+
+# --- Análise de Sensibilidade Global ---
+st.subheader("7. Análise de Sensibilidade Global (Índices de Sobol)")
+st.info(
+    "Fração da variância de cada resposta explicada por cada fator quando todos variam ao mesmo tempo em todo o espaço experimental: fatores categóricos nos dois níveis com igual probabilidade e B, D e F uniformes entre os níveis extremos. O índice de primeira ordem (S) mede o efeito isolado do fator; o total (ST) inclui também as suas interações. Viscosidade e desgaste usam a tendência dos modelos qualitativos, sem ruído.")
+
+render_sensitivity_section(iat_terms)
+
+st.markdown("---")
+
+# --- Gerador de Planejamentos Fatoriais Fracionados ---
+st.subheader("8. Gerador de Planejamentos Fatoriais Fracionados")
+st.info(
+    "Monta planejamentos 2^(k-p) a partir de geradores, com relação de definição, cadeias de confundimento, resolução e padrão de comprimento de palavras. Sem geradores, busca o planejamento de aberração mínima para o número de fatores e de corridas escolhido. Com 6 fatores, as colunas correspondem aos fatores A–F da sidebar.")
+
+render_design_section()
+
+st.markdown("---")
+
+# --- Estimação de Efeitos (Yates) ---
+st.subheader("9. Estimação de Efeitos pelo Algoritmo de Yates")
+st.info(
+    "Estima todos os efeitos e interações de um planejamento 2^(k-p) pela transformada de Walsh–Hadamard (algoritmo de Yates), em O(N log N), para todas as respostas de uma vez. Cada efeito representa a sua cadeia de confundimento. Os efeitos significativos são indicados pelo método de Lenth: ME controla o erro por efeito e SME o erro simultâneo de todos os efeitos.")
+
+render_effects_section(iat_terms)
+
+st.markdown("---")
+
+# --- Cesta de Cenários ---
+st.subheader("10. Cesta de Cenários")
+st.info(
+    "Compare muitas formulações lado a lado: edite a tabela (uma linha por cenário, com os valores reais dos fatores A–F), copie a seleção atual da sidebar ou importe um arquivo CSV/Parquet, e exporte a cesta para continuar em outra sessão. A cada edição, só as linhas novas ou alteradas são recalculadas. Viscosidade e desgaste usam a tendência dos modelos qualitativos, sem ruído; a estrela marca a seleção atual da sidebar.")
+
+render_scenario_section(dict(zip(FACTOR_LETTERS, (selected_tipo_antioxidante, selected_quant_antioxidante,
+                                                  selected_tipo_antidesgaste, selected_quant_antidesgaste,
+                                                  selected_tipo_oleo_base, selected_razao_oleo_base))),
+                        current_coded_params, iat_terms)
+
+# --- Painel de Instrumentação ---
+# Registra a reexecução (sem o próprio painel) e grava o arquivo do coletor, se configurado
+if instrumentation_enabled:
+    registry = metrics_registry()
+    registry.record(rerun_metrics.finish())
+    if METRICS_FILE:
+        registry.dump_if_due(METRICS_FILE)
+    if debug_panel:
+        st.markdown("---")
+        st.subheader("🛠️ Instrumentação da Página (debug)")
+        render_instrumentation_panel(registry, rerun_metrics)
 
 st.markdown("---")
 st.markdown("### 📚 Referência")
@@ -0,0 +1,96 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from doe_pff.design import FractionalFactorialDesign, minimum_aberration_design
+
+# Planejamentos de aberração mínima tabelados (Chen, Sun e Wu, 1993): (k, corridas) -> (A₃, A₄, ...)
+KNOWN_MINIMUM_ABERRATION = {
+    (4, 8): (0, 1),
+    (5, 8): (2, 1, 0),
+    (6, 8): (4, 3, 0, 0),
+    (7, 8): (7, 7, 0, 0, 1),
+    (5, 16): (0, 0, 1),
+    (6, 16): (0, 3, 0, 0),
+    (7, 16): (0, 7, 0, 0, 0),
+    (8, 16): (0, 14, 0, 0, 0, 1),
+    (9, 16): (4, 14, 8, 0, 4, 1, 0),
+    (6, 32): (0, 0, 0, 1),
+    (7, 32): (0, 1, 2, 0, 0),
+    (8, 32): (0, 3, 4, 0, 0, 0),
+    (9, 32): (0, 6, 8, 0, 0, 1, 0),
+    (7, 64): (0, 0, 0, 0, 1),
+    (8, 64): (0, 0, 2, 1, 0, 0),
+    (9, 64): (0, 1, 4, 2, 0, 0, 0),
+}
+
+
+# Referência independente das máscaras de bits: uma palavra da relação de definição é um conjunto de
+# colunas da matriz cujo produto é constante (+1 ou -1) em todas as corridas
+def brute_force_word_length_pattern(design):
+    matrix = design.design_matrix()
+    counts = [0] * (design.n_factors + 1)
+    for length in range(1, design.n_factors + 1):
+        for columns in itertools.combinations(range(design.n_factors), length):
+            if abs(matrix[:, columns].prod(axis=1).sum()) == design.n_runs:
+                counts[length] += 1
+    return tuple(counts[3:])
+
+
+@pytest.mark.parametrize("n_factors, n_runs", sorted(KNOWN_MINIMUM_ABERRATION))
+def test_known_minimum_aberration_designs(n_factors, n_runs):
+    design = minimum_aberration_design(n_factors, n_runs)
+    assert design.n_runs == n_runs
+    assert design.word_length_pattern == KNOWN_MINIMUM_ABERRATION[n_factors, n_runs]
+    assert brute_force_word_length_pattern(design) == design.word_length_pattern
+
+
+# A busca em feixe (forçada com exhaustive_limit=0) chega ao mesmo padrão que a busca exaustiva
+@pytest.mark.parametrize("n_factors, n_runs", [(6, 8), (9, 16), (11, 16), (8, 32), (10, 32), (9, 64)])
+def test_beam_search_matches_exhaustive_search(n_factors, n_runs):
+    exhaustive = minimum_aberration_design(n_factors, n_runs)
+    beam = minimum_aberration_design(n_factors, n_runs, exhaustive_limit=0)
+    assert beam.word_length_pattern == exhaustive.word_length_pattern
+
+
+# Casos grandes, só alcançáveis pela busca em feixe: resolução IV, a máxima para esses tamanhos
+@pytest.mark.parametrize("n_factors, n_runs", [(11, 32), (16, 32), (10, 64)])
+def test_beam_search_designs_reach_resolution_iv(n_factors, n_runs):
+    design = minimum_aberration_design(n_factors, n_runs)
+    assert design.resolution == 4
+    assert brute_force_word_length_pattern(design) == design.word_length_pattern
+
+
+def test_full_factorial_has_no_defining_words():
+    design = minimum_aberration_design(4, 16)
+    assert design.n_generators == 0 and design.resolution is None
+    assert design.word_length_pattern == (0, 0)
+
+
+def test_generators_defining_relation_and_alias_chains():
+    design = FractionalFactorialDesign(6, ["E=ABC", "F=-BCD"])
+    assert design.generator_names() == ("E=ABC", "F=-BCD")
+    assert design.defining_relation_name() == "I = ABCE = -BCDF = -ADEF"
+    assert design.resolution == 4
+    assert design.alias_chain_names(max_order=None)[0] == "A = BCE = -DEF = -ABCDF"
+    assert "AB = CE = -ACDF = -BDEF" in design.alias_chain_names(max_order=None)
+    assert "AB = CE" in design.alias_chain_names(max_order=2)
+
+    matrix = design.design_matrix()
+    np.testing.assert_array_equal(matrix[:, 4], matrix[:, [0, 1, 2]].prod(axis=1))
+    np.testing.assert_array_equal(matrix[:, 5], -matrix[:, [1, 2, 3]].prod(axis=1))
+    # Colunas balanceadas e ortogonais
+    np.testing.assert_array_equal(matrix.T @ matrix, design.n_runs * np.eye(6))
+
+
+@pytest.mark.parametrize("generators", [["E=AB", "E=CD"], ["E=F"], ["D=ABC"], ["E=ABX"], ["F=ABC"]])
+def test_invalid_generators(generators):
+    with pytest.raises(ValueError):
+        FractionalFactorialDesign(5, generators)
+
+
+@pytest.mark.parametrize("n_factors, n_runs", [(6, 12), (6, 128), (8, 8)])
+def test_invalid_run_counts(n_factors, n_runs):
+    with pytest.raises(ValueError):
+        minimum_aberration_design(n_factors, n_runs)
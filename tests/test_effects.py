@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+from scipy.linalg import hadamard
+from scipy.stats import t
+
+from doe_pff.design import FractionalFactorialDesign, minimum_aberration_design, word_mask
+from doe_pff.effects import estimate_effects, fwht, lenth_significance
+
+
+def effect_column(design_matrix, mask):
+    columns = [j for j in range(design_matrix.shape[1]) if mask >> j & 1]
+    return design_matrix[:, columns].prod(axis=1)
+
+
+# Contraste direto: média das corridas em que a coluna do efeito é +1 menos a média em que é -1
+def brute_force_effect(design_matrix, responses, mask):
+    column = effect_column(design_matrix, mask)
+    return responses[column > 0].mean(axis=0) - responses[column < 0].mean(axis=0)
+
+
+# Com o nível baixo em -1, a linha b é a linha b da Hadamard de Sylvester vezes (-1)^|b|
+def test_fwht_matches_hadamard_matrix():
+    values = np.random.default_rng(0).normal(size=(32, 3))
+    signs = (-1.0) ** np.array([bin(row).count("1") for row in range(32)])
+    np.testing.assert_allclose(fwht(values.copy()), signs[:, None] * (hadamard(32) @ values), atol=1e-12)
+
+
+DESIGNS = {
+    "fatorial 2^4": FractionalFactorialDesign(4),
+    "2^(6-2) aberração mínima": minimum_aberration_design(6, 16),
+    "2^(6-2) com gerador negativo": FractionalFactorialDesign(6, ["E=ABC", "F=-BCD"]),
+    "2^(7-4) saturado": minimum_aberration_design(7, 8),
+}
+
+
+# Corridas embaralhadas e três respostas: cada estimativa deve ser o contraste calculado diretamente
+@pytest.mark.parametrize("design", DESIGNS.values(), ids=DESIGNS.keys())
+def test_effects_match_brute_force_contrasts(design):
+    rng = np.random.default_rng(10)
+    design_matrix = design.design_matrix()[rng.permutation(design.n_runs)]
+    responses = rng.normal(size=(design.n_runs, 3))
+    effects = estimate_effects(design_matrix, responses)
+
+    assert len(effects["effect"]) == len(set(effects["effect"].tolist())) == design.n_runs - 1
+    for mask, estimate in zip(effects["effect"], effects["estimate"]):
+        np.testing.assert_allclose(estimate, brute_force_effect(design_matrix, responses, int(mask)), atol=1e-12)
+    np.testing.assert_allclose(effects["mean"], responses.mean(axis=0), atol=1e-12)
+    assert list(effects["order"]) == sorted(effects["order"])
+
+
+# Cada membro da cadeia tem a coluna igual à do efeito que dá nome ao contraste, com o sinal indicado
+@pytest.mark.parametrize("design", DESIGNS.values(), ids=DESIGNS.keys())
+def test_alias_chain_columns_match_leader(design):
+    design_matrix = design.design_matrix()
+    effects = estimate_effects(design_matrix, np.zeros(design.n_runs))
+    for mask, chain in zip(effects["effect"], effects["alias_chain"]):
+        leader = effect_column(design_matrix, int(mask))
+        for member in chain.split(" = "):
+            sign = -1 if member.startswith("-") else 1
+            np.testing.assert_array_equal(effect_column(design_matrix, word_mask(member.lstrip("-"))),
+                                          sign * leader)
+
+
+def test_single_response_shape():
+    design_matrix = minimum_aberration_design(5, 16).design_matrix()
+    effects = estimate_effects(design_matrix, design_matrix[:, 0] * 3.0 + 1.0)
+    assert effects["estimate"].shape == (15,)
+    assert effects["name"][0] == "A"
+    np.testing.assert_allclose(effects["estimate"], np.r_[6.0, np.zeros(14)], atol=1e-12)
+
+
+@pytest.mark.parametrize("design_matrix", [
+    np.ones((6, 3)),  # número de corridas que não é potência de 2
+    np.vstack([FractionalFactorialDesign(3).design_matrix()[:4]] * 2),  # corridas repetidas
+    FractionalFactorialDesign(3).design_matrix() * 0.5,  # fora da codificação -1/+1
+], ids=["corridas", "repetidas", "codificacao"])
+def test_invalid_design_matrices(design_matrix):
+    with pytest.raises(ValueError):
+        estimate_effects(design_matrix, np.zeros(len(design_matrix)))
+
+
+# Lenth (1989) passo a passo, resposta a resposta
+def test_lenth_significance_matches_definition():
+    rng = np.random.default_rng(3)
+    estimates = rng.normal(size=(15, 2))
+    estimates[[0, 4], 0] = [12.0, -9.0]
+    result = lenth_significance(estimates)
+    for k in range(estimates.shape[1]):
+        magnitudes = np.abs(estimates[:, k])
+        s0 = 1.5 * np.median(magnitudes)
+        pse = 1.5 * np.median(magnitudes[magnitudes < 2.5 * s0])
+        me = t.ppf(0.975, 15 / 3) * pse
+        sme = t.ppf((1 + 0.95 ** (1 / 15)) / 2, 15 / 3) * pse
+        np.testing.assert_allclose([result["pse"][k], result["me"][k], result["sme"][k]], [pse, me, sme])
+        np.testing.assert_array_equal(result["significant"][:, k], magnitudes > me)
+    assert result["significant"][[0, 4], 0].all()
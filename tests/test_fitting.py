@@ -0,0 +1,112 @@
+import numpy as np
+import pytest
+from scipy import stats
+
+from doe_pff.coding import FACTORS
+from doe_pff.fitting import (
+    CANDIDATE_TERMS,
+    PAPER_TERMS,
+    IncrementalLeastSquares,
+    LabRuns,
+    model_matrix,
+    parse_term,
+    term_name,
+)
+from doe_pff.models import IAT_TERMS, calculate_iat_batch
+
+
+@pytest.fixture
+def lab_runs():
+    rng = np.random.default_rng(2019)
+    coded = rng.choice([-1.0, 0.0, 1.0], size=(60, len(FACTORS)))
+    coded[:, [0, 2, 4]] = rng.choice([-1.0, 1.0], size=(60, 3))
+    responses = calculate_iat_batch(coded)[0] + rng.normal(0, 0.05, len(coded))
+    return coded, responses
+
+
+# Referência: mínimos quadrados ordinários pelas equações normais resolvidas com lstsq
+def ordinary_least_squares(coded, responses, terms):
+    matrix = model_matrix(coded, terms)
+    coefficients, _, _, _ = np.linalg.lstsq(matrix, responses, rcond=None)
+    residuals = responses - matrix @ coefficients
+    degrees_of_freedom = len(responses) - len(terms)
+    covariance = residuals @ residuals / degrees_of_freedom * np.linalg.inv(matrix.T @ matrix)
+    r_squared = 1 - residuals @ residuals / ((responses - responses.mean()) ** 2).sum()
+    return coefficients, residuals @ residuals, np.sqrt(np.diag(covariance)), r_squared
+
+
+@pytest.mark.parametrize("terms", [PAPER_TERMS, CANDIDATE_TERMS], ids=["artigo", "candidatos"])
+def test_qr_fit_matches_ordinary_least_squares(lab_runs, terms):
+    coded, responses = lab_runs
+    fit = IncrementalLeastSquares(terms)
+    fit.append_runs(coded, responses)
+    coefficients, rss, standard_errors, r_squared = ordinary_least_squares(coded, responses, terms)
+
+    np.testing.assert_allclose(fit.coefficients, coefficients, atol=1e-10)
+    np.testing.assert_allclose(fit.residual_sum_of_squares, rss, rtol=1e-9)
+    np.testing.assert_allclose(fit.standard_errors, standard_errors, rtol=1e-8)
+    np.testing.assert_allclose(fit.r_squared, r_squared, rtol=1e-10)
+    n_runs, n_terms = len(responses), len(terms)
+    np.testing.assert_allclose(fit.r_squared_adjusted, 1 - (1 - r_squared) * (n_runs - 1) / (n_runs - n_terms))
+
+    summary = fit.summary()
+    np.testing.assert_allclose(summary["t"], coefficients / standard_errors, rtol=1e-8)
+    np.testing.assert_allclose(summary["p_value"],
+                               2 * stats.t.sf(np.abs(coefficients / standard_errors), n_runs - n_terms), rtol=1e-6)
+
+
+# Ensaios adicionados um a um (rotações de Givens) ou em blocos dão o mesmo ajuste
+def test_rank_one_updates_match_block_update(lab_runs):
+    coded, responses = lab_runs
+    one_by_one, in_blocks = IncrementalLeastSquares(), IncrementalLeastSquares()
+    for coded_run, response in zip(coded, responses):
+        one_by_one.append_run(coded_run, response)
+    in_blocks.append_runs(coded[:25], responses[:25])
+    in_blocks.append_runs(coded[25:], responses[25:])
+
+    assert one_by_one.n_runs == in_blocks.n_runs == len(responses)
+    np.testing.assert_allclose(one_by_one.coefficients, in_blocks.coefficients, atol=1e-10)
+    np.testing.assert_allclose(one_by_one.residual_sum_of_squares, in_blocks.residual_sum_of_squares, rtol=1e-9)
+
+
+def test_noiseless_runs_recover_paper_coefficients(lab_runs):
+    coded, _ = lab_runs
+    fit = IncrementalLeastSquares(PAPER_TERMS)
+    fit.append_runs(coded, calculate_iat_batch(coded)[0])
+    np.testing.assert_allclose(fit.coefficients, [coefficient for _, coefficient in IAT_TERMS], atol=1e-10)
+    assert fit.residual_sum_of_squares < 1e-20
+
+
+def test_too_few_runs_are_not_estimable(lab_runs):
+    coded, responses = lab_runs
+    fit = IncrementalLeastSquares(PAPER_TERMS)
+    fit.append_runs(coded[:len(PAPER_TERMS) - 1], responses[:len(PAPER_TERMS) - 1])
+    assert not fit.is_estimable
+    with pytest.raises(ValueError):
+        fit.coefficients
+
+
+def test_model_requires_intercept():
+    with pytest.raises(ValueError):
+        IncrementalLeastSquares(((0,), (1,)))
+
+
+def test_term_names_round_trip():
+    for term in CANDIDATE_TERMS:
+        assert parse_term(term_name(term)) == term
+
+
+# LabRuns reaproveita o ajuste enquanto os termos não mudam e o atualiza com cada novo ensaio
+def test_lab_runs_reuse_and_update_fit(lab_runs):
+    coded, responses = lab_runs
+    runs = LabRuns(coded[:40], responses[:40])
+    fit = runs.fit(PAPER_TERMS)
+    assert runs.fit(PAPER_TERMS) is fit
+    for coded_run, response in zip(coded[40:], responses[40:]):
+        runs.append_run(coded_run, response)
+    assert len(runs) == fit.n_runs == len(responses)
+    np.testing.assert_allclose(fit.coefficients, ordinary_least_squares(coded, responses, PAPER_TERMS)[0],
+                               atol=1e-10)
+
+    refit = runs.fit(CANDIDATE_TERMS)
+    assert refit is not fit and refit.n_runs == len(responses)
@@ -0,0 +1,99 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from doe_pff.batch import score_file
+from doe_pff.coding import (
+    FACTORS,
+    FACTOR_LETTERS,
+    code_factor_columns,
+    get_coded_value_categorical,
+    get_coded_value_numerical,
+)
+from doe_pff.fitting import CANDIDATE_TERMS
+from doe_pff.models import IAT_ERROR_RANGE, calculate_iat, calculate_iat_batch
+
+SIDEBAR_COMBINATIONS = list(itertools.product(*(levels for _, _, _, levels in FACTORS)))
+
+
+def scalar_coding(formulation):
+    return tuple(
+        get_coded_value_categorical(factor_name, value) if factor_type == "categorical"
+        else get_coded_value_numerical(factor_name, value)
+        for (_, factor_name, factor_type, _), value in zip(FACTORS, formulation)
+    )
+
+
+def formulation_columns(formulations):
+    return [list(values) for values in zip(*formulations)]
+
+
+def test_code_factor_columns_matches_scalar_coding():
+    coded = code_factor_columns(formulation_columns(SIDEBAR_COMBINATIONS))
+    expected = np.array([scalar_coding(formulation) for formulation in SIDEBAR_COMBINATIONS])
+    np.testing.assert_array_equal(coded, expected)
+
+
+# As 216 combinações da sidebar: o lote deve reproduzir calculate_iat valor a valor
+def test_iat_batch_matches_scalar_for_every_sidebar_combination():
+    coded = code_factor_columns(formulation_columns(SIDEBAR_COMBINATIONS))
+    iat, error_range = calculate_iat_batch(coded)
+    expected = [calculate_iat(*row)[0] for row in coded]
+    np.testing.assert_allclose(iat, expected, rtol=0, atol=1e-12)
+    assert error_range == IAT_ERROR_RANGE
+
+
+# Valores contínuos e um modelo com outros termos e coeficientes (como um modelo ajustado)
+def test_iat_batch_matches_scalar_for_continuous_values_and_custom_terms():
+    rng = np.random.default_rng(7)
+    coded = rng.uniform(-1, 1, size=(500, len(FACTORS)))
+    terms = tuple((term, float(coefficient)) for term, coefficient in zip(CANDIDATE_TERMS,
+                                                                          rng.normal(size=len(CANDIDATE_TERMS))))
+    iat, error_range = calculate_iat_batch(coded, terms=terms, error_range=0.25)
+    expected = [calculate_iat(*row, terms=terms)[0] for row in coded]
+    np.testing.assert_allclose(iat, expected, rtol=1e-12, atol=1e-12)
+    assert error_range == 0.25
+
+
+def test_iat_batch_rejects_wrong_shape():
+    with pytest.raises(ValueError):
+        calculate_iat_batch(np.zeros((3, 5)))
+
+
+def sidebar_frame():
+    return pd.DataFrame(dict(zip(FACTOR_LETTERS, formulation_columns(SIDEBAR_COMBINATIONS))))
+
+
+@pytest.mark.parametrize("extension", [".csv", ".parquet"])
+@pytest.mark.parametrize("workers", [1, 2])
+def test_score_file_matches_batch_model(tmp_path, extension, workers):
+    input_path, output_path = tmp_path / f"entrada{extension}", tmp_path / f"saida{extension}"
+    df = sidebar_frame()
+    if extension == ".csv":
+        df.to_csv(input_path, index=False)
+    else:
+        df.to_parquet(input_path, index=False)
+
+    assert score_file(str(input_path), str(output_path), chunksize=50, workers=workers) == len(df)
+    scored = pd.read_csv(output_path) if extension == ".csv" else pd.read_parquet(output_path)
+    iat, error_range = calculate_iat_batch(code_factor_columns(formulation_columns(SIDEBAR_COMBINATIONS)))
+    np.testing.assert_allclose(scored["IAT"], iat, atol=1e-9)
+    np.testing.assert_allclose(scored["IAT_max"] - scored["IAT_min"], 2 * error_range, atol=1e-9)
+    assert sorted(tmp_path.iterdir()) == sorted([input_path, output_path])
+
+
+# Um valor inválido no último bloco: nem a saída nem o arquivo temporário ficam no disco, e uma
+# saída anterior com o mesmo nome é preservada
+def test_score_file_is_atomic_on_invalid_row(tmp_path):
+    input_path, output_path = tmp_path / "entrada.csv", tmp_path / "saida.csv"
+    df = sidebar_frame()
+    df.loc[len(df) - 1, "C"] = "Zinco"
+    df.to_csv(input_path, index=False)
+    output_path.write_text("anterior")
+
+    with pytest.raises(ValueError, match="Nível desconhecido para C"):
+        score_file(str(input_path), str(output_path), chunksize=50)
+    assert output_path.read_text() == "anterior"
+    assert sorted(tmp_path.iterdir()) == sorted([input_path, output_path])
@@ -0,0 +1,127 @@
+import asyncio
+import contextlib
+import json
+
+import numpy as np
+import pytest
+
+from doe_pff.coding import code_factor_columns
+from doe_pff.models import calculate_iat_batch
+from doe_pff.server import BINARY_CONTENT_TYPE, ScoringServer
+
+VALID = {"A": "Amínico", "B": 0.5, "C": "Com Zinco", "D": 1.75, "E": "Leve/Médio", "F": 50}
+
+# Corpo inválido -> trecho esperado na mensagem de erro (campo e formulação, quando houver)
+INVALID_BODIES = {
+    "json malformado": (b'{"A": ', "Expecting value"),
+    "lista no lugar do objeto": (b"[1, 2]", "objeto JSON"),
+    "fator ausente": ({k: v for k, v in VALID.items() if k != "F"}, "Fatores ausentes: F"),
+    "nível desconhecido": ({**VALID, "C": "Zinco"}, "Valor inválido em C: 'Zinco'"),
+    "objeto no lugar do nível": ({**VALID, "A": {"x": 1}}, "Valor inválido em A"),
+    "texto no lugar do número": ({**VALID, "B": "0.5"}, "Valor inválido em B: '0.5'"),
+    "booleano no lugar do número": ({**VALID, "D": True}, "Valor inválido em D: True"),
+    "nulo": ({**VALID, "F": None}, "Valor inválido em F: None"),
+    "não finito": ({**VALID, "B": float("inf")}, "finitos"),
+    "coluna com valor inválido": ({**{k: [v, v] for k, v in VALID.items()}, "B": [0.5, "x"]},
+                                  "Valor inválido em B[1]: 'x'"),
+    "formulação com valor inválido": ({"formulations": [VALID, {**VALID, "E": {"a": 1}}]},
+                                      "Valor inválido em formulations[1].E"),
+    "formulations não é lista": ({"formulations": VALID}, "'formulations' deve ser uma lista"),
+    "coded nulo": ({"coded": None}, "'coded' deve ser uma lista"),
+    "coded com texto": ({"coded": [0, 0, 0, 0, 0, "a"]}, "Valor inválido em coded[5]: 'a'"),
+    "coded irregular": ({"coded": [[0] * 6, [0, 0]]}, "coded[1] deve ser uma lista com 6 números"),
+}
+# Só o /score escolhe as respostas; os endpoints individuais ignoram "responses"
+INVALID_SCORE_BODIES = {
+    "responses desconhecida": ({**VALID, "responses": ["ph"]}, "'responses' deve ser uma lista"),
+    "responses texto": ({**VALID, "responses": "iat"}, "'responses' deve ser uma lista"),
+}
+
+
+def request(server, method, path, body=b"", content_type="application/json"):
+    if not isinstance(body, bytes):
+        body = json.dumps(body).encode()
+    return asyncio.run(server.dispatch(method, path, body, content_type))
+
+
+@pytest.fixture
+def server():
+    return ScoringServer(workers=0)
+
+
+@pytest.mark.parametrize("path", ["/score", "/iat"])
+@pytest.mark.parametrize("body, message", INVALID_BODIES.values(), ids=INVALID_BODIES.keys())
+def test_invalid_bodies_are_rejected_with_400(server, path, body, message):
+    status, content = request(server, "POST", path, body)
+    assert status == 400
+    assert message in content["error"]
+    # Requisições rejeitadas não entram nas estatísticas
+    assert server.stats()["requests"] == 0
+
+
+@pytest.mark.parametrize("body, message", INVALID_SCORE_BODIES.values(), ids=INVALID_SCORE_BODIES.keys())
+def test_invalid_responses_are_rejected_with_400(server, body, message):
+    status, content = request(server, "POST", "/score", body)
+    assert status == 400 and message in content["error"]
+
+
+def test_single_endpoint_rejects_batches(server):
+    status, content = request(server, "POST", "/iat", {"coded": [[0] * 6, [1] * 6]})
+    assert status == 400 and "/score" in content["error"]
+
+
+def test_binary_body_with_wrong_size_is_rejected(server):
+    status, content = request(server, "POST", "/score", np.zeros(7).tobytes(), BINARY_CONTENT_TYPE)
+    assert status == 400 and "float64" in content["error"]
+    status, content = request(server, "POST", "/score?responses=ph", np.zeros(6).tobytes(), BINARY_CONTENT_TYPE)
+    assert status == 400 and "'responses'" in content["error"]
+
+
+def test_unknown_endpoint_and_method(server):
+    assert request(server, "POST", "/ph", VALID)[0] == 404
+    assert request(server, "GET", "/score")[0] == 405
+    assert request(server, "POST", "/health")[0] == 405
+
+
+def test_valid_batch_is_scored(server):
+    columns = {letter: [value, value] for letter, value in VALID.items()}
+    columns["B"] = [0.2, 0.8]
+    status, content = request(server, "POST", "/score", columns)
+    assert status == 200
+    result = json.loads(content)
+    expected = calculate_iat_batch(code_factor_columns([columns[letter] for letter in "ABCDEF"]))[0]
+    np.testing.assert_allclose(result["iat"], expected, atol=1e-6)
+    assert result["n"] == 2 and server.stats()["formulations"] == 2
+
+
+# Pela conexão HTTP: o 400 chega com o corpo JSON e a conexão (keep-alive) continua atendendo
+def test_http_connection_returns_400_and_stays_open():
+    async def exchange():
+        server = ScoringServer(host="127.0.0.1", port=0, workers=0)
+        ready = asyncio.Event()
+        serving = asyncio.create_task(server.serve(lambda running: ready.set()))
+        await asyncio.wait_for(ready.wait(), 10)
+        reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+        responses = []
+        try:
+            for body in (json.dumps({**VALID, "C": "Zinco"}).encode(), json.dumps(VALID).encode()):
+                writer.write(b"POST /iat HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+                             b"Content-Length: %d\r\n\r\n%s" % (len(body), body))
+                await writer.drain()
+                status_line = await reader.readline()
+                headers = {}
+                while (line := await reader.readline()) != b"\r\n":
+                    name, _, value = line.decode().partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                content = await reader.readexactly(int(headers["content-length"]))
+                responses.append((status_line.split()[1], json.loads(content)))
+        finally:
+            writer.close()
+            serving.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await serving
+        return responses
+
+    (bad_status, bad_content), (ok_status, ok_content) = asyncio.run(exchange())
+    assert bad_status == b"400" and "Valor inválido em C: 'Zinco'" in bad_content["error"]
+    assert ok_status == b"200" and "iat" in ok_content